@@ -0,0 +1,92 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+
+请求头转发微基准测试，对比逐个正则匹配 request.META 与 HeaderForwarder 的耗时
+
+在 bk-plugin-framework 目录下执行:
+
+    python -m benchmark.headers
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmark.settings")
+
+LEGACY_HEADER_REGEX = re.compile("HTTP_BK_PLUGIN_*")
+
+
+def build_meta(size: int, plugin_headers: int) -> dict:
+    """
+    构造与 WSGI 请求相近的 META，包含 size 个普通请求头及 plugin_headers 个 Bk-Plugin-* 请求头
+    """
+    meta = {
+        "REQUEST_METHOD": "POST",
+        "PATH_INFO": "/bk_plugin/plugin_api_dispatch/",
+        "QUERY_STRING": "",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": "128",
+        "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80",
+        "REMOTE_ADDR": "127.0.0.1",
+        "HTTP_X_BKAPI_JWT": "jwt",
+    }
+    for i in range(size - len(meta)):
+        meta["HTTP_X_HEADER_%d" % i] = "value"
+    for i in range(plugin_headers):
+        meta["HTTP_BK_PLUGIN_HEADER_%d" % i] = "value"
+    return meta
+
+
+def legacy_forward(meta: dict) -> dict:
+    headers = {}
+    for key, value in meta.items():
+        if LEGACY_HEADER_REGEX.match(key):
+            headers[key] = value
+    headers["HTTP_X_BKAPI_JWT"] = meta.get("HTTP_X_BKAPI_JWT", "")
+    return headers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="plugin api dispatch header forwarding benchmark")
+    parser.add_argument("--meta-size", type=int, default=60, help="request.META keys")
+    parser.add_argument("--plugin-headers", type=int, default=3, help="Bk-Plugin-* headers")
+    parser.add_argument("--number", type=int, default=100000, help="forward calls per repeat")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    django.setup()
+
+    from bk_plugin_framework.utils.http import HeaderForwarder, meta_key
+
+    meta = build_meta(args.meta_size, args.plugin_headers)
+    # 相当于在 PLUGIN_API_FORWARD_HEADERS 中配置了全部 Bk-Plugin-* 请求头
+    forwarder = HeaderForwarder(
+        keys=[meta_key("Bk-Plugin-Header-%d" % i) for i in range(args.plugin_headers)],
+        defaults={"HTTP_X_BKAPI_JWT": ""},
+    )
+    if legacy_forward(meta) != forwarder.forward(meta):
+        print("forwarded headers mismatch")
+        return 1
+
+    for name, forward in (("regex", legacy_forward), ("forwarder", forwarder.forward)):
+        best = min(timeit.repeat(lambda: forward(meta), number=args.number, repeat=args.repeat))
+        print("%-10s %10.3fus/op" % (name, best / args.number * 1000000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
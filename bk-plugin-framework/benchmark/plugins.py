@@ -0,0 +1,49 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from bk_plugin_framework.kit import Context, ContextRequire, InputsModel, Plugin
+
+MODE_SUCCESS = "success"
+MODE_POLL = "poll"
+MODE_CALLBACK = "callback"
+
+
+class BenchmarkPlugin(Plugin):
+    """
+    基准测试用的合成插件，通过输入控制执行模式、输入大小、轮询间隔及 storage 大小
+    """
+
+    class Meta:
+        version = "0.0.1"
+        desc = "benchmark plugin"
+
+    class Inputs(InputsModel):
+        mode: str = MODE_SUCCESS
+        payload: str = ""
+        poll_interval: int = 1
+        storage_size: int = 0
+        # 每轮调度是否修改 storage
+        mutate: bool = False
+
+    class ContextInputs(ContextRequire):
+        executor: str = "benchmark"
+
+    def execute(self, inputs: Inputs, context: Context):
+        if context.invoke_count == 1:
+            context.storage["blob"] = "x" * inputs.storage_size
+            context.storage["count"] = 0
+        elif inputs.mutate:
+            context.storage["count"] += 1
+
+        if inputs.mode == MODE_POLL:
+            self.wait_poll(inputs.poll_interval)
+        elif inputs.mode == MODE_CALLBACK and context.invoke_count == 1:
+            self.wait_callback()
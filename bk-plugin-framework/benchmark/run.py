@@ -0,0 +1,269 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+插件执行及调度基准测试
+
+在 bk-plugin-framework 目录下执行:
+
+    python -m benchmark.run --output benchmark/baselines/local.json
+    python -m benchmark.run --compare benchmark/baselines/sqlite.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import typing
+import uuid
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmark.settings")
+
+SCENARIOS = ("execute", "schedule", "callback")
+# 对比基线时，吞吐量下降或单次操作 SQL 数增加视为性能回退
+HIGHER_IS_BETTER = {"throughput": True, "p50_ms": False, "p99_ms": False, "queries_per_op": False}
+
+
+def setup():
+    django.setup()
+
+    from celery import Celery
+    from django.conf import settings
+    from django.core.management import call_command
+
+    app = Celery("benchmark", broker=settings.BROKER_URL)
+    app.set_default()
+    app.set_current()
+    call_command("migrate", verbosity=0)
+
+    # 注册 celery 任务
+    from bk_plugin_framework.runtime.callback.celery import tasks  # noqa
+    from bk_plugin_framework.runtime.schedule.celery import tasks  # noqa
+
+    return app
+
+
+def percentile(sorted_values: typing.List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(p * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def measure(operation: typing.Callable[[int], None], rounds: int) -> dict:
+    """
+    顺序执行 rounds 次操作，统计吞吐量、延迟分位数及平均 SQL 数
+    """
+    from django.db import connection
+
+    durations = []
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    with connection.execute_wrapper(count_queries):
+        for i in range(rounds):
+            op_start = time.perf_counter()
+            operation(i)
+            durations.append(time.perf_counter() - op_start)
+    total = time.perf_counter() - start
+
+    durations.sort()
+    return {
+        "rounds": rounds,
+        "throughput": round(rounds / total, 2) if total else 0.0,
+        "p50_ms": round(percentile(durations, 0.5) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "queries_per_op": round(queries / rounds, 2) if rounds else 0.0,
+    }
+
+
+def execute_inputs(**kwargs) -> dict:
+    from benchmark.plugins import MODE_SUCCESS
+
+    inputs = {"mode": MODE_SUCCESS}
+    inputs.update(kwargs)
+    input_size = inputs.pop("input_size", 0)
+    inputs["payload"] = "x" * input_size
+    return inputs
+
+
+def prepare_schedules(count: int, **inputs) -> typing.List[str]:
+    from benchmark.plugins import BenchmarkPlugin
+
+    from bk_plugin_framework.runtime.executor import BKPluginExecutor
+
+    trace_ids = []
+    for _ in range(count):
+        trace_id = uuid.uuid4().hex
+        result = BKPluginExecutor(trace_id=trace_id).execute(BenchmarkPlugin, execute_inputs(**inputs), {})
+        if result.err:
+            raise RuntimeError("prepare schedule failed: %s" % result.err)
+        trace_ids.append(trace_id)
+    return trace_ids
+
+
+def bench_execute(args) -> dict:
+    from benchmark.plugins import MODE_POLL, MODE_SUCCESS, BenchmarkPlugin
+
+    from bk_plugin_framework.runtime.executor import BKPluginExecutor
+
+    results = {}
+    for input_size, mode in itertools.product(args.input_sizes, (MODE_SUCCESS, MODE_POLL)):
+        inputs = execute_inputs(mode=mode, input_size=input_size)
+
+        def operation(i):
+            BKPluginExecutor(trace_id=uuid.uuid4().hex).execute(BenchmarkPlugin, inputs, {})
+
+        results["execute[mode=%s,input=%s]" % (mode, input_size)] = measure(operation, args.rounds)
+    return results
+
+
+def bench_schedule(args) -> dict:
+    from benchmark.plugins import MODE_POLL
+
+    from bk_plugin_framework.runtime.schedule.celery.tasks import schedule
+
+    results = {}
+    for storage_size, poll_interval, mutate in itertools.product(
+        args.storage_sizes, args.poll_intervals, (False, True)
+    ):
+        trace_ids = prepare_schedules(
+            args.schedules,
+            mode=MODE_POLL,
+            input_size=args.input_sizes[0],
+            storage_size=storage_size,
+            poll_interval=poll_interval,
+            mutate=mutate,
+        )
+
+        def operation(i):
+            schedule(trace_ids[i % len(trace_ids)])
+
+        name = "schedule[storage=%s,interval=%s,mutate=%d]" % (storage_size, poll_interval, mutate)
+        results[name] = measure(operation, args.rounds)
+    return results
+
+
+def bench_callback(args) -> dict:
+    from benchmark.plugins import MODE_CALLBACK
+
+    from bk_plugin_framework.runtime.callback.celery.tasks import callback
+
+    results = {}
+    for storage_size in args.storage_sizes:
+        trace_ids = prepare_schedules(
+            args.rounds, mode=MODE_CALLBACK, input_size=args.input_sizes[0], storage_size=storage_size
+        )
+        callback_data = json.dumps({"result": True, "data": {}})
+
+        def operation(i):
+            callback(trace_id=trace_ids[i], callback_id=trace_ids[i], callback_data=callback_data)
+
+        results["callback[storage=%s]" % storage_size] = measure(operation, args.rounds)
+    return results
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> typing.List[str]:
+    """
+    对比当前结果与基线，打印差异并返回超出阈值的回退项
+    """
+    regressions = []
+    print("\n%-55s %-15s %12s %12s %9s" % ("scenario", "metric", "baseline", "current", "delta"))
+    for name, metrics in current["results"].items():
+        base_metrics = baseline["results"].get(name)
+        if not base_metrics:
+            print("%-55s (new scenario)" % name)
+            continue
+
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            base, cur = base_metrics[metric], metrics[metric]
+            delta = (cur - base) / base if base else 0.0
+            regressed = (-delta if higher_is_better else delta) > threshold
+            # SQL 数是确定值，任何增加都视为回退
+            if metric == "queries_per_op":
+                regressed = cur > base
+            mark = " !" if regressed else ""
+            print("%-55s %-15s %12s %12s %+8.1f%%%s" % (name, metric, base, cur, delta * 100, mark))
+            if regressed and metric in ("throughput", "queries_per_op"):
+                regressions.append("%s %s: %s -> %s" % (name, metric, base, cur))
+    return regressions
+
+
+def parse_sizes(value: str) -> typing.List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="bk-plugin-framework execute/schedule/callback benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated: %s" % ",".join(SCENARIOS))
+    parser.add_argument("--rounds", type=int, default=500, help="operations per scenario")
+    parser.add_argument("--schedules", type=int, default=100, help="schedule objects used by schedule scenarios")
+    parser.add_argument("--input-sizes", type=parse_sizes, default=[0, 10 * 1024], help="plugin inputs payload bytes")
+    parser.add_argument("--storage-sizes", type=parse_sizes, default=[0, 10 * 1024, 100 * 1024])
+    parser.add_argument("--poll-intervals", type=parse_sizes, default=[1, 5])
+    parser.add_argument("--output", help="save results as json baseline")
+    parser.add_argument("--compare", help="baseline json to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed throughput regression ratio")
+    args = parser.parse_args(argv)
+
+    setup()
+
+    from django.conf import settings
+    from django.db import connection
+
+    benches = {"execute": bench_execute, "schedule": bench_schedule, "callback": bench_callback}
+    results = {}
+    for scenario in args.scenarios.split(","):
+        results.update(benches[scenario](args))
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "broker": settings.BROKER_URL.split("://")[0],
+            "rounds": args.rounds,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+    for name, metrics in results.items():
+        print(
+            "%-55s %10.2f ops/s  p50 %8.3fms  p99 %8.3fms  %5.2f queries/op"
+            % (name, metrics["throughput"], metrics["p50_ms"], metrics["p99_ms"], metrics["queries_per_op"])
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+# 基准测试使用的 Django 配置，数据库及 Celery broker 均可通过环境变量切换
+
+import os
+import tempfile
+
+SECRET_KEY = "SECRET_KEY"
+BK_APP_SECRET = "1" * 52
+BK_PLUGIN_APIGW_BACKEND_HOST = ""
+BK_API_URL_TMPL = "{api_name}.apigw.com"
+BK_APIGW_NAME = "APP_CODE"
+BK_PLUGIN_APIGW_STAGE_NAME = "stag"
+
+USE_TZ = True
+TIME_ZONE = "UTC"
+
+INSTALLED_APPS = (
+    "bk_plugin_framework.runtime.loghub",
+    "bk_plugin_framework.runtime.schedule",
+    "bk_plugin_framework.runtime.callback",
+)
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "bk_plugin": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+# BENCHMARK_DB: sqlite(默认) 或 mysql
+if os.getenv("BENCHMARK_DB", "sqlite") == "mysql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.mysql",
+            "NAME": os.getenv("BENCHMARK_MYSQL_NAME", "bk_plugin_benchmark"),
+            "USER": os.getenv("BENCHMARK_MYSQL_USER", "root"),
+            "PASSWORD": os.getenv("BENCHMARK_MYSQL_PASSWORD", ""),
+            "HOST": os.getenv("BENCHMARK_MYSQL_HOST", "127.0.0.1"),
+            "PORT": os.getenv("BENCHMARK_MYSQL_PORT", "3306"),
+            "TEST": {"NAME": os.getenv("BENCHMARK_MYSQL_NAME", "bk_plugin_benchmark")},
+        },
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("BENCHMARK_SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "benchmark.sqlite3")),
+        },
+    }
+
+# memory:// 为进程内 broker，本地 redis 可设置为 redis://127.0.0.1:6379/0
+BROKER_URL = os.getenv("BENCHMARK_BROKER_URL", "memory://")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"null": {"class": "logging.NullHandler"}},
+    "loggers": {
+        "bk_plugin": {"handlers": ["null"], "propagate": False},
+        "bk-plugin-framework": {"handlers": ["null"], "propagate": False},
+    },
+}
@@ -13,6 +13,7 @@ import base64
 import hashlib
 import logging
 import os
+import typing
 
 try:
     from pydantic.v1 import BaseSettings
@@ -69,7 +70,79 @@ class Settings(BaseSettings):
     PLUGIN_CALLBACK_RETRY_TIMES: int = 3
     CALLBACK_TASK_NAME: str = "bk_plugin_framework.runtime.callback.celery.tasks.callback"
     SCHEDULE_PERSISTENT_DAYS: int = 30
+    LOG_PERSISTENT_DAYS: int = 30
+    # 过期数据按主键分批删除的批大小及批次间隔（秒）
+    EXPIRED_DELETE_CHUNK_SIZE: int = 1000
+    EXPIRED_DELETE_CHUNK_INTERVAL: float = 0.1
     USER_TOKEN_KEY_NAME: str = ""
+    # Schedule.data 编码方式: json/orjson/msgpack，开启压缩时超过阈值（字节）的数据使用 zstd 压缩
+    # 未压缩的数据均以 json 文本存储，msgpack 只在压缩时使用
+    SCHEDULE_DATA_CODEC: str = "json"
+    SCHEDULE_DATA_COMPRESS: bool = False
+    SCHEDULE_DATA_COMPRESS_THRESHOLD: int = 1024
+    # worker 进程内的短间隔轮询调度器：轮询间隔不超过 LOCAL_POLL_MAX_INTERVAL（秒）时在本地时间轮中等待执行
+    LOCAL_POLL_SCHEDULER_ENABLED: bool = False
+    LOCAL_POLL_MAX_INTERVAL: int = 5
+    LOCAL_POLL_TICK: float = 0.1
+    LOCAL_POLL_THREADS: int = 8
+    # 本地轮询超过预期执行时间该秒数后仍未执行（如进程异常退出），由定时任务重新投递到 Celery
+    LOCAL_POLL_RECOVER_GRACE: int = 30
+    LOCAL_POLL_RECOVER_BATCH_SIZE: int = 500
+    # worker 进程内的事件循环：execute 为 async def 的插件轮询在事件循环中执行，不再占用 worker 线程
+    ASYNC_SCHEDULE_ENABLED: bool = False
+    # 事件循环中同时执行的调度数上限，超出时在 worker 线程中同步执行
+    ASYNC_SCHEDULE_CONCURRENCY: int = 2000
+    # 执行调度中数据库等同步操作的线程数
+    ASYNC_SCHEDULE_THREADS: int = 16
+    ASYNC_SCHEDULE_SHUTDOWN_TIMEOUT: float = 30
+    # 事件循环中的调度超过该秒数（再加上 LOCAL_POLL_RECOVER_GRACE）仍未结束时视为丢失（如 worker 异常退出），
+    # 由 recover_local_poll_schedule 重新投递；单轮执行可能超过该时间的插件需要调大，重复执行的轮次会因版本冲突被丢弃
+    ASYNC_SCHEDULE_RECOVER_AFTER: int = 300
+    LOG_BUFFER_CAPACITY: int = 100
+    LOG_BUFFER_FLUSH_INTERVAL: float = 1.0
+    # trace 日志存储后端: orm/file/memory 或 LogStorage 子类的导入路径
+    LOG_STORAGE_BACKEND: str = "orm"
+    LOG_STORAGE_FILE_DIR: str = ""
+    LOG_STORAGE_FILE_SEGMENT_SIZE: int = 64 * 1024 * 1024
+    LOG_STORAGE_MEMORY_CAPACITY: int = 10000
+    LOG_ITER_CHUNK_SIZE: int = 2000
+    LOG_PAGE_MAX_SIZE: int = 5000
+    # 非开发环境下也记录 trace 日志并开放日志查询接口
+    TRACE_LOG_ALWAYS_ON: bool = False
+    # meta 及 detail 接口响应的 Cache-Control max-age（秒），过期后通过 ETag 协商
+    API_CACHE_MAX_AGE: int = 60
+    # 批量调用接口单次请求的最大调用数及并发执行线程数
+    INVOKE_BATCH_MAX_SIZE: int = 500
+    INVOKE_BATCH_MAX_WORKERS: int = 8
+    # 批量查询调度状态时单次请求的最大 trace_id 数
+    SCHEDULE_BATCH_MAX_SIZE: int = 1000
+    # 调度状态变化通知后端: 空(不开启)/local(进程内)/redis，开启后提供长轮询及 SSE 接口
+    SCHEDULE_NOTIFY_BACKEND: str = ""
+    SCHEDULE_NOTIFY_REDIS_URL: str = ""
+    # 调度锁后端: db(默认，Schedule.scheduling 字段)/redis
+    SCHEDULE_LOCK_BACKEND: str = "db"
+    SCHEDULE_LOCK_REDIS_URL: str = ""
+    # redis 调度锁的过期秒数，持有期间每 lease/3 秒自动续期，只决定持有者异常退出后锁多久被释放
+    SCHEDULE_LOCK_LEASE: float = 300
+    # 回调获取调度锁的最长等待秒数，超时后重新投递回调任务，db 后端不支持等待；
+    # 等待期间会占用一个 celery worker 并发槽位，过大会降低 worker 处理其他任务的能力
+    SCHEDULE_LOCK_WAIT_TIMEOUT: float = 5
+    # 回调与轮询并发时回调结果可能因版本冲突被丢弃，此时重新读取 Schedule 并重新执行回调的最大次数
+    SCHEDULE_CALLBACK_CAS_RETRY_TIMES: int = 3
+    # 长轮询接口最长等待时间、SSE 接口最长连接时间及心跳间隔（秒）
+    SCHEDULE_WAIT_MAX_TIMEOUT: int = 30
+    SCHEDULE_STREAM_MAX_TIMEOUT: int = 300
+    SCHEDULE_STREAM_HEARTBEAT: int = 15
+    # 每个进程同时阻塞等待调度状态（wait/stream）的请求数上限，0 表示不限制；
+    # 等待中的请求会一直占用一个 web worker 线程，需要小于 web 进程的线程数，超过上限时 wait 立即返回当前状态，stream 返回 429
+    SCHEDULE_WAIT_MAX_WAITERS: int = 8
+    # 使用异步视图处理 invoke 及 plugin_api_dispatch 接口，通过 ASGI 入口启动时默认开启，需要 Django >= 4.1
+    ASYNC_API_ENABLED: bool = False
+    # plugin_api_dispatch 按路径缓存的插件 API 视图解析结果数
+    PLUGIN_API_RESOLVE_CACHE_SIZE: int = 1024
+    # plugin_api_dispatch 透传给插件 API 的自定义请求头名称，环境变量为 JSON 数组，如 ["Bk-Plugin-Tenant"]；
+    # 只转发列出的请求头，网关 JWT（X-Bkapi-JWT）总是转发
+    PLUGIN_API_FORWARD_HEADERS: typing.List[str] = []
 
     class Config:
         case_sensitive = True
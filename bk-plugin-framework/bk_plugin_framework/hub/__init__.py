@@ -12,7 +12,9 @@ specific language governing permissions and limitations under the License.
 import logging
 import os
 import typing
+from types import MappingProxyType
 
+from bk_plugin_framework.hub.version import VersionIndex
 from bk_plugin_framework.utils.module_load import load_form_module_path
 
 logger = logging.getLogger("bk-plugin-framework")
@@ -20,6 +22,10 @@ logger = logging.getLogger("bk-plugin-framework")
 
 class VersionHub:
     __hub = {}
+    # 注册表的只读视图、语义化版本索引及排序后的版本列表，只在注册插件时更新，读取时不需要复制或排序
+    __plugins = MappingProxyType(__hub)
+    __index = VersionIndex()
+    __versions = ()
 
     @classmethod
     def _register_plugin(cls, plugin_cls: typing.Type):
@@ -32,7 +38,9 @@ class VersionHub:
                 )
             )
 
+        cls.__index.add(version)
         cls.__hub[version] = plugin_cls
+        cls.__versions = cls.__index.versions()
         form_module_path = load_form_module_path()
         if form_module_path is None:
             raise RuntimeError("can not find bk_plugin module for plugin {}".format(plugin_cls))
@@ -51,14 +59,42 @@ class VersionHub:
     @classmethod
     def _clear(cls):
         cls.__hub = {}
+        cls.__plugins = MappingProxyType(cls.__hub)
+        cls.__index = VersionIndex()
+        cls.__versions = ()
+
+    @classmethod
+    def get(cls, version: str) -> typing.Optional[typing.Type]:
+        return cls.__hub.get(version)
+
+    @classmethod
+    def resolve(cls, spec: str) -> typing.Optional[typing.Type]:
+        """
+        按完整版本号、latest 或 ^、~ 版本范围获取插件类
+        """
+        plugin_cls = cls.__hub.get(spec)
+        if plugin_cls is not None:
+            return plugin_cls
+        version = cls.__index.resolve(spec)
+        return cls.__hub.get(version) if version else None
+
+    @classmethod
+    def plugins(cls) -> typing.Mapping[str, typing.Type]:
+        """
+        返回注册表的只读视图，不会复制注册表
+        """
+        return cls.__plugins
 
     @classmethod
     def all_plugins(cls) -> typing.Dict[str, typing.Type]:
-        plugins = {}
-        for version, plugin_cls in cls.__hub.items():
-            plugins[version] = plugin_cls
-        return plugins
+        """
+        返回注册表的副本，只需要读取时使用 get 或 plugins
+        """
+        return dict(cls.__hub)
 
     @classmethod
-    def versions(cls) -> typing.List[str]:
-        return sorted(cls.__hub.keys(), reverse=True)
+    def versions(cls) -> typing.Tuple[str, ...]:
+        """
+        按语义化版本从新到旧排列的所有版本
+        """
+        return cls.__versions
@@ -0,0 +1,118 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import re
+import typing
+from bisect import bisect_left, insort
+
+# 插件版本格式为 major.minor.patch，patch 后可以带预发布后缀，如 1.0.0rc1，见 kit.plugin.VALID_VERSION_PATTERN
+VERSION_PATTERN = re.compile(r"^([0-9]+)\.([0-9]+)\.([0-9]+)([a-z0-9]*)$")
+RANGE_PATTERN = re.compile(r"^([\^~])([0-9]+)(?:\.([0-9]+))?(?:\.([0-9]+))?$")
+LATEST = "latest"
+
+
+class VersionKey(typing.NamedTuple):
+    major: int
+    minor: int
+    patch: int
+    # 正式版本排在同号预发布版本之后
+    released: bool
+    suffix: str
+
+    @property
+    def release(self) -> typing.Tuple[int, int, int]:
+        return self.major, self.minor, self.patch
+
+
+def parse_version(version: str) -> typing.Optional[VersionKey]:
+    match = VERSION_PATTERN.match(version)
+    if not match:
+        return None
+    major, minor, patch, suffix = match.groups()
+    return VersionKey(int(major), int(minor), int(patch), not suffix, suffix)
+
+
+def parse_range(spec: str) -> typing.Optional[typing.Tuple[typing.Tuple[int, int, int], typing.Tuple[int, int, int]]]:
+    """
+    解析 ^ 及 ~ 版本范围，返回 [lower, upper) 区间，语义与 npm 一致：
+
+    ^1.2.3 -> [1.2.3, 2.0.0)，^0.2.3 -> [0.2.3, 0.3.0)，^0.0.3 -> [0.0.3, 0.0.4)
+    ~1.2.3 -> [1.2.3, 1.3.0)，~1.2 -> [1.2.0, 1.3.0)，~1 -> [1.0.0, 2.0.0)
+    """
+    match = RANGE_PATTERN.match(spec)
+    if not match:
+        return None
+
+    operator, major, minor, patch = match.groups()
+    major = int(major)
+    lower = (major, int(minor or 0), int(patch or 0))
+
+    if operator == "~":
+        upper = (major + 1, 0, 0) if minor is None else (major, lower[1] + 1, 0)
+    elif major or minor is None:
+        upper = (major + 1, 0, 0)
+    elif lower[1] or patch is None:
+        upper = (0, lower[1] + 1, 0)
+    else:
+        upper = (0, 0, lower[2] + 1)
+    return lower, upper
+
+
+class VersionIndex:
+    """
+    按语义化版本排序的插件版本索引，注册时维护有序列表，解析 latest 及版本范围时二分查找
+
+    与 npm 一致，版本范围只匹配正式版本，预发布版本需要指定完整版本号；没有正式版本时 latest 返回最新的预发布版本
+    """
+
+    def __init__(self):
+        # 升序排列的 (VersionKey, version)
+        self._entries = []
+        # 升序排列的正式版本 (major, minor, patch, version)
+        self._releases = []
+
+    def add(self, version: str) -> None:
+        key = parse_version(version)
+        if key is None:
+            raise ValueError("invalid plugin version: {}".format(version))
+        insort(self._entries, (key, version))
+        if key.released:
+            insort(self._releases, key.release + (version,))
+
+    def versions(self) -> typing.Tuple[str, ...]:
+        """
+        从新到旧排列的所有版本
+        """
+        return tuple(version for _, version in reversed(self._entries))
+
+    def latest(self) -> typing.Optional[str]:
+        if self._releases:
+            return self._releases[-1][-1]
+        return self._entries[-1][1] if self._entries else None
+
+    def resolve(self, spec: str) -> typing.Optional[str]:
+        """
+        解析 latest 或 ^、~ 版本范围，返回范围内最新的正式版本，无法解析或没有匹配的版本时返回 None
+        """
+        if spec == LATEST:
+            return self.latest()
+
+        bounds = parse_range(spec)
+        if bounds is None:
+            return None
+
+        lower, upper = bounds
+        # upper 比任何 upper + (version,) 都小，bisect_left 的前一个即为范围内最大的版本
+        index = bisect_left(self._releases, upper) - 1
+        if index < 0:
+            return None
+        entry = self._releases[index]
+        return entry[-1] if entry[:3] >= lower else None
@@ -24,6 +24,7 @@ from bk_plugin_framework.runtime.callback.api import (
     CallbackPreparation,
     prepare_callback,
 )
+from bk_plugin_framework.utils.http import content_etag, dump_standard_response
 
 VALID_VERSION_PATTERN = re.compile(r"^[0-9]+\.[0-9]+\.[0-9][a-z0-9]*$")
 
@@ -153,6 +154,14 @@ class PluginMeta(type):
         return new_cls
 
 
+class PluginDetail(typing.NamedTuple):
+    # Plugin.dict() 的结果
+    data: dict
+    # 详情接口响应体序列化后的 JSON
+    content: bytes
+    etag: str
+
+
 class Plugin(metaclass=PluginMeta):
     _EMPTY_SCHEMA = {"type": "object", "properties": {}, "required": [], "definitions": {}}
 
@@ -164,8 +173,15 @@ class Plugin(metaclass=PluginMeta):
         pass
 
     def execute(self, inputs: InputsModel, context: Context):
+        """
+        插件执行逻辑，可以定义为 async def，异步插件在事件循环中执行，不能直接调用同步的数据库操作等阻塞接口
+        """
         raise NotImplementedError()
 
+    @classmethod
+    def is_async(cls) -> bool:
+        return inspect.iscoroutinefunction(cls.execute)
+
     def wait_poll(self, interval: int):
         self.is_waiting_callback = False
         self._poll_interval = max(interval, 0)
@@ -230,3 +246,17 @@ class Plugin(metaclass=PluginMeta):
             data["context_inputs"] = cls._trim_schema(context_cls.schema())
 
         return data
+
+    @classmethod
+    def detail(cls) -> PluginDetail:
+        """
+        获取插件详情，每个插件版本只在首次获取时生成 schema 及序列化结果，之后直接复用
+        """
+        # 只读取当前类自身的缓存，避免子类复用父类版本的详情
+        detail = cls.__dict__.get("_detail")
+        if detail is None:
+            data = cls.dict()
+            content = dump_standard_response(data)
+            detail = PluginDetail(data=data, content=content, etag=content_etag(content))
+            cls._detail = detail
+        return detail
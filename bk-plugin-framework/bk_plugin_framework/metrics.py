@@ -1,3 +1,4 @@
+import inspect
 import os
 import socket
 import time
@@ -47,17 +48,36 @@ def get_histogram_buckets_from_env(env_name):
 
 def setup_gauge(*gauges):
     def wrapper(func):
-        @wraps(func)
-        def _wrapper(*args, **kwargs):
+        def _inc(kwargs):
             plugin_cls = kwargs.get("plugin_cls")
             version = plugin_cls.Meta.version if plugin_cls else "unknown"
             for g in gauges:
                 g.labels(hostname=HOSTNAME, version=version).inc(1)
+            return version
+
+        def _dec(version):
+            for g in gauges:
+                g.labels(hostname=HOSTNAME, version=version).dec(1)
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def _async_wrapper(*args, **kwargs):
+                version = _inc(kwargs)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _dec(version)
+
+            return _async_wrapper
+
+        @wraps(func)
+        def _wrapper(*args, **kwargs):
+            version = _inc(kwargs)
             try:
                 return func(*args, **kwargs)
             finally:
-                for g in gauges:
-                    g.labels(hostname=HOSTNAME, version=version).dec(1)
+                _dec(version)
 
         return _wrapper
 
@@ -66,16 +86,31 @@ def setup_gauge(*gauges):
 
 def setup_histogram(*histograms):
     def wrapper(func):
-        @wraps(func)
-        def _wrapper(*args, **kwargs):
+        def _observe(kwargs, start):
             plugin_cls = kwargs.get("plugin_cls")
             version = plugin_cls.Meta.version if plugin_cls else "unknown"
+            for h in histograms:
+                h.labels(hostname=HOSTNAME, version=version).observe(time.perf_counter() - start)
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def _async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _observe(kwargs, start)
+
+            return _async_wrapper
+
+        @wraps(func)
+        def _wrapper(*args, **kwargs):
             start = time.perf_counter()
             try:
                 return func(*args, **kwargs)
             finally:
-                for h in histograms:
-                    h.labels(hostname=HOSTNAME, version=version).observe(time.perf_counter() - start)
+                _observe(kwargs, start)
 
         return _wrapper
 
@@ -154,3 +189,9 @@ BK_PLUGIN_CALLBACK_TIME = Histogram(
     buckets=get_histogram_buckets_from_env("BAMBOO_ENGINE_METRICS_BUCKETS"),
     labelnames=["version", "hostname"],
 )
+
+BK_PLUGIN_EXPIRED_DATA_DELETED_COUNT = Counter(
+    name="bk_plugin_expired_data_deleted_count",
+    documentation="count expired rows deleted",
+    labelnames=["model", "hostname"],
+)
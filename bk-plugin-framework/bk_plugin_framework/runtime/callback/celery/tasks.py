@@ -34,14 +34,15 @@ logger = logging.getLogger("bk_plugin")
 
 def _set_schedule_state(trace_id: str, state: State):
     try:
-        Schedule.objects.filter(trace_id=trace_id).update(state=state.value)
+        # 增加版本号，使并发中的 compare-and-swap 更新失效，避免失败状态被覆盖
+        Schedule.objects.update_with_version(trace_id, state=state.value)
     except Exception:
         logger.exception("[execute] set schedule state error")
 
 
 @shared_task(ignore_result=True)
 def callback(trace_id: str, callback_id: str, callback_data: str):
-    with get_schedule_lock(trace_id) as lock:
+    with get_schedule_lock(trace_id, fetch=True) as lock:
         if not lock.locked:
             try_after = random.randint(1, 5)
             current_app.tasks[settings.CALLBACK_TASK_NAME].apply_async(
@@ -56,7 +57,9 @@ def callback(trace_id: str, callback_id: str, callback_data: str):
         local.set_trace_id(trace_id)
 
         try:
-            schedule = Schedule.objects.get(trace_id=trace_id)
+            schedule = lock.schedule or Schedule.objects.get_for_execute(trace_id=trace_id)
+            # 执行器在更新本轮结果时释放锁后，退出时不再重复释放
+            lock.schedule = schedule
         except Exception:
             logger.exception("[callback_task] fetch schedule/callback obj %s failed" % trace_id)
             _set_schedule_state(trace_id=trace_id, state=State.FAIL)
@@ -68,7 +71,7 @@ def callback(trace_id: str, callback_id: str, callback_data: str):
             )
             return
 
-        plugin_cls = VersionHub.all_plugins().get(schedule.plugin_version)
+        plugin_cls = VersionHub.get(schedule.plugin_version)
         if not plugin_cls:
             logger.error("[callback_task] can not find plugin class for version %s" % schedule.plugin_version)
             _set_schedule_state(trace_id=trace_id, state=State.FAIL)
@@ -9,19 +9,30 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import json
+import copy
+import datetime
+import functools
 import logging
 import typing
+from concurrent.futures import ThreadPoolExecutor
 
 from celery import current_app
 
+try:
+    from asgiref.sync import async_to_sync, sync_to_async
+except ImportError:
+    # Django 3.0 之前不依赖 asgiref，未安装时不支持 execute 为 async def 的插件
+    async_to_sync = sync_to_async = None
+
 try:
     from pydantic.v1 import ValidationError
 except ImportError:
     from pydantic import ValidationError
 
+from django.db import connections
 from django.utils.timezone import now
 
+from bk_plugin_framework.envs import settings
 from bk_plugin_framework.kit import (
     Callback,
     Context,
@@ -45,7 +56,14 @@ from bk_plugin_framework.metrics import (
     setup_histogram,
 )
 from bk_plugin_framework.runtime.callbacker import PluginCallbacker
-from bk_plugin_framework.runtime.schedule.models import Schedule
+from bk_plugin_framework.runtime.schedule import (
+    async_schedule,
+    codecs,
+    local_poll,
+    notify,
+)
+from bk_plugin_framework.runtime.schedule.models import SCHEDULE_EXECUTE_FIELDS, Schedule
+from bk_plugin_framework.utils import local
 
 logger = logging.getLogger("bk_plugin")
 
@@ -60,32 +78,107 @@ class ExecuteResult:
         self.err = err
 
 
+class BatchInvocation(typing.NamedTuple):
+    trace_id: str
+    plugin_cls: typing.Type[Plugin]
+    inputs: typing.Dict[str, typing.Any]
+    context_inputs: typing.Dict[str, typing.Any]
+
+
+class PendingSchedule(typing.NamedTuple):
+    # Schedule 创建参数
+    fields: dict
+    poll_interval: int
+
+
+class ExecutePreparation(typing.NamedTuple):
+    plugin: Plugin
+    inputs: InputsModel
+    context: Context
+
+
+class SchedulePreparation(typing.NamedTuple):
+    plugin: Plugin
+    inputs: InputsModel
+    context: Context
+    schedule_data: dict
+    # 执行前的 storage 和 outputs 快照，用于判断本轮调度是否需要重新写入 data
+    storage_snapshot: dict
+    outputs_snapshot: dict
+
+
+def call_plugin_execute(plugin: Plugin, inputs: InputsModel, context: Context):
+    """
+    在同步代码中调用插件的 execute 方法，异步插件在新的事件循环中执行
+    """
+    if plugin.is_async():
+        if async_to_sync is None:
+            raise RuntimeError("async plugin execute require package asgiref installed")
+        async_to_sync(plugin.execute)(inputs=inputs, context=context)
+    else:
+        plugin.execute(inputs=inputs, context=context)
+
+
 class BKPluginExecutor:
     SCHEDULE_TASK_NAME = "bk_plugin_framework.runtime.schedule.celery.tasks.schedule"
 
     def __init__(self, trace_id: str):
         self.trace_id = trace_id
 
-    def _dump_schedule_data(self, inputs: dict, context: dict, outputs: dict):
-        return json.dumps(
+    def _dump_schedule_inputs(self, inputs: dict, context_data: dict) -> str:
+        """
+        调度过程中不会变化的插件输入和上下文输入，只在创建 Schedule 时写入一次
+        """
+        return codecs.dumps(
             {
                 "inputs": inputs,
-                "context": context,
+                "context_data": context_data,
+            }
+        )
+
+    def _dump_schedule_data(self, storage: dict, outputs: dict) -> str:
+        """
+        每轮调度都可能变化的插件状态
+        """
+        return codecs.dumps(
+            {
+                "storage": storage,
                 "outputs": outputs,
             }
         )
 
     def _load_schedule_data(self, schedule: Schedule) -> dict:
-        return json.loads(schedule.data)
+        """
+        加载调度数据，统一返回 {"inputs", "context": {"data", "storage", "outputs"}, "outputs"} 结构
+
+        未拆分 inputs 字段的历史数据中，所有内容都保存在 data 字段中
+        """
+        data = codecs.loads(schedule.data)
+        if not schedule.inputs:
+            return data
+
+        inputs = codecs.loads(schedule.inputs)
+        return {
+            "inputs": inputs["inputs"],
+            "context": {
+                "data": inputs["context_data"],
+                "storage": data["storage"],
+                "outputs": data["outputs"],
+            },
+            "outputs": data["outputs"],
+        }
 
     def _set_schedule_state(self, trace_id: str, state: State):
         update_kwargs = {"state": state.value}
         if state in FINISH_STATES:
             update_kwargs["finish_at"] = now()
         try:
-            Schedule.objects.filter(trace_id=trace_id).update(**update_kwargs)
+            # 强制更新并增加版本号，使并发中的 compare-and-swap 更新失效
+            Schedule.objects.update_with_version(trace_id, **update_kwargs)
         except Exception:
             logger.exception("[execute] set schedule state error")
+            return
+        notify.publish_state(trace_id, state.value)
 
     def _plugin_finish_callback(self, plugin_cls: Plugin, plugin_callback_info: typing.Optional[PluginCallbackModel]):
         if getattr(plugin_cls.Meta, "enable_plugin_callback", False) is False or plugin_callback_info is None:
@@ -99,7 +192,91 @@ class BKPluginExecutor:
     def execute(
         self, plugin_cls: Plugin, inputs: typing.Dict[str, typing.Any], context_inputs: typing.Dict[str, typing.Any]
     ) -> ExecuteResult:
+        result, pending_schedule = self._run_execute(
+            plugin_cls=plugin_cls, inputs=inputs, context_inputs=context_inputs
+        )
+        return self._persist_schedule(result, pending_schedule)
+
+    @setup_gauge(BK_PLUGIN_EXECUTE_RUNNING_PROCESSES)
+    @setup_histogram(BK_PLUGIN_EXECUTE_TIME)
+    async def aexecute(
+        self, plugin_cls: Plugin, inputs: typing.Dict[str, typing.Any], context_inputs: typing.Dict[str, typing.Any]
+    ) -> ExecuteResult:
+        """
+        在事件循环中执行插件，异步插件直接在当前事件循环中执行，同步插件及数据库操作放到线程中执行
+        """
+        if plugin_cls.is_async():
+            result, pending_schedule = await self._arun_execute(
+                plugin_cls=plugin_cls, inputs=inputs, context_inputs=context_inputs
+            )
+        else:
+            result, pending_schedule = await sync_to_async(self._run_execute)(
+                plugin_cls=plugin_cls, inputs=inputs, context_inputs=context_inputs
+            )
+
+        if pending_schedule is None:
+            return result
+        return await sync_to_async(self._persist_schedule)(result, pending_schedule)
+
+    def _persist_schedule(
+        self, result: ExecuteResult, pending_schedule: typing.Optional[PendingSchedule]
+    ) -> ExecuteResult:
+        if pending_schedule is None:
+            return result
+
+        # create schedule model
+        try:
+            Schedule.objects.create(**pending_schedule.fields)
+            logger.info("[execute] plugin wait {}".format("poll" if result.state is State.POLL else "callback"))
+        except Exception as e:
+            logger.exception("[execute] schedule create error")
+            return ExecuteResult(state=State.FAIL, outputs=None, err="schedule create error: %s" % str(e))
+
+        return self._dispatch_first_poll(result, pending_schedule)
+
+    def _run_execute(
+        self, plugin_cls: Plugin, inputs: typing.Dict[str, typing.Any], context_inputs: typing.Dict[str, typing.Any]
+    ) -> typing.Tuple[ExecuteResult, typing.Optional[PendingSchedule]]:
+        """
+        执行插件，插件进入轮询或回调状态时返回待创建的 Schedule 数据，由调用方负责持久化及投递调度任务
+        """
+        preparation = self._prepare_execute(plugin_cls=plugin_cls, inputs=inputs, context_inputs=context_inputs)
+        if isinstance(preparation, ExecuteResult):
+            return preparation, None
+
+        # run execute method
+        try:
+            logger.info("[execute] plugin start execute")
+            call_plugin_execute(preparation.plugin, inputs=preparation.inputs, context=preparation.context)
+        except Exception as e:
+            return self._execute_error_result(plugin_cls, e), None
 
+        return self._finish_execute(plugin_cls, preparation, inputs=inputs, context_inputs=context_inputs)
+
+    async def _arun_execute(
+        self, plugin_cls: Plugin, inputs: typing.Dict[str, typing.Any], context_inputs: typing.Dict[str, typing.Any]
+    ) -> typing.Tuple[ExecuteResult, typing.Optional[PendingSchedule]]:
+        """
+        _run_execute 的异步版本，只用于 execute 为 async def 的插件
+        """
+        preparation = self._prepare_execute(plugin_cls=plugin_cls, inputs=inputs, context_inputs=context_inputs)
+        if isinstance(preparation, ExecuteResult):
+            return preparation, None
+
+        try:
+            logger.info("[execute] plugin start execute")
+            await preparation.plugin.execute(inputs=preparation.inputs, context=preparation.context)
+        except Exception as e:
+            return self._execute_error_result(plugin_cls, e), None
+
+        return self._finish_execute(plugin_cls, preparation, inputs=inputs, context_inputs=context_inputs)
+
+    def _prepare_execute(
+        self, plugin_cls: Plugin, inputs: typing.Dict[str, typing.Any], context_inputs: typing.Dict[str, typing.Any]
+    ) -> typing.Union[ExecuteResult, ExecutePreparation]:
+        """
+        校验输入并初始化插件及上下文，校验失败时返回失败的执行结果
+        """
         # user inputs validation
         input_cls = getattr(plugin_cls, "Inputs", InputsModel)
         try:
@@ -118,21 +295,29 @@ class BKPluginExecutor:
         context = Context(
             trace_id=self.trace_id, data=valid_context_inputs, state=State.EMPTY, invoke_count=1, outputs={}
         )
-        plugin = plugin_cls()
-        # run execute method
-        try:
-            logger.info("[execute] plugin start execute")
-            plugin.execute(inputs=valid_inputs, context=context)
-        except Plugin.Error as e:
+        return ExecutePreparation(plugin=plugin_cls(), inputs=valid_inputs, context=context)
+
+    def _execute_error_result(self, plugin_cls: Plugin, e: Exception) -> ExecuteResult:
+        if isinstance(e, Plugin.Error):
             BK_PLUGIN_EXECUTE_FAILED_COUNT.labels(hostname=HOSTNAME, version=plugin_cls.Meta.version).inc()
             logger.exception("[execute] plugin execute failed")
             return ExecuteResult(state=State.FAIL, outputs=None, err="plugin execute failed: %s" % str(e))
-        except Exception as e:
-            BK_PLUGIN_EXECUTE_EXCEPTION_COUNT.labels(hostname=HOSTNAME, version=plugin_cls.Meta.version).inc()
-            logger.exception("[execute] plugin execute raise unexpected error")
-            return ExecuteResult(
-                state=State.FAIL, outputs=None, err="plugin execute raise unexpected error: %s" % str(e)
-            )
+
+        BK_PLUGIN_EXECUTE_EXCEPTION_COUNT.labels(hostname=HOSTNAME, version=plugin_cls.Meta.version).inc()
+        logger.exception("[execute] plugin execute raise unexpected error")
+        return ExecuteResult(state=State.FAIL, outputs=None, err="plugin execute raise unexpected error: %s" % str(e))
+
+    def _finish_execute(
+        self,
+        plugin_cls: Plugin,
+        preparation: ExecutePreparation,
+        inputs: typing.Dict[str, typing.Any],
+        context_inputs: typing.Dict[str, typing.Any],
+    ) -> typing.Tuple[ExecuteResult, typing.Optional[PendingSchedule]]:
+        """
+        根据插件执行后的状态生成执行结果及待创建的 Schedule 数据
+        """
+        plugin, context = preparation.plugin, preparation.context
 
         # check plugin state
         if plugin.is_wating_poll:
@@ -142,59 +327,255 @@ class BKPluginExecutor:
         else:
             state = State.SUCCESS
 
-        if state in UNFINISHED_STATES:
-            # avoid user change on inputs and context.data
-            context.data = context_inputs_cls(**context_inputs)
+        result = ExecuteResult(state=state, outputs=context.outputs, err=None)
+        if state not in UNFINISHED_STATES:
+            return result, None
 
-            # prepare persistent data for schedule
-            try:
-                schedule_data = self._dump_schedule_data(
-                    inputs=inputs, context=context.schedule_context, outputs=context.outputs
+        # prepare persistent data for schedule, avoid user change on inputs and context.data
+        try:
+            context_inputs_cls = getattr(plugin_cls, "ContextInputs", ContextRequire)
+            schedule_inputs = self._dump_schedule_inputs(
+                inputs=inputs, context_data=context_inputs_cls(**context_inputs).dict()
+            )
+            schedule_data = self._dump_schedule_data(storage=context.storage, outputs=context.outputs)
+        except Exception as e:
+            logger.exception("[execute] schedule data json dumps error")
+            return (
+                ExecuteResult(state=State.FAIL, outputs=None, err="plugin context json dumps error: %s" % str(e)),
+                None,
+            )
+
+        return result, PendingSchedule(
+            fields={
+                "trace_id": self.trace_id,
+                "state": state.value,
+                "plugin_version": plugin_cls.Meta.version,
+                "inputs": schedule_inputs,
+                "data": schedule_data,
+            },
+            poll_interval=plugin.poll_interval,
+        )
+
+    def _dispatch_first_poll(self, result: ExecuteResult, pending_schedule: PendingSchedule) -> ExecuteResult:
+        """
+        Schedule 创建后为轮询状态的插件投递首次调度任务
+        """
+        if result.state is not State.POLL:
+            return result
+
+        # dispatch schedule task with schedule model
+        try:
+            task_id = current_app.tasks[self.SCHEDULE_TASK_NAME].apply_async(
+                kwargs={"trace_id": self.trace_id},
+                countdown=pending_schedule.poll_interval,
+                queue="plugin_schedule",
+            )
+        except Exception as e:
+            logger.exception("[execute] schedule task dispatch error")
+
+            # try to fix pending schedule model state when dispatch failed
+            self._set_schedule_state(trace_id=self.trace_id, state=State.FAIL)
+
+            return ExecuteResult(state=State.FAIL, outputs=None, err="schedule task dispatch error: %s" % str(e))
+
+        logger.info(
+            "[execute] task delay success, task_id: {}, count_down: {}".format(task_id, pending_schedule.poll_interval)
+        )
+        return result
+
+    @classmethod
+    def execute_batch(cls, invocations: typing.List[BatchInvocation], max_workers: int) -> typing.List[ExecuteResult]:
+        """
+        在有界线程池中并发执行多个插件调用，需要调度的插件通过一次 bulk_create 创建 Schedule
+
+        :return: 与 invocations 顺序一致的执行结果
+        """
+        if not invocations:
+            return []
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(invocations)))) as pool:
+            futures = [
+                pool.submit(
+                    _batch_run_execute,
+                    trace_id=invocation.trace_id,
+                    plugin_cls=invocation.plugin_cls,
+                    inputs=invocation.inputs,
+                    context_inputs=invocation.context_inputs,
                 )
-            except Exception as e:
-                logger.exception("[execute] schedule data json dumps error")
-                return ExecuteResult(state=State.FAIL, outputs=None, err="plugin context json dumps error: %s" % str(e))
+                for invocation in invocations
+            ]
 
-            # create schedule model
+        results = []
+        pending_schedules = {}
+        for index, future in enumerate(futures):
             try:
-                schedule = Schedule.objects.create(
-                    trace_id=self.trace_id,
-                    state=state.value,
-                    plugin_version=plugin_cls.Meta.version,
-                    data=schedule_data,
+                result, pending_schedule = future.result()
+            except Exception as e:
+                logger.exception("[execute_batch] executor execute raise error")
+                result, pending_schedule = (
+                    ExecuteResult(state=State.FAIL, outputs=None, err="executor execute raise error: %s" % str(e)),
+                    None,
                 )
+            results.append(result)
+            if pending_schedule is not None:
+                pending_schedules[index] = pending_schedule
 
-                logger.info("[execute] plugin wait {}".format("poll" if plugin.is_wating_poll else "callback"))
+        if not pending_schedules:
+            return results
 
-            except Exception as e:
-                logger.exception("[execute] schedule create error")
-                return ExecuteResult(state=State.FAIL, outputs=None, err="schedule create error: %s" % str(e))
+        try:
+            Schedule.objects.bulk_create([Schedule(**pending.fields) for pending in pending_schedules.values()])
+        except Exception as e:
+            logger.exception("[execute_batch] schedule bulk create error")
+            for index in pending_schedules:
+                results[index] = ExecuteResult(state=State.FAIL, outputs=None, err="schedule create error: %s" % str(e))
+            return results
+
+        for index, pending_schedule in pending_schedules.items():
+            results[index] = cls(trace_id=invocations[index].trace_id)._dispatch_first_poll(
+                results[index], pending_schedule
+            )
+        return results
 
-        if state is State.POLL:
-            # dispatch schedule task with schedule model
-            try:
-                task_id = current_app.tasks[self.SCHEDULE_TASK_NAME].apply_async(
-                    kwargs={"trace_id": self.trace_id},
-                    countdown=plugin.poll_interval,
-                    queue="plugin_schedule",
-                )
-            except Exception as e:
-                logger.exception("[execute] schedule task dispatch error")
+    def schedule(self, plugin_cls: Plugin, schedule: Schedule, callback_info: dict = {}):
+        """
+        执行一轮调度，worker 开启异步调度时 async def execute 插件的轮询提交到事件循环中执行，当前线程直接返回
+        """
+        # 回调在调度锁内执行，需要在当前线程中完成
+        if not callback_info and plugin_cls is not None and plugin_cls.is_async():
+            runner = async_schedule.get_async_schedule_runner()
+            if runner is not None and self._submit_async_schedule(runner, plugin_cls, schedule):
+                logger.info("[schedule] plugin schedule submitted to event loop")
+                return
+
+        applied = self._schedule(plugin_cls=plugin_cls, schedule=schedule, callback_info=callback_info)
+        if applied or not callback_info:
+            return
 
-                # try to fix pending schedule model state when dispatch failed
-                self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
+        # 回调与轮询并发执行时，回调可能因版本冲突被丢弃，而回调不会被再次投递；
+        # 仍持有调度锁，重新读取 Schedule 后基于最新数据重新执行回调
+        for retry_times in range(1, settings.SCHEDULE_CALLBACK_CAS_RETRY_TIMES + 1):
+            if not self._refresh_for_callback_retry(schedule):
+                return
+            logger.info("[schedule] callback round dropped by version conflict, retry %s" % retry_times)
+            if self._schedule(plugin_cls=plugin_cls, schedule=schedule, callback_info=callback_info):
+                return
+
+        logger.error(
+            "[schedule] callback round still conflict after %s retries, drop the callback"
+            % settings.SCHEDULE_CALLBACK_CAS_RETRY_TIMES
+        )
 
-                return ExecuteResult(state=State.FAIL, outputs=None, err="schedule task dispatch error: %s" % str(e))
+    def _refresh_for_callback_retry(self, schedule: Schedule) -> bool:
+        """
+        原地刷新 Schedule 的调度字段，调用方持有的调度锁状态（scheduling）随之更新；返回是否可以重新执行回调
+        """
+        try:
+            schedule.refresh_from_db(fields=SCHEDULE_EXECUTE_FIELDS)
+        except Exception:
+            logger.exception("[schedule] refresh schedule for callback retry error")
+            return False
 
-            logger.info(
-                "[execute] task delay success, task_id: {}, count_down: {}".format(task_id, plugin.poll_interval)
+        if schedule.state != State.CALLBACK.value:
+            logger.warning(
+                "[schedule] schedule state changed to %s by other worker, drop the callback" % schedule.state
             )
+            return False
+        return True
+
+    def _submit_async_schedule(
+        self, runner: async_schedule.AsyncScheduleRunner, plugin_cls: Plugin, schedule: Schedule
+    ) -> bool:
+        """
+        将本轮轮询提交到事件循环中执行，返回 False 时调用方需要在当前线程中执行
+        """
+        # 与本地托管的轮询一样先持久化预期结束时间（Schedule.poll_at），
+        # worker 异常退出导致事件循环中的调度丢失时由 recover_local_poll_schedule 重新投递
+        poll_at = now() + datetime.timedelta(seconds=settings.ASYNC_SCHEDULE_RECOVER_AFTER)
+        try:
+            Schedule.objects.filter(trace_id=schedule.trace_id).update(poll_at=poll_at)
+        except Exception:
+            logger.exception("[schedule] persist async schedule poll_at error, run in current thread")
+            return False
+
+        if runner.submit(functools.partial(self.aschedule, plugin_cls=plugin_cls, schedule=schedule, poll_at=poll_at)):
+            return True
 
-        return ExecuteResult(state=state, outputs=context.outputs, err=None)
+        # 事件循环已满，收回持久化的预期结束时间后在当前线程中执行
+        self._clear_held_poll_at(schedule.trace_id, poll_at)
+        return False
 
     @setup_gauge(BK_PLUGIN_SCHEDULE_RUNNING_PROCESSES)
     @setup_histogram(BK_PLUGIN_SCHEDULE_TIME)
-    def schedule(self, plugin_cls: Plugin, schedule: Schedule, callback_info: dict = {}):
+    def _schedule(self, plugin_cls: Plugin, schedule: Schedule, callback_info: dict) -> bool:
+        """
+        :return: 本轮是否处理完成，结果因版本冲突被丢弃时返回 False
+        """
+        preparation = self._prepare_schedule(plugin_cls, schedule, callback_info)
+        if preparation is None:
+            return True
+
+        # run schedule execute
+        logger.info("[schedule] run execute")
+        try:
+            call_plugin_execute(preparation.plugin, inputs=preparation.inputs, context=preparation.context)
+        except Exception as e:
+            err, unexpected_error_raise = self._schedule_error(plugin_cls, e)
+        else:
+            err, unexpected_error_raise = "", False
+
+        return self._finish_schedule(
+            plugin_cls,
+            schedule,
+            preparation,
+            err=err,
+            unexpected_error_raise=unexpected_error_raise,
+            release_schedule_lock=bool(callback_info),
+        )
+
+    @setup_gauge(BK_PLUGIN_SCHEDULE_RUNNING_PROCESSES)
+    @setup_histogram(BK_PLUGIN_SCHEDULE_TIME)
+    async def aschedule(
+        self, plugin_cls: Plugin, schedule: Schedule, poll_at: typing.Optional[datetime.datetime] = None
+    ):
+        """
+        在事件循环中执行一轮轮询调度，数据加载及更新等同步操作放到线程池中执行
+
+        :param poll_at: 提交到事件循环前持久化的 Schedule.poll_at，本轮结束时随结果一起清除
+        """
+        local.set_trace_id(self.trace_id)
+        try:
+            preparation = await async_schedule.run_sync(self._prepare_schedule, plugin_cls, schedule, {})
+            if preparation is None:
+                return
+
+            logger.info("[schedule] run execute")
+            try:
+                await preparation.plugin.execute(inputs=preparation.inputs, context=preparation.context)
+            except Exception as e:
+                err, unexpected_error_raise = self._schedule_error(plugin_cls, e)
+            else:
+                err, unexpected_error_raise = "", False
+
+            await async_schedule.run_sync(
+                self._finish_schedule,
+                plugin_cls,
+                schedule,
+                preparation,
+                err=err,
+                unexpected_error_raise=unexpected_error_raise,
+                held_poll_at=poll_at,
+            )
+        except Exception:
+            logger.exception("[schedule] executor schedule raise unexpected error")
+            await async_schedule.run_sync(self._set_schedule_state, trace_id=self.trace_id, state=State.FAIL)
+
+    def _prepare_schedule(
+        self, plugin_cls: Plugin, schedule: Schedule, callback_info: dict
+    ) -> typing.Optional[SchedulePreparation]:
+        """
+        加载调度数据并初始化插件及上下文，失败时将调度置为失败并返回 None
+        """
         # load schedule data
         logger.info("[schedule] load schedule data")
         try:
@@ -202,7 +583,7 @@ class BKPluginExecutor:
         except Exception:
             logger.exception("[schedule] schedule data load error")
             self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
-            return
+            return None
 
         # inputs validation
         logger.info("[schedule] validate inputs")
@@ -214,7 +595,7 @@ class BKPluginExecutor:
                 "[schedule] inputs load error, please make sure plugin Inputs model has not make break change"
             )
             self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
-            return
+            return None
 
         # context inputs validation
         logger.info("[schedule] validate context value")
@@ -226,65 +607,85 @@ class BKPluginExecutor:
                 "[schedule] context inputs load error, please make sure plugin ContextInputs model has not make break change"  # noqa
             )
             self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
-            return
+            return None
 
         # schedule execute prepare
         logger.info("[schedule] prepare context and plugin")
-        invoke_count = schedule.invoke_count + 1
-        execute_fail = False
-        unexpected_error_raise = False
         state = State.CALLBACK if schedule.state is State.CALLBACK.value else State.POLL
         context = Context(
             trace_id=self.trace_id,
             data=valid_context_inputs,
             state=state,
-            invoke_count=invoke_count,
+            invoke_count=schedule.invoke_count + 1,
             callback=Callback(
                 callback_id=callback_info.get("callback_id"), callback_data=callback_info.get("callback_data")
             ),
             outputs=schedule_data["context"]["outputs"],
             storage=schedule_data["context"]["storage"],
         )
-        plugin = plugin_cls()
-        err = ""
+        return SchedulePreparation(
+            plugin=plugin_cls(),
+            inputs=valid_inputs,
+            context=context,
+            schedule_data=schedule_data,
+            storage_snapshot=copy.deepcopy(context.storage),
+            outputs_snapshot=copy.deepcopy(context.outputs),
+        )
 
-        # run schedule execute
-        logger.info("[schedule] run execute")
-        try:
-            plugin.execute(inputs=valid_inputs, context=context)
-        except Plugin.Error as e:
+    def _schedule_error(self, plugin_cls: Plugin, e: Exception) -> typing.Tuple[str, bool]:
+        """
+        :return: (err, unexpected_error_raise)
+        """
+        if isinstance(e, Plugin.Error):
             BK_PLUGIN_SCHEDULE_FAILED_COUNT.labels(hostname=HOSTNAME, version=plugin_cls.Meta.version).inc()
             logger.exception("[schedule] plugin execute failed")
-            err = "plugin schedule failed: %s" % str(e)
-            execute_fail = True
-        except Exception as e:
-            BK_PLUGIN_SCHEDULE_EXCEPTION_COUNT.labels(hostname=HOSTNAME, version=plugin_cls.Meta.version).inc()
-            logger.exception("[schedule] plugin execute raise unexpected error")
-            err = "plugin schedule failed: %s" % str(e)
-            unexpected_error_raise = True
-
-        context.data = context_inputs_cls(**schedule_data["context"]["data"])
-        try:
-            schedule_data = self._dump_schedule_data(
-                inputs=schedule_data["inputs"], context=context.schedule_context, outputs=context.outputs
+            return "plugin schedule failed: %s" % str(e), False
+
+        BK_PLUGIN_SCHEDULE_EXCEPTION_COUNT.labels(hostname=HOSTNAME, version=plugin_cls.Meta.version).inc()
+        logger.exception("[schedule] plugin execute raise unexpected error")
+        return "plugin schedule failed: %s" % str(e), True
+
+    def _cas_update_schedule(self, schedule: Schedule, update_fields: dict) -> bool:
+        """
+        以读取 Schedule 时的 version 为条件更新；update_fields 是根据读取到的 Schedule 计算的，
+        版本冲突说明 Schedule 已被其他 worker 更新（推进轮次、结束或标记失败），此时放弃本轮结果，不覆盖其他 worker 的写入
+
+        :return: 是否更新成功
+        """
+        return Schedule.objects.update_with_version(schedule.trace_id, version=schedule.version, **update_fields)
+
+    def _dump_round_data(self, schedule: Schedule, preparation: SchedulePreparation) -> dict:
+        """
+        序列化本轮变化的 storage 及 outputs，返回需要写入的字段，序列化失败时抛出异常
+        """
+        context, schedule_data = preparation.context, preparation.schedule_data
+        fields = {}
+        # only storage and outputs may change during schedule, inputs and context.data are persisted once
+        # skip dumps and data rewrite when storage and outputs not change in this round
+        if (
+            not schedule.inputs
+            or context.storage != preparation.storage_snapshot
+            or context.outputs != preparation.outputs_snapshot
+        ):
+            fields["data"] = self._dump_schedule_data(storage=context.storage, outputs=context.outputs)
+        if not schedule.inputs:
+            # migrate legacy schedule which saved inputs in data field
+            fields["inputs"] = self._dump_schedule_inputs(
+                inputs=schedule_data["inputs"], context_data=schedule_data["context"]["data"]
             )
-        except Exception:
-            logger.exception("[execute] schedule data json dumps error")
-            self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
-            self._plugin_finish_callback(plugin_cls, context.plugin_callback_info)
-            return
-
-        if execute_fail:
-            update_fields = {
-                "state": State.FAIL.value,
-                "invoke_count": invoke_count,
-                "data": schedule_data,
-                "finish_at": now(),
-                "err": err,
-            }
-
-        elif unexpected_error_raise:
-            # don't save context storage and data when raise unexpected error
+        return fields
+
+    @staticmethod
+    def _round_update_fields(
+        plugin: Plugin, invoke_count: int, err: str, failed: bool
+    ) -> typing.Tuple[dict, typing.Optional[datetime.datetime]]:
+        """
+        根据插件本轮执行结果计算 Schedule 的状态字段
+
+        :return: (update_fields, poll_at)，poll_at 为由当前 worker 本地托管的下一轮轮询的预期执行时间
+        """
+        poll_at = None
+        if failed:
             update_fields = {
                 "state": State.FAIL.value,
                 "invoke_count": invoke_count,
@@ -293,46 +694,152 @@ class BKPluginExecutor:
             }
 
         elif plugin.is_wating_poll:
-            update_fields = {"state": State.POLL.value, "invoke_count": invoke_count, "data": schedule_data}
+            update_fields = {"state": State.POLL.value, "invoke_count": invoke_count}
             logger.info("[schedule] plugin wait poll")
+            local_poll_scheduler = local_poll.get_local_poll_scheduler()
+            if local_poll_scheduler is not None and local_poll_scheduler.accepts(plugin.poll_interval):
+                # 短间隔轮询由当前 worker 托管，先持久化预期执行时间以便进程退出后恢复
+                poll_at = now() + datetime.timedelta(seconds=plugin.poll_interval)
+                update_fields["poll_at"] = poll_at
 
         elif plugin.is_waiting_callback:
-            update_fields = {"state": State.CALLBACK.value, "invoke_count": invoke_count, "data": schedule_data}
+            update_fields = {"state": State.CALLBACK.value, "invoke_count": invoke_count}
             logger.info("[schedule] plugin wait callback")
 
         else:
             update_fields = {
                 "state": State.SUCCESS.value,
                 "invoke_count": invoke_count,
-                "data": schedule_data,
                 "finish_at": now(),
             }
+        return update_fields, poll_at
+
+    def _dispatch_next_poll(self, plugin: Plugin, poll_at: typing.Optional[datetime.datetime]):
+        """
+        投递下一轮轮询，poll_at 不为空时优先由当前 worker 本地托管
+        """
+        if poll_at is not None:
+            if local_poll.get_local_poll_scheduler().submit(
+                task_name=self.SCHEDULE_TASK_NAME,
+                trace_id=self.trace_id,
+                interval=plugin.poll_interval,
+                poll_at=poll_at,
+            ):
+                logger.info("[schedule] task hold by local poll scheduler, count_down: %s" % plugin.poll_interval)
+            else:
+                local_poll.dispatch_to_celery(
+                    task_name=self.SCHEDULE_TASK_NAME,
+                    trace_id=self.trace_id,
+                    poll_at=poll_at,
+                    countdown=plugin.poll_interval,
+                )
+                logger.info("[schedule] local poll scheduler unavailable, fallback to celery")
+            return
 
+        task_id = current_app.tasks[self.SCHEDULE_TASK_NAME].apply_async(
+            kwargs={"trace_id": self.trace_id},
+            countdown=plugin.poll_interval,
+            queue="plugin_schedule",
+        )
+        logger.info("[schedule] task delay success, task_id: {}, count_down: {}".format(task_id, plugin.poll_interval))
+
+    def _clear_held_poll_at(self, trace_id: str, poll_at: datetime.datetime):
+        # 清除失败时只会在超时后被重新投递一轮，由版本检查丢弃，不影响当前调度
         try:
-            Schedule.objects.filter(trace_id=schedule.trace_id).update(**update_fields)
+            Schedule.objects.claim_local_poll(trace_id, poll_at)
         except Exception:
-            logger.exception("[schedule] schedule object update error")
+            logger.exception("[schedule] clear held poll_at error")
+
+    def _finish_schedule(
+        self,
+        plugin_cls: Plugin,
+        schedule: Schedule,
+        preparation: SchedulePreparation,
+        err: str = "",
+        unexpected_error_raise: bool = False,
+        release_schedule_lock: bool = False,
+        held_poll_at: typing.Optional[datetime.datetime] = None,
+    ) -> bool:
+        """
+        根据插件本轮执行结果更新 Schedule 并投递下一轮调度
+
+        :param release_schedule_lock: 本轮在调度锁内执行（回调）时，在更新本轮结果的同时释放 Schedule.scheduling 锁
+        :param held_poll_at: 本轮执行前持久化的 Schedule.poll_at（事件循环中执行的调度），在更新本轮结果的同时清除
+        :return: 本轮是否处理完成，结果因版本冲突被丢弃时返回 False
+        """
+        plugin, context = preparation.plugin, preparation.context
+        failed = bool(err) or unexpected_error_raise
+
+        try:
+            round_data = self._dump_round_data(schedule, preparation)
+        except Exception:
+            logger.exception("[execute] schedule data json dumps error")
             self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
             self._plugin_finish_callback(plugin_cls, context.plugin_callback_info)
-            return
+            return True
+
+        update_fields, poll_at = self._round_update_fields(plugin, context.invoke_count, err, failed)
+
+        # don't save context storage and data when raise unexpected error
+        if not unexpected_error_raise:
+            update_fields.update(round_data)
+
+        # 只有持有锁的回调读取到的 scheduling 才为 True，轮询读取到的 True 属于其他正在执行的回调
+        release_schedule_lock = release_schedule_lock and schedule.scheduling is True
+        if release_schedule_lock:
+            update_fields["scheduling"] = False
+
+        if held_poll_at is not None and "poll_at" not in update_fields:
+            update_fields["poll_at"] = None
 
         try:
-            if not execute_fail and not unexpected_error_raise and plugin.is_wating_poll:
-                task_id = current_app.tasks[self.SCHEDULE_TASK_NAME].apply_async(
-                    kwargs={"trace_id": self.trace_id},
-                    countdown=plugin.poll_interval,
-                    queue="plugin_schedule",
-                )
-                logger.info(
-                    "[schedule] task delay success, task_id: {}, count_down: {}".format(task_id, plugin.poll_interval)
-                )
+            updated = self._cas_update_schedule(schedule, update_fields)
         except Exception:
-            logger.exception("[schedule] schedule task dispatch error")
-            # set failed to prevent infinity poll at caller side
+            logger.exception("[schedule] schedule object update error")
             self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
             self._plugin_finish_callback(plugin_cls, context.plugin_callback_info)
-            return
+            return True
+
+        if not updated:
+            logger.warning("[schedule] schedule has been updated by other worker, drop the result of this round")
+            if held_poll_at is not None:
+                self._clear_held_poll_at(schedule.trace_id, held_poll_at)
+            return False
+        if release_schedule_lock:
+            schedule.scheduling = False
 
-        if execute_fail or unexpected_error_raise or not (plugin.is_wating_poll or plugin.is_waiting_callback):
+        if update_fields["state"] != schedule.state:
+            notify.publish_state(schedule.trace_id, update_fields["state"])
+
+        if not failed and plugin.is_wating_poll:
+            try:
+                self._dispatch_next_poll(plugin, poll_at)
+            except Exception:
+                logger.exception("[schedule] schedule task dispatch error")
+                # set failed to prevent infinity poll at caller side
+                self._set_schedule_state(trace_id=schedule.trace_id, state=State.FAIL)
+                self._plugin_finish_callback(plugin_cls, context.plugin_callback_info)
+                return True
+
+        if failed or not (plugin.is_wating_poll or plugin.is_waiting_callback):
             self._plugin_finish_callback(plugin_cls, context.plugin_callback_info)
         logger.info("[schedule] plugin execute schedule done")
+        return True
+
+
+@setup_gauge(BK_PLUGIN_EXECUTE_RUNNING_PROCESSES)
+@setup_histogram(BK_PLUGIN_EXECUTE_TIME)
+def _batch_run_execute(
+    trace_id: str,
+    plugin_cls: Plugin,
+    inputs: typing.Dict[str, typing.Any],
+    context_inputs: typing.Dict[str, typing.Any],
+) -> typing.Tuple[ExecuteResult, typing.Optional[PendingSchedule]]:
+    local.set_trace_id(trace_id)
+    try:
+        return BKPluginExecutor(trace_id=trace_id)._run_execute(
+            plugin_cls=plugin_cls, inputs=inputs, context_inputs=context_inputs
+        )
+    finally:
+        # 关闭线程池线程中由插件代码建立的数据库连接
+        connections.close_all()
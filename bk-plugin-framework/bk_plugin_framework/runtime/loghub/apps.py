@@ -14,3 +14,16 @@ from django.apps import AppConfig
 
 class LoghubConfig(AppConfig):
     name = "bk_plugin_framework.runtime.loghub"
+
+    def ready(self):
+        from celery.signals import task_postrun, worker_process_shutdown
+        from django.core.signals import request_finished
+
+        from .celery.tasks import delete_expired_log  # noqa
+        from .log import flush_buffered_logs, request_flush_buffered_logs
+
+        # 请求或任务结束时通知带缓冲的日志处理器落库
+        request_finished.connect(request_flush_buffered_logs, dispatch_uid="bk_plugin_loghub_request_finished")
+        task_postrun.connect(request_flush_buffered_logs, dispatch_uid="bk_plugin_loghub_task_postrun")
+        # prefork 子进程退出时不会执行 atexit，同步落库剩余的日志
+        worker_process_shutdown.connect(flush_buffered_logs, dispatch_uid="bk_plugin_loghub_worker_process_shutdown")
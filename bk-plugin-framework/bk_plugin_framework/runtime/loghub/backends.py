@@ -0,0 +1,374 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import collections
+import fcntl
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import typing
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from bk_plugin_framework.envs import settings
+
+# (trace_id, logger_name, level_name, message)
+LogRecordTuple = typing.Tuple[str, str, str, str]
+
+
+class LogItem:
+    def __init__(self, id: int, trace_id: str, logger_name: str, level_name: str, message: str):
+        self.id = id
+        self.trace_id = trace_id
+        self.logger_name = logger_name
+        self.level_name = level_name
+        self.message = message
+
+
+class LogStorage:
+    """
+    trace 日志存储后端接口
+    """
+
+    def write(self, records: typing.List[LogRecordTuple]):
+        raise NotImplementedError()
+
+    def iter_items(self, trace_id: str, after_id: int = 0) -> typing.Iterator[LogItem]:
+        """
+        按写入顺序返回 trace_id 对应的 id 大于 after_id 的日志，调用方可以用最后一条日志的 id 作为游标增量拉取
+        """
+        raise NotImplementedError()
+
+    def get_plain_log(self, trace_id: str) -> str:
+        return "\n".join([item.message for item in self.iter_items(trace_id)])
+
+    def delete_expired_log(self, interval: int) -> int:
+        """
+        清理 interval 天前的日志，默认不清理
+
+        :return: 清理的数量
+        """
+        return 0
+
+
+class ORMLogStorage(LogStorage):
+    """
+    写入 LogEntry 表，默认后端
+    """
+
+    def write(self, records: typing.List[LogRecordTuple]):
+        from bk_plugin_framework.runtime.loghub.models import LogEntry
+
+        if len(records) == 1:
+            trace_id, logger_name, level_name, message = records[0]
+            LogEntry.objects.create(trace_id=trace_id, logger_name=logger_name, level_name=level_name, message=message)
+            return
+
+        LogEntry.objects.bulk_create(
+            [
+                LogEntry(trace_id=trace_id, logger_name=logger_name, level_name=level_name, message=message)
+                for trace_id, logger_name, level_name, message in records
+            ]
+        )
+
+    def iter_items(self, trace_id: str, after_id: int = 0) -> typing.Iterator[LogItem]:
+        from bk_plugin_framework.runtime.loghub.models import LogEntry
+
+        queryset = LogEntry.objects.order_by("id").filter(trace_id=trace_id)
+        if after_id:
+            queryset = queryset.filter(id__gt=after_id)
+
+        # 使用服务端游标分批读取，避免长时间运行的 trace 一次性加载全部日志
+        for le in queryset.iterator(chunk_size=settings.LOG_ITER_CHUNK_SIZE):
+            yield LogItem(
+                id=le.id,
+                trace_id=le.trace_id,
+                logger_name=le.logger_name,
+                level_name=le.level_name,
+                message=le.message,
+            )
+
+    def get_plain_log(self, trace_id: str) -> str:
+        from bk_plugin_framework.runtime.loghub.models import LogEntry
+
+        return LogEntry.objects.get_plain_log(trace_id)
+
+    def delete_expired_log(self, interval: int) -> int:
+        from bk_plugin_framework.runtime.loghub.models import LogEntry
+
+        return LogEntry.objects.delete_expired_log(interval)
+
+
+class SegmentFileLogStorage(LogStorage):
+    """
+    本地追加写分段文件存储
+
+    - 数据文件 segment-<n>.log 每行一条 json 格式的日志，写满 segment_size 后切换到下一个分段
+    - 每个 trace 有一个索引文件 traces/<xx>/<trace_id>.idx，每行为 "<segment> <offset> <length>"，
+      读取时只需读取该 trace 的索引，耗时与 trace 自身的日志数相关，与目录内的日志总数无关
+
+    日志 id 由分段序号和数据文件内偏移量组成（从 1 开始），在单个目录内单调递增；多进程写入通过目录锁文件串行化
+    """
+
+    SEGMENT_ID_SHIFT = 40
+    LOCK_FILE = ".lock"
+    TRACE_INDEX_DIR = "traces"
+    # 可以直接作为文件名的 trace_id，其他 trace_id 使用摘要作为索引文件名
+    SAFE_TRACE_ID_PATTERN = re.compile(r"^[0-9A-Za-z_-]{2,128}$")
+
+    def __init__(self, directory: str, segment_size: int):
+        self.directory = directory
+        self.segment_size = segment_size
+        os.makedirs(os.path.join(self.directory, self.TRACE_INDEX_DIR), exist_ok=True)
+
+    def _data_path(self, segment: int) -> str:
+        return os.path.join(self.directory, "segment-{:08d}.log".format(segment))
+
+    def _trace_index_path(self, trace_id: str) -> str:
+        name = trace_id
+        if not self.SAFE_TRACE_ID_PATTERN.match(name):
+            name = hashlib.sha1(trace_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, self.TRACE_INDEX_DIR, name[:2], name + ".idx")
+
+    def _segments(self) -> typing.List[int]:
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("segment-") and name.endswith(".log"):
+                segments.append(int(name[len("segment-") : -len(".log")]))
+        return sorted(segments)
+
+    def _active_segment(self) -> int:
+        segments = self._segments()
+        if not segments:
+            return 0
+
+        segment = segments[-1]
+        if os.path.getsize(self._data_path(segment)) >= self.segment_size:
+            segment += 1
+        return segment
+
+    @contextmanager
+    def _locked(self):
+        with open(os.path.join(self.directory, self.LOCK_FILE), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write(self, records: typing.List[LogRecordTuple]):
+        logged_at = now().isoformat()
+        lines = [
+            (
+                trace_id,
+                (
+                    json.dumps(
+                        {
+                            "trace_id": trace_id,
+                            "logger_name": logger_name,
+                            "level_name": level_name,
+                            "message": message,
+                            "logged_at": logged_at,
+                        }
+                    )
+                    + "\n"
+                ).encode("utf-8"),
+            )
+            for trace_id, logger_name, level_name, message in records
+        ]
+
+        with self._locked():
+            segment = self._active_segment()
+            trace_index_lines = {}
+            with open(self._data_path(segment), "ab") as data_file:
+                offset = data_file.tell()
+                for trace_id, line in lines:
+                    data_file.write(line)
+                    trace_index_lines.setdefault(trace_id, []).append("{} {} {}\n".format(segment, offset, len(line)))
+                    offset += len(line)
+
+            # 数据落盘后再写索引，读取方不会读到指向不完整数据的索引
+            for trace_id, index_lines in trace_index_lines.items():
+                index_path = self._trace_index_path(trace_id)
+                os.makedirs(os.path.dirname(index_path), exist_ok=True)
+                with open(index_path, "a", encoding="utf-8") as index_file:
+                    index_file.write("".join(index_lines))
+
+    def _iter_index(self, trace_id: str) -> typing.Iterator[typing.Tuple[int, int, int]]:
+        try:
+            index_file = open(self._trace_index_path(trace_id), encoding="utf-8")
+        except FileNotFoundError:
+            return
+
+        with index_file:
+            for line in index_file:
+                # 忽略正在写入的不完整索引行
+                if not line.endswith("\n"):
+                    break
+                segment, offset, length = line.split()
+                yield int(segment), int(offset), int(length)
+
+    def iter_items(self, trace_id: str, after_id: int = 0) -> typing.Iterator[LogItem]:
+        positions = collections.OrderedDict()
+        for segment, offset, length in self._iter_index(trace_id):
+            if (segment << self.SEGMENT_ID_SHIFT) + offset + 1 > after_id:
+                positions.setdefault(segment, []).append((offset, length))
+
+        for segment, segment_positions in positions.items():
+            try:
+                data_file = open(self._data_path(segment), "rb")
+            except FileNotFoundError:
+                # 分段已过期被清理
+                continue
+
+            segment_base_id = segment << self.SEGMENT_ID_SHIFT
+            with data_file:
+                for offset, length in segment_positions:
+                    data_file.seek(offset)
+                    record = json.loads(data_file.read(length).decode("utf-8"))
+                    yield LogItem(
+                        id=segment_base_id + offset + 1,
+                        trace_id=record["trace_id"],
+                        logger_name=record["logger_name"],
+                        level_name=record["level_name"],
+                        message=record["message"],
+                    )
+
+    def delete_expired_log(self, interval: int) -> int:
+        """
+        删除最后写入时间早于 interval 天前的分段及 trace 索引，最新的分段始终保留以保证分段序号及日志 id 单调递增
+        """
+        expired_at = time.time() - interval * 24 * 60 * 60
+        deleted = 0
+        with self._locked():
+            for segment in self._segments()[:-1]:
+                data_path = self._data_path(segment)
+                if os.path.getmtime(data_path) < expired_at:
+                    os.remove(data_path)
+                    deleted += 1
+
+            for root, _, files in os.walk(os.path.join(self.directory, self.TRACE_INDEX_DIR)):
+                for name in files:
+                    index_path = os.path.join(root, name)
+                    if os.path.getmtime(index_path) < expired_at:
+                        os.remove(index_path)
+        return deleted
+
+
+class RingBufferLogStorage(LogStorage):
+    """
+    进程内有界环形缓冲，只保留最近 capacity 条及 retention_days 天内的日志，仅适用于开发调试
+
+    每个 trace 的日志另外按 trace_id 分组保存，读取时不需要遍历整个缓冲
+    """
+
+    def __init__(self, capacity: int, retention_days: typing.Optional[int] = None):
+        self.capacity = capacity
+        self.retention_days = retention_days
+        # (写入时间, LogItem)
+        self._items = collections.deque()
+        self._trace_items = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def _evict_oldest(self):
+        _, item = self._items.popleft()
+        trace_items = self._trace_items[item.trace_id]
+        trace_items.popleft()
+        if not trace_items:
+            del self._trace_items[item.trace_id]
+
+    def _evict_expired(self, interval: int) -> int:
+        expired_at = time.time() - interval * 24 * 60 * 60
+        evicted = 0
+        while self._items and self._items[0][0] < expired_at:
+            self._evict_oldest()
+            evicted += 1
+        return evicted
+
+    def write(self, records: typing.List[LogRecordTuple]):
+        logged_at = time.time()
+        with self._lock:
+            # 缓冲只存在于当前进程，清理任务无法清理其他进程的缓冲，因此在写入时清理过期的日志
+            if self.retention_days is not None:
+                self._evict_expired(self.retention_days)
+
+            for trace_id, logger_name, level_name, message in records:
+                if len(self._items) >= self.capacity:
+                    self._evict_oldest()
+                item = LogItem(
+                    id=self._next_id,
+                    trace_id=trace_id,
+                    logger_name=logger_name,
+                    level_name=level_name,
+                    message=message,
+                )
+                self._items.append((logged_at, item))
+                self._trace_items.setdefault(trace_id, collections.deque()).append(item)
+                self._next_id += 1
+
+    def iter_items(self, trace_id: str, after_id: int = 0) -> typing.Iterator[LogItem]:
+        with self._lock:
+            items = [item for item in self._trace_items.get(trace_id, ()) if item.id > after_id]
+        yield from items
+
+    def delete_expired_log(self, interval: int) -> int:
+        with self._lock:
+            return self._evict_expired(interval)
+
+
+def _build_orm_storage() -> LogStorage:
+    return ORMLogStorage()
+
+
+def _build_file_storage() -> LogStorage:
+    return SegmentFileLogStorage(
+        directory=settings.LOG_STORAGE_FILE_DIR or os.path.join(tempfile.gettempdir(), "bk_plugin_logs"),
+        segment_size=settings.LOG_STORAGE_FILE_SEGMENT_SIZE,
+    )
+
+
+def _build_memory_storage() -> LogStorage:
+    return RingBufferLogStorage(
+        capacity=settings.LOG_STORAGE_MEMORY_CAPACITY, retention_days=settings.LOG_PERSISTENT_DAYS
+    )
+
+
+STORAGE_BUILDERS = {
+    "orm": _build_orm_storage,
+    "file": _build_file_storage,
+    "memory": _build_memory_storage,
+}
+
+
+@lru_cache(maxsize=None)
+def get_log_storage() -> LogStorage:
+    """
+    根据 LOG_STORAGE_BACKEND 配置获取日志存储后端，支持 orm/file/memory 或自定义 LogStorage 子类的导入路径
+    """
+    backend = settings.LOG_STORAGE_BACKEND
+    builder = STORAGE_BUILDERS.get(backend)
+    if builder is not None:
+        return builder()
+
+    try:
+        storage_cls = import_string(backend)
+    except ImportError:
+        raise RuntimeError("unknown loghub storage backend: {}".format(backend))
+
+    return storage_cls()
@@ -0,0 +1,26 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+
+from celery import shared_task
+
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.runtime.loghub.backends import get_log_storage
+
+logger = logging.getLogger("bk_plugin")
+
+
+@shared_task(ignore_result=True)
+def delete_expired_log():
+    logger.info("[delete_expired_log] start to delete expire log")
+    rows = get_log_storage().delete_expired_log(settings.LOG_PERSISTENT_DAYS)
+    logger.info("[delete_expired_log] delete {} rows".format(rows))
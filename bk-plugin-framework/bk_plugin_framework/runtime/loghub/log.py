@@ -9,25 +9,188 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import atexit
 import logging
+import os
+import sys
+import threading
+import traceback
+import typing
 from logging import LogRecord
 
 from django.core.exceptions import AppRegistryNotReady
+from django.db import close_old_connections
 
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.runtime.loghub.backends import get_log_storage
 from bk_plugin_framework.utils import local
 
 
 class TraceContextLogHandler(logging.Handler):
     def emit(self, record: LogRecord):
+        trace_id = local.get_trace_id()
+        if trace_id is None:
+            return
+
         try:
-            from bk_plugin_framework.runtime.loghub.models import LogEntry
+            get_log_storage().write([(trace_id, record.name, record.levelname, self.format(record))])
         except AppRegistryNotReady:
             return
 
+
+_BUFFERED_HANDLERS = []
+_BUFFERED_HANDLERS_LOCK = threading.Lock()
+
+
+class BufferedTraceContextLogHandler(logging.Handler):
+    """
+    带缓冲的 trace 日志处理器，日志先写入内存队列，由后台线程通过 bulk_create 批量落库
+
+    触发落库的时机：
+    1. 缓冲的日志条数达到 capacity
+    2. 距离上次落库超过 flush_interval 秒
+    3. 请求或 celery 任务结束时（见 LoghubConfig.ready）
+    4. 进程退出时，celery prefork 子进程退出时不会执行 atexit，通过 worker_process_shutdown 信号同步落库
+
+    后台线程在首次写入日志时启动；fork 出的子进程（celery prefork、gunicorn --preload）不会继承父进程的线程，
+    子进程中会重新初始化缓冲区并在首次写入时启动自己的后台线程
+    """
+
+    def __init__(
+        self,
+        capacity: typing.Optional[int] = None,
+        flush_interval: typing.Optional[float] = None,
+        level: int = logging.NOTSET,
+    ):
+        super().__init__(level=level)
+        self.capacity = capacity or settings.LOG_BUFFER_CAPACITY
+        self.flush_interval = flush_interval or settings.LOG_BUFFER_FLUSH_INTERVAL
+        self._closed = False
+        self._reset()
+
+        with _BUFFERED_HANDLERS_LOCK:
+            _BUFFERED_HANDLERS.append(self)
+
+    def _reset(self):
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flusher_lock = threading.Lock()
+        self._flusher = None
+
+    def _after_fork_in_child(self):
+        # 父进程缓冲中的日志由父进程落库，锁可能在 fork 时被父进程的其他线程持有，全部重新初始化
+        self._reset()
+
+    def _ensure_flusher(self):
+        if self._flusher is not None or self._closed:
+            return
+
+        with self._flusher_lock:
+            if self._flusher is None:
+                flusher = threading.Thread(target=self._flush_loop, name="bk_plugin_log_flusher", daemon=True)
+                flusher.start()
+                self._flusher = flusher
+
+    def emit(self, record: LogRecord):
         trace_id = local.get_trace_id()
         if trace_id is None:
             return
 
-        LogEntry.objects.create(
-            trace_id=trace_id, logger_name=record.name, level_name=record.levelname, message=self.format(record)
-        )
+        self._ensure_flusher()
+        try:
+            entry = (trace_id, record.name, record.levelname, self.format(record))
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._buffer_lock:
+            self._buffer.append(entry)
+            buffer_full = len(self._buffer) >= self.capacity
+
+        if buffer_full:
+            self._flush_event.set()
+
+    def request_flush(self):
+        """
+        通知后台线程尽快落库，不阻塞调用方
+        """
+        self._ensure_flusher()
+        self._flush_event.set()
+
+    def flush(self):
+        """
+        在当前线程同步落库
+        """
+        with self._buffer_lock:
+            entries, self._buffer = self._buffer, []
+
+        if not entries:
+            return
+
+        try:
+            get_log_storage().write(entries)
+        except AppRegistryNotReady:
+            return
+        except Exception:
+            # 不能通过 logging 记录落库失败，避免递归
+            sys.stderr.write("[BufferedTraceContextLogHandler] drop {} log entries: \n".format(len(entries)))
+            traceback.print_exc(file=sys.stderr)
+
+    def close(self):
+        with _BUFFERED_HANDLERS_LOCK:
+            if self in _BUFFERED_HANDLERS:
+                _BUFFERED_HANDLERS.remove(self)
+
+        self._closed = True
+        self._flush_event.set()
+        with self._flusher_lock:
+            flusher = self._flusher
+        if flusher is not None:
+            flusher.join(timeout=self.flush_interval * 2)
+        self.flush()
+        super().close()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._flush_event.wait(timeout=self.flush_interval)
+            self._flush_event.clear()
+            if self._closed:
+                break
+
+            close_old_connections()
+            self.flush()
+
+
+def request_flush_buffered_logs(*args, **kwargs):
+    """
+    通知所有带缓冲的日志处理器落库，可以直接作为 django/celery 的信号处理函数
+    """
+    with _BUFFERED_HANDLERS_LOCK:
+        handlers = list(_BUFFERED_HANDLERS)
+
+    for handler in handlers:
+        handler.request_flush()
+
+
+@atexit.register
+def flush_buffered_logs(*args, **kwargs):
+    """
+    在当前线程同步落库所有带缓冲的日志处理器，可以直接作为 celery 的信号处理函数
+    """
+    with _BUFFERED_HANDLERS_LOCK:
+        handlers = list(_BUFFERED_HANDLERS)
+
+    for handler in handlers:
+        handler.flush()
+
+
+def _after_fork_in_child():
+    global _BUFFERED_HANDLERS_LOCK
+    _BUFFERED_HANDLERS_LOCK = threading.Lock()
+    for handler in _BUFFERED_HANDLERS:
+        handler._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -10,11 +10,34 @@ specific language governing permissions and limitations under the License.
 """
 
 from django.db import models
+from django.utils import timezone
+
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.metrics import (
+    BK_PLUGIN_EXPIRED_DATA_DELETED_COUNT,
+    HOSTNAME,
+)
+from bk_plugin_framework.utils.db import delete_in_chunks
 
 
 class LogEntryManager(models.Manager):
     def get_plain_log(self, trace_id: str) -> str:
-        return "\n".join([le.message for le in self.order_by("id").filter(trace_id=trace_id).only("message")])
+        messages = self.order_by("id").filter(trace_id=trace_id).values_list("message", flat=True)
+        return "\n".join(messages.iterator())
+
+    def delete_expired_log(self, interval: int) -> int:
+        """
+        按主键分批清理过期的日志
+        :param interval:
+        :return: count
+        """
+        expired_date = timezone.now() + timezone.timedelta(days=(-interval))
+        return delete_in_chunks(
+            self.filter(logged_at__lt=expired_date),
+            chunk_size=settings.EXPIRED_DELETE_CHUNK_SIZE,
+            interval=settings.EXPIRED_DELETE_CHUNK_INTERVAL,
+            progress_callback=BK_PLUGIN_EXPIRED_DATA_DELETED_COUNT.labels(model="log_entry", hostname=HOSTNAME).inc,
+        )
 
 
 class LogEntry(models.Model):
@@ -16,4 +16,23 @@ class ScheduleConfig(AppConfig):
     name = "bk_plugin_framework.runtime.schedule"
 
     def ready(self):
-        from .celery.tasks import delete_expired_schedule, schedule  # noqa
+        from celery.signals import worker_process_shutdown, worker_shutdown
+
+        from .async_schedule import shutdown_async_schedule_runner
+        from .celery.tasks import (  # noqa
+            delete_expired_schedule,
+            recover_local_poll_schedule,
+            schedule,
+        )
+        from .local_poll import shutdown_local_poll_scheduler
+
+        # worker 退出时将本地托管的轮询交还给 Celery
+        worker_shutdown.connect(shutdown_local_poll_scheduler, dispatch_uid="bk_plugin_local_poll_worker_shutdown")
+        worker_process_shutdown.connect(
+            shutdown_local_poll_scheduler, dispatch_uid="bk_plugin_local_poll_worker_process_shutdown"
+        )
+        # worker 退出时等待事件循环中正在执行的调度结束
+        worker_shutdown.connect(shutdown_async_schedule_runner, dispatch_uid="bk_plugin_async_schedule_worker_shutdown")
+        worker_process_shutdown.connect(
+            shutdown_async_schedule_runner, dispatch_uid="bk_plugin_async_schedule_worker_process_shutdown"
+        )
@@ -0,0 +1,157 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import asyncio
+import atexit
+import functools
+import logging
+import os
+import threading
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.db import close_old_connections
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:
+    # Django 3.0 之前不依赖 asgiref，未安装时不能开启异步调度
+    sync_to_async = None
+
+from bk_plugin_framework.envs import settings
+
+logger = logging.getLogger("bk_plugin")
+
+
+class AsyncScheduleRunner:
+    """
+    worker 进程内的事件循环，并发执行 execute 为 async def 的插件的轮询
+
+    同时执行的调度数达到 concurrency 时不再接收新的调度，由调用方在当前线程中同步执行；
+    调度中的数据库操作通过 run_sync 放到事件循环的线程池中执行
+    """
+
+    def __init__(self, concurrency: int, threads: int):
+        self.concurrency = concurrency
+        self.threads = threads
+        self._pid = None
+        self._stopped = False
+        self._running = 0
+        self._cond = threading.Condition()
+        self._loop = None
+        self._loop_thread = None
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def submit(self, coroutine_func: typing.Callable[[], typing.Awaitable]) -> bool:
+        """
+        在事件循环中执行 coroutine_func()，返回 False 时调用方需要自行执行
+        """
+        with self._cond:
+            if self._stopped or self._running >= self.concurrency:
+                return False
+            self._ensure_started()
+            self._running += 1
+
+        asyncio.run_coroutine_threadsafe(self._run(coroutine_func), self._loop)
+        return True
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+
+        # fork 后的子进程中需要重新创建事件循环及线程
+        self._running = 0
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="bk_plugin_async_schedule")
+        )
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever, name="bk_plugin_async_schedule_loop", daemon=True
+        )
+        self._loop_thread.start()
+        self._pid = pid
+
+    async def _run(self, coroutine_func: typing.Callable[[], typing.Awaitable]):
+        try:
+            await coroutine_func()
+        except Exception:
+            logger.exception("[async_schedule] run schedule error")
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._cond.notify_all()
+
+    def shutdown(self, timeout: typing.Optional[float] = None) -> bool:
+        """
+        停止接收新的调度并等待正在执行的调度结束，返回是否全部执行完成
+        """
+        with self._cond:
+            self._stopped = True
+            if self._pid != os.getpid():
+                return True
+            finished = self._cond.wait_for(lambda: self._running == 0, timeout=timeout)
+
+        if not finished:
+            logger.error("[async_schedule] %s schedules still running when shutdown" % self._running)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        return finished
+
+
+async def run_sync(func: typing.Callable, *args, **kwargs):
+    """
+    在事件循环的线程池中执行同步函数，如数据库操作
+    """
+
+    @functools.wraps(func)
+    def _func(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return await sync_to_async(_func, thread_sensitive=False)(*args, **kwargs)
+
+
+@lru_cache(maxsize=None)
+def get_async_schedule_runner() -> typing.Optional[AsyncScheduleRunner]:
+    """
+    获取当前进程的异步调度执行器，未开启时返回 None
+    """
+    if not settings.ASYNC_SCHEDULE_ENABLED:
+        return None
+
+    if sync_to_async is None:
+        raise RuntimeError("async schedule require package asgiref installed")
+
+    runner = AsyncScheduleRunner(
+        concurrency=settings.ASYNC_SCHEDULE_CONCURRENCY, threads=settings.ASYNC_SCHEDULE_THREADS
+    )
+    atexit.register(runner.shutdown, settings.ASYNC_SCHEDULE_SHUTDOWN_TIMEOUT)
+    return runner
+
+
+def shutdown_async_schedule_runner(*args, **kwargs):
+    """
+    worker 退出时等待事件循环中正在执行的调度结束，可作为信号接收函数使用
+    """
+    if get_async_schedule_runner.cache_info().currsize == 0:
+        return
+
+    runner = get_async_schedule_runner()
+    if runner is not None:
+        runner.shutdown(settings.ASYNC_SCHEDULE_SHUTDOWN_TIMEOUT)
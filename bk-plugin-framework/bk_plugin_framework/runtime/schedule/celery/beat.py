@@ -12,10 +12,22 @@ specific language governing permissions and limitations under the License.
 from celery.schedules import crontab
 
 SCHEDULE = {
+    # execute every minute
+    "recover_local_poll_schedule": {
+        "task": "bk_plugin_framework.runtime.schedule.celery.tasks.recover_local_poll_schedule",
+        "schedule": crontab(),
+        "options": {"queue": "plugin_schedule"},
+    },
     # execute every day at 00:00(UTC)
     "delete_expired_schedule": {
         "task": "bk_plugin_framework.runtime.schedule.celery.tasks.delete_expired_schedule",
         "schedule": crontab(minute=0, hour=0),
         "options": {"queue": "schedule_delete"},
     },
+    # execute every day at 00:30(UTC)
+    "delete_expired_log": {
+        "task": "bk_plugin_framework.runtime.loghub.celery.tasks.delete_expired_log",
+        "schedule": crontab(minute=30, hour=0),
+        "options": {"queue": "schedule_delete"},
+    },
 }
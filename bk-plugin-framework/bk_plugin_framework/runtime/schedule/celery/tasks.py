@@ -9,15 +9,18 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import datetime
 import logging
 
 from celery import shared_task
 from django.db import InterfaceError, OperationalError
+from django.utils.timezone import now
 
 from bk_plugin_framework.envs import settings
 from bk_plugin_framework.hub import VersionHub
 from bk_plugin_framework.kit import State
 from bk_plugin_framework.runtime.executor import BKPluginExecutor
+from bk_plugin_framework.runtime.schedule import local_poll
 from bk_plugin_framework.runtime.schedule.models import Schedule
 from bk_plugin_framework.utils import local
 
@@ -29,7 +32,8 @@ TRANSIENT_DB_EXC = (OperationalError, InterfaceError)
 
 def _set_schedule_state(trace_id: str, state: State):
     try:
-        Schedule.objects.filter(trace_id=trace_id).update(state=state.value)
+        # 增加版本号，使并发中的 compare-and-swap 更新失效，避免失败状态被覆盖
+        Schedule.objects.update_with_version(trace_id, state=state.value)
     except Exception:
         logger.exception("[execute] set schedule state error")
 
@@ -39,7 +43,7 @@ def schedule(self, trace_id: str):
     local.set_trace_id(trace_id)
 
     try:
-        schedule = Schedule.objects.get(trace_id=trace_id)
+        schedule = Schedule.objects.get_for_execute(trace_id=trace_id)
     except TRANSIENT_DB_EXC as exc:
         # DB 瞬时不可达：重试本次轮询而非判失败，避免误杀运行中的插件；重试用尽才兜底置失败
         if self.request.retries >= self.max_retries:
@@ -60,7 +64,7 @@ def schedule(self, trace_id: str):
         _set_schedule_state(trace_id=trace_id, state=State.FAIL)
         return
 
-    plugin_cls = VersionHub.all_plugins().get(schedule.plugin_version)
+    plugin_cls = VersionHub.get(schedule.plugin_version)
     if not plugin_cls:
         logger.error("[schedule_task] can not find plugin class for version %s" % schedule.plugin_version)
         _set_schedule_state(trace_id=trace_id, state=State.FAIL)
@@ -79,3 +83,26 @@ def delete_expired_schedule():
     logger.info("[delete_expired_schedule] start to delete expire schedule")
     rows = Schedule.objects.delete_expired_schedule(settings.SCHEDULE_PERSISTENT_DAYS)
     logger.info("[delete_expired_schedule] delete {} rows".format(rows))
+
+
+@shared_task(ignore_result=True)
+def recover_local_poll_schedule():
+    """
+    将 worker 本地托管但超时未执行（如进程异常退出）的轮询，以及事件循环中超时未结束的调度重新投递到 Celery
+    """
+    expired_at = now() - datetime.timedelta(seconds=settings.LOCAL_POLL_RECOVER_GRACE)
+    pending = Schedule.objects.filter(state=State.POLL.value, poll_at__lt=expired_at).values_list(
+        "trace_id", "poll_at"
+    )[: settings.LOCAL_POLL_RECOVER_BATCH_SIZE]
+
+    recovered = 0
+    for trace_id, poll_at in pending:
+        try:
+            recovered += local_poll.dispatch_to_celery(
+                task_name=BKPluginExecutor.SCHEDULE_TASK_NAME, trace_id=trace_id, poll_at=poll_at
+            )
+        except Exception:
+            logger.exception("[recover_local_poll_schedule] recover schedule %s failed" % trace_id)
+
+    if recovered:
+        logger.info("[recover_local_poll_schedule] recover {} schedules".format(recovered))
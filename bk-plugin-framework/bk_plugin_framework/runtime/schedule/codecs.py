@@ -0,0 +1,183 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import base64
+import json
+from functools import lru_cache
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from bk_plugin_framework.envs import settings
+
+# 二进制编码的 Schedule.data 格式为: TAGGED_PREFIX + 编码版本号(1 个字符) + base64(payload)，只有压缩后的数据使用该格式
+# 未带前缀的数据为 json 文本，新旧数据可以同时存在
+TAGGED_PREFIX = "#"
+
+
+class Codec:
+    """
+    Schedule.data 编解码器
+
+    tag 为写入数据时的编码版本号，为 None 时表示直接以 json 文本存储
+    """
+
+    tag = None
+
+    def dumps(self, data: dict) -> bytes:
+        raise NotImplementedError()
+
+    def loads(self, payload: bytes) -> dict:
+        raise NotImplementedError()
+
+
+class JSONCodec(Codec):
+    def dumps(self, data: dict) -> bytes:
+        return json.dumps(data).encode("utf-8")
+
+    def loads(self, payload: bytes) -> dict:
+        return json.loads(payload)
+
+
+class ORJSONCodec(Codec):
+    def dumps(self, data: dict) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, payload: bytes) -> dict:
+        try:
+            return orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            # 兼容 json.dumps 写入的 NaN/Infinity 等非标准 json 值
+            return json.loads(payload)
+
+
+class MsgpackCodec(Codec):
+    # 只用于解码历史数据，新写入的未压缩数据不再使用该格式
+    tag = "1"
+
+    def dumps(self, data: dict) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, payload: bytes) -> dict:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+class ZstdCodec(Codec):
+    """
+    对内部编码器的输出进行 zstd 压缩
+    """
+
+    def __init__(self, tag: str, inner: Codec):
+        self.tag = tag
+        self.inner = inner
+
+    def compress(self, payload: bytes) -> bytes:
+        return zstandard.ZstdCompressor().compress(payload)
+
+    def dumps(self, data: dict) -> bytes:
+        return self.compress(self.inner.dumps(data))
+
+    def loads(self, payload: bytes) -> dict:
+        return self.inner.loads(zstandard.ZstdDecompressor().decompress(payload))
+
+
+JSON_CODEC = JSONCodec()
+ORJSON_CODEC = ORJSONCodec()
+MSGPACK_CODEC = MsgpackCodec()
+
+# 编码版本号一经分配不可修改，否则历史数据将无法解码
+TAGGED_CODECS = {
+    MSGPACK_CODEC.tag: MSGPACK_CODEC,
+    "2": ZstdCodec(tag="2", inner=MSGPACK_CODEC),
+    "3": ZstdCodec(tag="3", inner=JSON_CODEC),
+    "4": ZstdCodec(tag="4", inner=ORJSON_CODEC),
+}
+
+CODEC_REQUIREMENTS = {
+    "json": (JSON_CODEC, None, "3"),
+    "orjson": (ORJSON_CODEC, orjson, "4"),
+    "msgpack": (MSGPACK_CODEC, msgpack, "2"),
+}
+
+
+class ScheduleDataSerializer:
+    """
+    根据配置编码 Schedule.data，解码时根据数据自身的编码版本号选择解码器
+    """
+
+    def __init__(self, codec: str, compress: bool, compress_threshold: int):
+        if codec not in CODEC_REQUIREMENTS:
+            raise RuntimeError("unknown schedule data codec: {}".format(codec))
+
+        plain_codec, requirement, compressed_tag = CODEC_REQUIREMENTS[codec]
+        if codec != "json" and requirement is None:
+            raise RuntimeError("schedule data codec {} require package {} installed".format(codec, codec))
+        if compress and zstandard is None:
+            raise RuntimeError("schedule data compression require package zstandard installed")
+
+        # 未压缩的数据以 json 文本存储，base64 会带来约 1/3 的膨胀，未压缩的 msgpack 编码后通常比 json 更大，
+        # 因此 msgpack 只用于压缩前的编码，带版本号的二进制格式只在压缩时使用
+        self.plain_codec = plain_codec if plain_codec.tag is None else JSON_CODEC
+        self.compressed_codec = TAGGED_CODECS[compressed_tag] if compress else None
+        self.compress_threshold = compress_threshold
+
+    def dumps(self, data: dict) -> str:
+        payload = self.plain_codec.dumps(data)
+
+        # 只压缩超过阈值的数据，小数据压缩收益不足以抵消 base64 的膨胀
+        if self.compressed_codec is None or len(payload) < self.compress_threshold:
+            return payload.decode("utf-8")
+
+        if self.compressed_codec.inner is self.plain_codec:
+            payload = self.compressed_codec.compress(payload)
+        else:
+            payload = self.compressed_codec.dumps(data)
+
+        return TAGGED_PREFIX + self.compressed_codec.tag + base64.b64encode(payload).decode("ascii")
+
+    def loads(self, data: str) -> dict:
+        if not data.startswith(TAGGED_PREFIX):
+            return self.plain_codec.loads(data)
+
+        codec = TAGGED_CODECS.get(data[len(TAGGED_PREFIX)])
+        if codec is None:
+            raise ValueError("unknown schedule data codec tag: {}".format(data[: len(TAGGED_PREFIX) + 1]))
+
+        return codec.loads(base64.b64decode(data[len(TAGGED_PREFIX) + 1 :]))
+
+
+@lru_cache(maxsize=None)
+def get_schedule_data_serializer() -> ScheduleDataSerializer:
+    return ScheduleDataSerializer(
+        codec=settings.SCHEDULE_DATA_CODEC,
+        compress=settings.SCHEDULE_DATA_COMPRESS,
+        compress_threshold=settings.SCHEDULE_DATA_COMPRESS_THRESHOLD,
+    )
+
+
+def dumps(data: dict) -> str:
+    return get_schedule_data_serializer().dumps(data)
+
+
+def loads(data: str) -> dict:
+    return get_schedule_data_serializer().loads(data)
@@ -0,0 +1,244 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import atexit
+import datetime
+import logging
+import math
+import os
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from celery import current_app
+from django.db import close_old_connections
+
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.runtime.schedule.models import Schedule
+
+logger = logging.getLogger("bk_plugin")
+
+SCHEDULE_QUEUE = "plugin_schedule"
+
+
+class PollEntry(typing.NamedTuple):
+    task_name: str
+    trace_id: str
+    poll_at: datetime.datetime
+    deadline: float
+
+
+class TimerWheel:
+    """
+    单层哈希时间轮，只接收在一圈之内到期的定时项
+    """
+
+    def __init__(self, tick: float, slots: int):
+        self.tick = tick
+        self.slots = slots
+        self._buckets = [[] for _ in range(slots)]
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def accepts(self, delay: float) -> bool:
+        return self._ticks(delay) < self.slots
+
+    def _ticks(self, delay: float) -> int:
+        return max(1, math.ceil(delay / self.tick))
+
+    def add(self, delay: float, item: typing.Any) -> bool:
+        ticks = self._ticks(delay)
+        if ticks >= self.slots:
+            return False
+
+        with self._lock:
+            self._buckets[(self._cursor + ticks) % self.slots].append(item)
+        return True
+
+    def advance(self) -> list:
+        """
+        时间轮前进一格，返回到期的定时项
+        """
+        with self._lock:
+            self._cursor = (self._cursor + 1) % self.slots
+            due = self._buckets[self._cursor]
+            self._buckets[self._cursor] = []
+        return due
+
+    def drain(self) -> list:
+        """
+        取出时间轮中所有未到期的定时项
+        """
+        with self._lock:
+            items = [item for bucket in self._buckets for item in bucket]
+            self._buckets = [[] for _ in range(self.slots)]
+        return items
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(bucket) for bucket in self._buckets)
+
+
+def dispatch_to_celery(task_name: str, trace_id: str, poll_at: datetime.datetime, countdown: float = 0) -> bool:
+    """
+    认领本地托管的轮询并投递到 Celery，返回是否投递成功，认领失败说明该轮询已被执行或投递
+    """
+    if not Schedule.objects.claim_local_poll(trace_id, poll_at):
+        return False
+
+    current_app.tasks[task_name].apply_async(
+        kwargs={"trace_id": trace_id},
+        countdown=max(0, math.ceil(countdown)),
+        queue=SCHEDULE_QUEUE,
+    )
+    return True
+
+
+class LocalPollScheduler:
+    """
+    worker 进程内的短间隔轮询调度器
+
+    插件轮询状态在托管前已经持久化（Schedule.poll_at），到期时先认领再直接在当前进程中执行调度，
+    进程退出时将未到期的轮询交还给 Celery；进程异常退出未能交还的轮询由 recover_local_poll_schedule 定时任务恢复
+    """
+
+    def __init__(self, max_interval: float, tick: float, threads: int):
+        self.max_interval = max_interval
+        self.wheel = TimerWheel(tick=tick, slots=math.ceil(max_interval / tick) + 1)
+        self.threads = threads
+        self._pid = None
+        self._stopped = threading.Event()
+        self._start_lock = threading.Lock()
+        self._timer_thread = None
+        self._pool = None
+
+    def accepts(self, interval: float) -> bool:
+        return interval <= self.max_interval and self.wheel.accepts(interval)
+
+    def submit(self, task_name: str, trace_id: str, interval: float, poll_at: datetime.datetime) -> bool:
+        """
+        托管一次轮询，返回 False 时调用方需要自行投递到 Celery
+        """
+        if not self.accepts(interval) or not self._ensure_started():
+            return False
+
+        entry = PollEntry(task_name=task_name, trace_id=trace_id, poll_at=poll_at, deadline=time.monotonic() + interval)
+        return self.wheel.add(interval, entry)
+
+    def _ensure_started(self) -> bool:
+        if self._stopped.is_set():
+            return False
+
+        pid = os.getpid()
+        if self._pid == pid:
+            return True
+
+        with self._start_lock:
+            if self._pid != pid:
+                # fork 后的子进程中需要重新创建线程
+                self.wheel.drain()
+                self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="bk_plugin_local_poll")
+                self._timer_thread = threading.Thread(target=self._run, name="bk_plugin_local_poll_timer", daemon=True)
+                self._timer_thread.start()
+                self._pid = pid
+        return True
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            next_tick += self.wheel.tick
+            wait = next_tick - time.monotonic()
+            if wait > 0 and self._stopped.wait(wait):
+                break
+
+            for entry in self.wheel.advance():
+                try:
+                    self._pool.submit(self._execute, entry)
+                except RuntimeError:
+                    # 线程池已关闭，交由 shutdown 或恢复任务处理
+                    self.wheel.add(0, entry)
+
+    def _execute(self, entry: PollEntry):
+        close_old_connections()
+        try:
+            try:
+                claimed = Schedule.objects.claim_local_poll(entry.trace_id, entry.poll_at)
+            except Exception:
+                # 认领失败的轮询仍保留 poll_at，会被恢复任务重新投递
+                logger.exception("[local_poll] claim schedule %s failed" % entry.trace_id)
+                return
+
+            if not claimed:
+                logger.info("[local_poll] schedule %s has been claimed by others" % entry.trace_id)
+                return
+
+            try:
+                current_app.tasks[entry.task_name](trace_id=entry.trace_id)
+            except Exception:
+                logger.exception("[local_poll] run schedule %s failed, fallback to celery" % entry.trace_id)
+                current_app.tasks[entry.task_name].apply_async(
+                    kwargs={"trace_id": entry.trace_id}, countdown=1, queue=SCHEDULE_QUEUE
+                )
+        except Exception:
+            logger.exception("[local_poll] execute schedule %s error" % entry.trace_id)
+        finally:
+            close_old_connections()
+
+    def shutdown(self, wait: bool = True):
+        """
+        停止调度器，并将尚未执行的轮询交还给 Celery
+        """
+        self._stopped.set()
+        if self._pid != os.getpid():
+            return
+
+        if self._timer_thread is not None:
+            self._timer_thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+        now = time.monotonic()
+        for entry in self.wheel.drain():
+            try:
+                dispatch_to_celery(entry.task_name, entry.trace_id, entry.poll_at, countdown=entry.deadline - now)
+            except Exception:
+                logger.exception("[local_poll] fallback schedule %s to celery failed" % entry.trace_id)
+
+
+@lru_cache(maxsize=None)
+def get_local_poll_scheduler() -> typing.Optional[LocalPollScheduler]:
+    """
+    获取当前进程的本地轮询调度器，未开启时返回 None
+    """
+    if not settings.LOCAL_POLL_SCHEDULER_ENABLED:
+        return None
+
+    scheduler = LocalPollScheduler(
+        max_interval=settings.LOCAL_POLL_MAX_INTERVAL,
+        tick=settings.LOCAL_POLL_TICK,
+        threads=settings.LOCAL_POLL_THREADS,
+    )
+    atexit.register(scheduler.shutdown)
+    return scheduler
+
+
+def shutdown_local_poll_scheduler(*args, **kwargs):
+    """
+    worker 退出时将本地托管的轮询交还给 Celery，可作为信号接收函数使用
+    """
+    if get_local_poll_scheduler.cache_info().currsize == 0:
+        return
+
+    scheduler = get_local_poll_scheduler()
+    if scheduler is not None:
+        scheduler.shutdown()
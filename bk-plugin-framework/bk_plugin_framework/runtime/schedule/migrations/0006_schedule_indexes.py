@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0005_schedule_err"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(fields=["finish_at"], name="schedule_finish_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(fields=["state", "created_at"], name="schedule_state_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(fields=["scheduling", "state"], name="schedule_scheduling_state_idx"),
+        ),
+    ]
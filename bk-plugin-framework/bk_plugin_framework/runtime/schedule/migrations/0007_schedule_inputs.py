@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0006_schedule_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedule",
+            name="inputs",
+            field=models.TextField(default="", verbose_name="inputs and context data"),
+        ),
+        migrations.AlterField(
+            model_name="schedule",
+            name="data",
+            field=models.TextField(verbose_name="context storage and outputs"),
+        ),
+    ]
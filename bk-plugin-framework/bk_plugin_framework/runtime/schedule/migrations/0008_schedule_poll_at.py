@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0007_schedule_inputs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedule",
+            name="poll_at",
+            field=models.DateTimeField(null=True, verbose_name="local poll expected time"),
+        ),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(fields=["state", "poll_at"], name="schedule_state_poll_at_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0008_schedule_poll_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="schedule",
+            name="version",
+            field=models.IntegerField(default=0, verbose_name="optimistic lock version"),
+        ),
+    ]
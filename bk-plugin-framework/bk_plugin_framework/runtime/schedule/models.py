@@ -9,9 +9,39 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-from django.db import models
+import logging
+import typing
+
+from django.db import connections, models
 from django.utils import timezone
 
+from bk_plugin_framework.constants import State
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.metrics import (
+    BK_PLUGIN_EXPIRED_DATA_DELETED_COUNT,
+    HOSTNAME,
+)
+from bk_plugin_framework.runtime.schedule import codecs
+from bk_plugin_framework.utils.db import delete_in_chunks, supports_update_returning
+
+logger = logging.getLogger("bk_plugin")
+
+# 调度状态查询可选返回的字段，trace_id 及 state 总是返回
+SCHEDULE_STATUS_FIELDS = ("plugin_version", "outputs", "err", "created_at", "finish_at")
+SCHEDULE_FINISH_STATES = {State.SUCCESS.value, State.FAIL.value}
+# 执行调度需要读取的字段，不读取 err 等与调度无关的字段
+SCHEDULE_EXECUTE_FIELDS = (
+    "trace_id",
+    "plugin_version",
+    "state",
+    "invoke_count",
+    "inputs",
+    "data",
+    "scheduling",
+    "version",
+)
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 class ScheduleManger(models.Manager):
     def apply_schedule_lock(self, trace_id: str) -> bool:
@@ -22,6 +52,44 @@ class ScheduleManger(models.Manager):
         """
         return self.filter(trace_id=trace_id, scheduling=False).update(scheduling=True) == 1
 
+    def apply_schedule_lock_and_fetch(self, trace_id: str) -> typing.Tuple[bool, typing.Optional["Schedule"]]:
+        """
+        获取调度锁，数据库支持 UPDATE ... RETURNING 时在同一条语句中读取执行调度需要的字段
+
+        :return: (是否成功获取锁, Schedule 对象)，数据库不支持时 Schedule 对象为 None，需要另行读取
+        """
+        connection = connections[self.db]
+        if not supports_update_returning(connection):
+            return self.apply_schedule_lock(trace_id), None
+
+        opts = self.model._meta
+        fields = [field for field in opts.concrete_fields if field.attname in SCHEDULE_EXECUTE_FIELDS]
+        qn = connection.ops.quote_name
+        scheduling_column = qn(opts.get_field("scheduling").column)
+        sql = "UPDATE %s SET %s = %%s WHERE %s = %%s AND %s = %%s RETURNING %s" % (
+            qn(opts.db_table),
+            scheduling_column,
+            qn(opts.pk.column),
+            scheduling_column,
+            ", ".join(qn(field.column) for field in fields),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [True, trace_id, False])
+            row = cursor.fetchone()
+
+        if row is None:
+            return False, None
+
+        schedule = self.model.from_db(self.db, [field.attname for field in fields], row)
+        schedule.scheduling = True
+        return True, schedule
+
+    def get_for_execute(self, trace_id: str) -> "Schedule":
+        """
+        只读取执行调度需要的字段
+        """
+        return self.only(*SCHEDULE_EXECUTE_FIELDS).get(trace_id=trace_id)
+
     def release_schedule_lock(self, trace_id: str) -> None:
         """
         释放指定 Schedule 的调度锁
@@ -29,15 +97,86 @@ class ScheduleManger(models.Manager):
         """
         self.filter(trace_id=trace_id, scheduling=True).update(scheduling=False)
 
+    def update_with_version(self, trace_id: str, version: typing.Optional[int] = None, **fields) -> bool:
+        """
+        更新 Schedule 并将 version 加 1，指定 version 时只有版本与读取时一致才会更新（compare-and-swap）
+
+        :return: True or False
+        """
+        queryset = self.filter(trace_id=trace_id)
+        if version is not None:
+            queryset = queryset.filter(version=version)
+        return queryset.update(version=models.F("version") + 1, **fields) == 1
+
+    def claim_local_poll(self, trace_id: str, poll_at) -> bool:
+        """
+        认领由 worker 本地调度器托管的轮询，认领成功后该轮询只会被执行一次
+
+        :return: True or False
+        """
+        return self.filter(trace_id=trace_id, poll_at=poll_at).update(poll_at=None) == 1
+
+    def get_status_batch(
+        self, trace_ids: typing.List[str], fields: typing.Iterable[str] = SCHEDULE_STATUS_FIELDS
+    ) -> typing.List[dict]:
+        """
+        批量查询调度状态，只查询 fields 需要的列，outputs 只有在调度结束后才会解码
+
+        :param trace_ids: trace id 列表
+        :param fields: 需要返回的字段，取值为 SCHEDULE_STATUS_FIELDS 的子集
+        :return: 按 trace_ids 顺序排列的调度状态，不存在的 trace_id 不会出现在结果中
+        """
+        fields = [f for f in SCHEDULE_STATUS_FIELDS if f in set(fields)]
+        columns = ["trace_id", "state"] + [f for f in fields if f != "outputs"]
+        if "outputs" in fields:
+            columns.append("data")
+
+        unique_trace_ids = list(dict.fromkeys(trace_ids))
+        rows = {row["trace_id"]: row for row in self.filter(trace_id__in=unique_trace_ids).values(*columns)}
+
+        statuses = []
+        for trace_id in unique_trace_ids:
+            row = rows.get(trace_id)
+            if row is None:
+                continue
+
+            status = {"trace_id": trace_id, "state": row["state"]}
+            for field in fields:
+                if field == "outputs":
+                    status["outputs"] = self._load_finished_outputs(row)
+                elif field in ("created_at", "finish_at"):
+                    status[field] = row[field].strftime(DATETIME_FORMAT) if row[field] else ""
+                else:
+                    status[field] = row[field]
+            statuses.append(status)
+
+        return statuses
+
+    @staticmethod
+    def _load_finished_outputs(row: dict) -> typing.Optional[dict]:
+        # 未结束的调度 outputs 仍可能变化，不进行解码
+        if row["state"] not in SCHEDULE_FINISH_STATES:
+            return None
+
+        try:
+            return codecs.loads(row["data"])["outputs"]
+        except Exception:
+            logger.exception("outputs fetch with trace_id %s error" % row["trace_id"])
+            return None
+
     def delete_expired_schedule(self, interval: int) -> int:
         """
-        清理过期的Schedule
+        按主键分批清理过期的Schedule
         :param interval:
         :return: count
         """
         expired_date = timezone.now() + timezone.timedelta(days=(-interval))
-        rows = self.filter(finish_at__lt=expired_date).delete()[0]
-        return rows
+        return delete_in_chunks(
+            self.filter(finish_at__lt=expired_date),
+            chunk_size=settings.EXPIRED_DELETE_CHUNK_SIZE,
+            interval=settings.EXPIRED_DELETE_CHUNK_INTERVAL,
+            progress_callback=BK_PLUGIN_EXPIRED_DATA_DELETED_COUNT.labels(model="schedule", hostname=HOSTNAME).inc,
+        )
 
 
 class Schedule(models.Model):
@@ -45,10 +184,25 @@ class Schedule(models.Model):
     plugin_version = models.CharField("plugin version", max_length=128)
     state = models.IntegerField("execution state")
     invoke_count = models.IntegerField("invoke count", default=1)
-    data = models.TextField("context and inputs")
+    inputs = models.TextField("inputs and context data", default="")
+    data = models.TextField("context storage and outputs")
     scheduling = models.BooleanField("是否正在调度", default=False)
     err = models.TextField("schedule error message", default="")
     created_at = models.DateTimeField("create time", auto_now_add=True)
     finish_at = models.DateTimeField("finish time", null=True)
+    poll_at = models.DateTimeField("local poll expected time", null=True)
+    version = models.IntegerField("optimistic lock version", default=0)
 
     objects = ScheduleManger()
+
+    class Meta:
+        indexes = [
+            # 过期清理：finish_at < expired_date
+            models.Index(fields=["finish_at"], name="schedule_finish_at_idx"),
+            # 按状态列出未完成的调度及恢复扫描
+            models.Index(fields=["state", "created_at"], name="schedule_state_created_idx"),
+            # 调度锁及正在调度中的记录扫描
+            models.Index(fields=["scheduling", "state"], name="schedule_scheduling_state_idx"),
+            # 本地轮询恢复扫描
+            models.Index(fields=["state", "poll_at"], name="schedule_state_poll_at_idx"),
+        ]
@@ -0,0 +1,344 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import typing
+from functools import lru_cache
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.runtime.schedule.models import (
+    SCHEDULE_FINISH_STATES,
+    Schedule,
+)
+
+logger = logging.getLogger("bk_plugin")
+
+NOTIFY_BACKEND_LOCAL = "local"
+NOTIFY_BACKEND_REDIS = "redis"
+CHANNEL_PREFIX = "bk_plugin:schedule:state:"
+
+
+class Subscription:
+    """
+    单个 trace_id 的调度状态订阅
+    """
+
+    def get(self, timeout: float) -> typing.Optional[int]:
+        """
+        等待下一次状态变化，超时返回 None
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class Notifier:
+    def publish(self, trace_id: str, state: int):
+        raise NotImplementedError()
+
+    def subscribe(self, trace_id: str) -> Subscription:
+        raise NotImplementedError()
+
+
+class LocalSubscription(Subscription):
+    def __init__(self, notifier: "LocalNotifier", trace_id: str):
+        self.notifier = notifier
+        self.trace_id = trace_id
+        self.queue = queue.SimpleQueue()
+
+    def get(self, timeout: float) -> typing.Optional[int]:
+        try:
+            return self.queue.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.notifier._unsubscribe(self)
+
+
+class LocalNotifier(Notifier):
+    """
+    进程内的状态通知，只有执行插件与等待状态的请求处于同一进程时可用（如本地开发环境）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def publish(self, trace_id: str, state: int):
+        self._dispatch(trace_id, state)
+
+    def subscribe(self, trace_id: str) -> Subscription:
+        subscription = LocalSubscription(self, trace_id)
+        with self._lock:
+            first = trace_id not in self._subscriptions
+            self._subscriptions.setdefault(trace_id, set()).add(subscription)
+            if first:
+                self._on_first_subscribe(trace_id)
+        return subscription
+
+    def _dispatch(self, trace_id: str, state: int):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(trace_id, ()))
+        for subscription in subscriptions:
+            subscription.queue.put(state)
+
+    def _unsubscribe(self, subscription: LocalSubscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.trace_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.trace_id)
+                self._on_last_unsubscribe(subscription.trace_id)
+
+    def _on_first_subscribe(self, trace_id: str):
+        pass
+
+    def _on_last_unsubscribe(self, trace_id: str):
+        pass
+
+
+class RedisNotifier(LocalNotifier):
+    """
+    基于 Redis pub/sub 的状态通知，适用于 worker 与 web 进程分离部署的场景
+
+    每个进程只使用一个 pubsub 连接，由后台线程接收消息后分发给进程内的订阅，
+    同一 trace 的多个等待请求共用一次 SUBSCRIBE，等待请求数不会占用额外的 Redis 连接；
+    redis-py 的 PubSub 不是线程安全的，订阅及取消订阅通过队列交给后台线程执行，只有后台线程操作 pubsub
+    """
+
+    # 等待 Redis 确认订阅的最长秒数，确认后再读取调度状态，避免错过订阅前发布的消息
+    SUBSCRIBE_CONFIRM_TIMEOUT = 1.0
+    # 没有订阅时后台线程的等待间隔
+    LISTEN_INTERVAL = 1.0
+    # 有订阅时每次读取消息的最长等待秒数，即新的订阅请求最多等待多久被执行
+    COMMAND_INTERVAL = 0.1
+
+    def __init__(self, url: str):
+        super().__init__()
+        self.client = redis.Redis.from_url(url)
+        self._pubsub = None
+        self._listener = None
+        self._pid = None
+        # channel -> 订阅确认事件
+        self._confirmations = {}
+        # (command, channel)，由后台线程依次执行
+        self._commands = queue.SimpleQueue()
+        self._wakeup = threading.Event()
+
+    def publish(self, trace_id: str, state: int):
+        self.client.publish(CHANNEL_PREFIX + trace_id, state)
+
+    def subscribe(self, trace_id: str) -> Subscription:
+        subscription = super().subscribe(trace_id)
+        with self._lock:
+            confirmation = self._confirmations.get(CHANNEL_PREFIX + trace_id)
+        if confirmation is not None and not confirmation.wait(self.SUBSCRIBE_CONFIRM_TIMEOUT):
+            logger.warning("[schedule] wait for subscribe confirmation of %s timeout" % trace_id)
+        return subscription
+
+    def _ensure_listener(self):
+        # fork 出的子进程不会继承父进程的后台线程，需要使用新的连接和线程
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._confirmations = {}
+        self._commands = queue.SimpleQueue()
+        self._wakeup = threading.Event()
+        self._pubsub = self.client.pubsub()
+        self._listener = threading.Thread(target=self._listen, name="bk_plugin_schedule_notify_listener", daemon=True)
+        self._listener.start()
+
+    def _send_command(self, command: str, channel: str):
+        self._commands.put((command, channel))
+        self._wakeup.set()
+
+    def _on_first_subscribe(self, trace_id: str):
+        self._ensure_listener()
+        channel = CHANNEL_PREFIX + trace_id
+        self._confirmations[channel] = threading.Event()
+        self._send_command("subscribe", channel)
+
+    def _on_last_unsubscribe(self, trace_id: str):
+        channel = CHANNEL_PREFIX + trace_id
+        self._confirmations.pop(channel, None)
+        self._send_command("unsubscribe", channel)
+
+    def _run_commands(self, pubsub, channels: set):
+        """
+        在后台线程中执行排队的订阅及取消订阅，channels 为当前已订阅的 channel
+        """
+        while True:
+            try:
+                command, channel = self._commands.get_nowait()
+            except queue.Empty:
+                return
+
+            if command == "subscribe":
+                pubsub.subscribe(channel)
+                channels.add(channel)
+            else:
+                pubsub.unsubscribe(channel)
+                channels.discard(channel)
+
+    def _handle_message(self, message: dict):
+        channel = message["channel"]
+        if isinstance(channel, bytes):
+            channel = channel.decode("utf-8")
+
+        if message["type"] == "subscribe":
+            with self._lock:
+                confirmation = self._confirmations.get(channel)
+            if confirmation is not None:
+                confirmation.set()
+        elif message["type"] == "message":
+            self._dispatch(channel[len(CHANNEL_PREFIX) :], int(message["data"]))
+
+    def _listen(self):
+        pubsub = self._pubsub
+        channels = set()
+        while True:
+            # 先清除再执行命令，执行期间新加入的命令会重新唤醒，不会被遗漏
+            self._wakeup.clear()
+            try:
+                self._run_commands(pubsub, channels)
+                if not channels:
+                    self._wakeup.wait(self.LISTEN_INTERVAL)
+                    continue
+                # 连接断开时 redis-py 会自动重连并重新订阅已订阅的 channel
+                message = pubsub.get_message(timeout=self.COMMAND_INTERVAL)
+                if message is not None:
+                    self._handle_message(message)
+            except Exception:
+                logger.exception("[schedule] receive schedule state message error")
+                time.sleep(self.LISTEN_INTERVAL)
+
+
+class WaiterLimiter:
+    """
+    限制进程内同时阻塞等待调度状态的请求数，WSGI 下每个等待请求都会占用一个 worker 线程
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._waiters = 0
+
+    def acquire(self) -> bool:
+        """
+        不阻塞地占用一个等待名额，limit 小于等于 0 时不限制
+
+        :return: 是否占用成功
+        """
+        with self._lock:
+            if 0 < self.limit <= self._waiters:
+                return False
+            self._waiters += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._waiters -= 1
+
+
+@lru_cache(maxsize=None)
+def get_waiter_limiter() -> WaiterLimiter:
+    return WaiterLimiter(settings.SCHEDULE_WAIT_MAX_WAITERS)
+
+
+@lru_cache(maxsize=None)
+def get_notifier() -> typing.Optional[Notifier]:
+    """
+    获取调度状态通知后端，未配置时返回 None
+    """
+    backend = settings.SCHEDULE_NOTIFY_BACKEND
+    if not backend:
+        return None
+
+    if backend == NOTIFY_BACKEND_LOCAL:
+        return LocalNotifier()
+
+    if backend == NOTIFY_BACKEND_REDIS:
+        if redis is None:
+            raise RuntimeError("redis is required by SCHEDULE_NOTIFY_BACKEND redis, please install it first")
+        return RedisNotifier(settings.SCHEDULE_NOTIFY_REDIS_URL)
+
+    raise ValueError("unsupported SCHEDULE_NOTIFY_BACKEND: %s" % backend)
+
+
+def publish_state(trace_id: str, state: int):
+    """
+    发布调度状态变化，通知失败不影响调度流程
+    """
+    try:
+        notifier = get_notifier()
+        if notifier is not None:
+            notifier.publish(trace_id, state)
+    except Exception:
+        logger.exception("[schedule] publish state of %s error" % trace_id)
+
+
+def iter_state_changes(
+    trace_id: str,
+    known_state: typing.Optional[int] = None,
+    timeout: float = 30,
+    heartbeat: typing.Optional[float] = None,
+) -> typing.Iterator[typing.Optional[int]]:
+    """
+    依次返回调度的新状态，调度结束、超时或调度不存在时停止
+
+    :param known_state: 调用方已知的状态，为 None 时以订阅时的状态为准
+    :param heartbeat: 设置后每隔 heartbeat 秒没有状态变化时返回一次 None
+    """
+    deadline = time.monotonic() + timeout
+    with get_notifier().subscribe(trace_id) as subscription:
+        # 订阅后再读取当前状态，避免错过订阅前发生的变化
+        state = Schedule.objects.filter(trace_id=trace_id).values_list("state", flat=True).first()
+        if state is None:
+            return
+        if known_state is None and state not in SCHEDULE_FINISH_STATES:
+            known_state = state
+
+        while True:
+            if state != known_state:
+                yield state
+                known_state = state
+            if state in SCHEDULE_FINISH_STATES:
+                return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            new_state = subscription.get(min(remaining, heartbeat) if heartbeat else remaining)
+            if new_state is not None:
+                state = new_state
+            elif heartbeat and deadline > time.monotonic():
+                yield None
@@ -9,28 +9,252 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import logging
+import threading
+import time
+import typing
+import uuid
+from functools import lru_cache
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+from bk_plugin_framework.envs import settings
 from bk_plugin_framework.runtime.schedule.models import Schedule
 
+logger = logging.getLogger("bk_plugin")
+
+LOCK_BACKEND_DB = "db"
+LOCK_BACKEND_REDIS = "redis"
+LOCK_KEY_PREFIX = "bk_plugin:schedule:lock:"
+# 锁过期（持有者异常退出）时不会有释放通知，等待方每隔该秒数重新尝试获取
+LOCK_WAIT_CHECK_INTERVAL = 1.0
+# BLPOP 的超时为 0 时会一直阻塞
+LOCK_WAIT_MIN_TIMEOUT = 0.01
+
+# 只有锁仍由当前持有者持有时才删除，并通知等待方锁已释放
+REDIS_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    redis.call("del", KEYS[1])
+    redis.call("del", KEYS[2])
+    redis.call("lpush", KEYS[2], 1)
+    redis.call("pexpire", KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+# 只有锁仍由当前持有者持有时才延长过期时间
+REDIS_RENEW_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class LockBackend:
+    # 锁是否保存在 Schedule.scheduling 字段中，是则执行器可以在更新调度结果时一并释放锁
+    uses_schedule_row = False
+    # 持有锁期间的续期间隔秒数，为 None 时锁不会过期，不需要续期
+    renew_interval = None
+
+    def acquire(self, trace_id: str, wait: float = 0) -> typing.Optional[str]:
+        """
+        获取调度锁，最多等待 wait 秒
+
+        :return: 锁的持有凭证，获取失败时返回 None
+        """
+        raise NotImplementedError()
+
+    def acquire_and_fetch(
+        self, trace_id: str, wait: float = 0
+    ) -> typing.Tuple[typing.Optional[str], typing.Optional[Schedule]]:
+        """
+        获取调度锁，后端能够在获取锁的同时读取 Schedule 时一并返回，否则 Schedule 为 None
+
+        :return: (锁的持有凭证, Schedule 对象)
+        """
+        return self.acquire(trace_id, wait), None
+
+    def release(self, trace_id: str, token: str):
+        raise NotImplementedError()
+
+    def renew(self, trace_id: str, token: str) -> bool:
+        """
+        延长锁的过期时间
+
+        :return: 锁是否仍由 token 持有
+        """
+        return True
+
+
+class DBLockBackend(LockBackend):
+    """
+    通过 Schedule.scheduling 字段实现的调度锁，不支持等待及过期
+    """
+
+    uses_schedule_row = True
+
+    def acquire(self, trace_id: str, wait: float = 0) -> typing.Optional[str]:
+        return trace_id if Schedule.objects.apply_schedule_lock(trace_id) else None
+
+    def acquire_and_fetch(
+        self, trace_id: str, wait: float = 0
+    ) -> typing.Tuple[typing.Optional[str], typing.Optional[Schedule]]:
+        locked, schedule = Schedule.objects.apply_schedule_lock_and_fetch(trace_id)
+        return (trace_id if locked else None), schedule
+
+    def release(self, trace_id: str, token: str):
+        Schedule.objects.release_schedule_lock(trace_id)
+
+
+class RedisLockBackend(LockBackend):
+    """
+    基于 Redis SET NX PX 的调度锁，持有者异常退出时锁在 lease 秒后自动过期，持有期间每 lease/3 秒续期一次；
+    释放锁时向等待队列写入通知，等待方通过 BLPOP 被唤醒后立即重新获取
+    """
+
+    def __init__(self, client, lease: float):
+        self.client = client
+        self.lease_ms = int(lease * 1000)
+        self.renew_interval = lease / 3
+        self._release_script = client.register_script(REDIS_RELEASE_SCRIPT)
+        self._renew_script = client.register_script(REDIS_RENEW_SCRIPT)
+
+    @staticmethod
+    def lock_key(trace_id: str) -> str:
+        return LOCK_KEY_PREFIX + trace_id
+
+    @staticmethod
+    def signal_key(trace_id: str) -> str:
+        return LOCK_KEY_PREFIX + trace_id + ":released"
+
+    def acquire(self, trace_id: str, wait: float = 0) -> typing.Optional[str]:
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait
+        while True:
+            if self.client.set(self.lock_key(trace_id), token, nx=True, px=self.lease_ms):
+                return token
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self.client.blpop(
+                [self.signal_key(trace_id)],
+                timeout=max(min(remaining, LOCK_WAIT_CHECK_INTERVAL), LOCK_WAIT_MIN_TIMEOUT),
+            )
+
+    def release(self, trace_id: str, token: str):
+        self._release_script(keys=[self.lock_key(trace_id), self.signal_key(trace_id)], args=[token, self.lease_ms])
+
+    def renew(self, trace_id: str, token: str) -> bool:
+        return bool(self._renew_script(keys=[self.lock_key(trace_id)], args=[token, self.lease_ms]))
+
+
+class LockWatchdog:
+    """
+    在后台线程中定期为持有的锁续期，避免执行时间超过 lease 的回调在执行期间失去锁
+    """
+
+    def __init__(self, backend: LockBackend, trace_id: str, token: str):
+        self.backend = backend
+        self.trace_id = trace_id
+        self.token = token
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bk_plugin_schedule_lock_watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join(timeout=LOCK_WAIT_CHECK_INTERVAL)
+
+    def _run(self):
+        while not self._stopped.wait(self.backend.renew_interval):
+            try:
+                if not self.backend.renew(self.trace_id, self.token):
+                    logger.warning("[schedule] schedule lock of %s has been lost, stop renewing" % self.trace_id)
+                    return
+            except Exception:
+                # 续期失败时继续重试，锁在 lease 内仍然有效
+                logger.exception("[schedule] renew schedule lock of %s error" % self.trace_id)
+
 
 class ScheduleLock:
-    def __init__(self, trace_id: str):
+    def __init__(
+        self, trace_id: str, backend: typing.Optional[LockBackend] = None, wait: float = 0, fetch: bool = False
+    ):
         self.trace_id = trace_id
+        self.backend = backend or DBLockBackend()
+        self.wait = wait
+        self.fetch = fetch
         self.locked = False
+        # fetch 为 True 且后端支持时，获取锁的同时读取的 Schedule 对象
+        self.schedule = None
+        self._token = None
+        self._watchdog = None
 
     def __enter__(self):
-        self.locked = Schedule.objects.apply_schedule_lock(self.trace_id)
+        if self.fetch:
+            self._token, self.schedule = self.backend.acquire_and_fetch(self.trace_id, self.wait)
+        else:
+            self._token = self.backend.acquire(self.trace_id, self.wait)
+        self.locked = self._token is not None
+
+        if self.locked and self.backend.renew_interval:
+            self._watchdog = LockWatchdog(self.backend, self.trace_id, self._token)
+            self._watchdog.start()
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.locked:
-            Schedule.objects.release_schedule_lock(self.trace_id)
+        if not self.locked:
+            return
+
+        if self._watchdog is not None:
+            self._watchdog.stop()
+
+        # 执行器已在更新本轮调度结果时一并释放了 Schedule.scheduling 锁
+        if self.backend.uses_schedule_row and self.schedule is not None and self.schedule.scheduling is False:
+            return
+
+        try:
+            self.backend.release(self.trace_id, self._token)
+        except Exception:
+            # 释放失败时锁会在过期后自动释放
+            logger.exception("[schedule] release schedule lock of %s error" % self.trace_id)
+
+
+@lru_cache(maxsize=None)
+def get_lock_backend() -> LockBackend:
+    """
+    获取调度锁后端
+    """
+    backend = settings.SCHEDULE_LOCK_BACKEND
+    if not backend or backend == LOCK_BACKEND_DB:
+        return DBLockBackend()
+
+    if backend == LOCK_BACKEND_REDIS:
+        if redis is None:
+            raise RuntimeError("redis is required by SCHEDULE_LOCK_BACKEND redis, please install it first")
+        return RedisLockBackend(redis.Redis.from_url(settings.SCHEDULE_LOCK_REDIS_URL), settings.SCHEDULE_LOCK_LEASE)
+
+    raise ValueError("unsupported SCHEDULE_LOCK_BACKEND: %s" % backend)
 
 
-def get_schedule_lock(trace_id: str) -> ScheduleLock:
+def get_schedule_lock(trace_id: str, wait: typing.Optional[float] = None, fetch: bool = False) -> ScheduleLock:
     """
     获取 schedule lock 的 context 对象
     :param trace_id:
+    :param wait: 获取锁的最长等待秒数，为 None 时使用 SCHEDULE_LOCK_WAIT_TIMEOUT
+    :param fetch: 是否尝试在获取锁的同时读取 Schedule
     :return:
     """
-    return ScheduleLock(trace_id)
+    if wait is None:
+        wait = settings.SCHEDULE_LOCK_WAIT_TIMEOUT
+    return ScheduleLock(trace_id, backend=get_lock_backend(), wait=wait, fetch=fetch)
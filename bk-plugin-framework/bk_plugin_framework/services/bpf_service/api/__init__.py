@@ -11,8 +11,8 @@ specific language governing permissions and limitations under the License.
 
 from .callback import PluginCallback  # noqa
 from .detail import Detail  # noqa
-from .invoke import Invoke  # noqa
+from .invoke import AsyncInvoke, Invoke, InvokeBatch  # noqa
 from .logs import Logs  # noqa
 from .meta import Meta  # noqa
-from .plugin_api_dispatch import PluginAPIDispatch  # noqa
-from .schedule import Schedule  # noqa
+from .plugin_api_dispatch import AsyncPluginAPIDispatch, PluginAPIDispatch  # noqa
+from .schedule import Schedule, ScheduleBatch, ScheduleStream, ScheduleWait  # noqa
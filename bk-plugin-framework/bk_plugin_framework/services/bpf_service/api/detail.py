@@ -25,6 +25,7 @@ from bk_plugin_framework.serializers import standard_response_enveloper
 from bk_plugin_framework.services.bpf_service.api.serializers import (
     StandardResponseSerializer,
 )
+from bk_plugin_framework.utils.http import conditional_json_response
 
 logger = logging.getLogger("root")
 
@@ -85,7 +86,10 @@ class Detail(APIView):
     )
     @action(methods=["GET"], detail=True)
     def get(self, request, version):
-        plugin_cls = VersionHub.all_plugins().get(version)
+        plugin_cls = VersionHub.resolve(version)
         if not plugin_cls:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        return Response({"result": True, "data": plugin_cls.dict(), "message": ""})
+
+        # 直接返回预先序列化的详情，客户端缓存未过期时返回 304
+        detail = plugin_cls.detail()
+        return conditional_json_response(request, detail.content, detail.etag)
@@ -10,10 +10,12 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+import uuid
 
 from apigw_manager.apigw.decorators import apigw_require
 from apigw_manager.drf.utils import gen_apigateway_resource_config
 from blueapps.account.decorators import login_exempt
+from django.http import HttpResponse, JsonResponse
 from django.utils.decorators import method_decorator
 from drf_spectacular.utils import extend_schema
 from rest_framework import serializers, status
@@ -22,8 +24,14 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from bk_plugin_framework.envs import settings
 from bk_plugin_framework.hub import VersionHub
-from bk_plugin_framework.runtime.executor import BKPluginExecutor
+from bk_plugin_framework.kit import State
+from bk_plugin_framework.runtime.executor import (
+    BatchInvocation,
+    BKPluginExecutor,
+    ExecuteResult,
+)
 from bk_plugin_framework.serializers import standard_response_enveloper
 from bk_plugin_framework.services.bpf_service.api.permissions import (
     ScopeAllowPermission,
@@ -31,6 +39,7 @@ from bk_plugin_framework.services.bpf_service.api.permissions import (
 from bk_plugin_framework.services.bpf_service.api.serializers import (
     StandardResponseSerializer,
 )
+from bk_plugin_framework.services.bpf_service.async_view import AsyncAPIView
 
 logger = logging.getLogger("bk_plugin")
 
@@ -51,6 +60,48 @@ class InvokeResponseSerializer(StandardResponseSerializer):
     data = InvokeDataSerializer(help_text="接口数据")
 
 
+class InvokeBatchParamsSerializer(serializers.Serializer):
+    class InvocationSerializer(InvokeParamsSerializer):
+        version = serializers.CharField(help_text="插件版本，支持 latest 及 ^、~ 版本范围", required=True)
+
+    invocations = serializers.ListField(
+        help_text="插件调用列表",
+        child=InvocationSerializer(),
+        allow_empty=False,
+        max_length=settings.INVOKE_BATCH_MAX_SIZE,
+    )
+
+
+class InvokeBatchResponseSerializer(StandardResponseSerializer):
+    class InvokeBatchItemSerializer(InvokeResponseSerializer.InvokeDataSerializer):
+        trace_id = serializers.CharField(help_text="该次调用的跟踪 ID")
+
+    trace_id = serializers.CharField(help_text="批量请求跟踪 ID")
+    data = serializers.ListField(help_text="与请求顺序一致的调用结果", child=InvokeBatchItemSerializer())
+
+
+def invoke_response_data(request, execute_result: ExecuteResult) -> dict:
+    return {
+        "result": True,
+        "data": {
+            "outputs": execute_result.outputs,
+            "state": execute_result.state.value,
+            "err": execute_result.err,
+        },
+        "message": "success",
+        "trace_id": request.trace_id,
+    }
+
+
+def invoke_error_data(request, e: Exception) -> dict:
+    return {
+        "result": False,
+        "data": None,
+        "message": "executor execute raise error: %s" % str(e),
+        "trace_id": request.trace_id,
+    }
+
+
 @method_decorator(login_exempt, name="dispatch")
 @method_decorator(apigw_require, name="dispatch")
 class Invoke(APIView):
@@ -76,7 +127,7 @@ class Invoke(APIView):
     )
     @action(methods=["POST"], detail=True)
     def post(self, request, version):
-        plugin_cls = VersionHub.all_plugins().get(version)
+        plugin_cls = VersionHub.resolve(version)
         if not plugin_cls:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
@@ -98,24 +149,129 @@ class Invoke(APIView):
             )
         except Exception as e:
             logging.exception("executor execute raise error")
+            return Response(invoke_error_data(request, e))
+
+        return Response(invoke_response_data(request, execute_result))
+
+
+@method_decorator(login_exempt, name="dispatch")
+class AsyncInvoke(AsyncAPIView):
+    """
+    Invoke 的异步版本，async def execute 的插件直接在事件循环中执行，同步插件放到线程中执行
+    """
+
+    permission_classes = [ScopeAllowPermission]
+
+    async def post(self, request, version):
+        plugin_cls = VersionHub.resolve(version)
+        if not plugin_cls:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            data_serializer = InvokeParamsSerializer(data=self.load_data(request))
+            data_serializer.is_valid(raise_exception=True)
+        except (ValueError, ValidationError) as e:
+            return JsonResponse(
+                data={"result": False, "data": None, "message": "输入不合法: %s" % e},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        request_data = data_serializer.validated_data
+
+        executor = BKPluginExecutor(trace_id=request.trace_id)
+
+        try:
+            execute_result = await executor.aexecute(
+                plugin_cls=plugin_cls, inputs=request_data["inputs"], context_inputs=request_data["context"]
+            )
+        except Exception as e:
+            logging.exception("executor execute raise error")
+            return JsonResponse(invoke_error_data(request, e))
+
+        return JsonResponse(invoke_response_data(request, execute_result))
+
+
+@method_decorator(login_exempt, name="dispatch")
+@method_decorator(apigw_require, name="dispatch")
+class InvokeBatch(APIView):
+
+    authentication_classes = []  # csrf exempt
+    permission_classes = [ScopeAllowPermission]
+
+    @extend_schema(
+        exclude=True,
+        summary="批量调用插件",
+        operation_id="invoke_batch",
+        request=InvokeBatchParamsSerializer,
+        responses={200: standard_response_enveloper(InvokeBatchResponseSerializer)},
+        extensions=gen_apigateway_resource_config(
+            is_public=True,
+            allow_apply_permission=True,
+            user_verified_required=False,
+            app_verified_required=True,
+            resource_permission_required=True,
+            description_en="Invoke plugins in batch",
+            match_subpath=False,
+        ),
+    )
+    @action(methods=["POST"], detail=False)
+    def post(self, request):
+        data_serializer = InvokeBatchParamsSerializer(data=request.data)
+        try:
+            data_serializer.is_valid(raise_exception=True)
+        except ValidationError as e:
+            return Response(
+                data={"result": False, "data": None, "message": "输入不合法: %s" % e},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        invocations = []
+        items = []
+        for invocation in data_serializer.validated_data["invocations"]:
+            trace_id = uuid.uuid4().hex
+            plugin_cls = VersionHub.resolve(invocation["version"])
+            if not plugin_cls:
+                items.append(
+                    {
+                        "outputs": None,
+                        "state": State.FAIL.value,
+                        "err": "plugin version %s not found" % invocation["version"],
+                        "trace_id": trace_id,
+                    }
+                )
+                continue
+
+            invocations.append(
+                BatchInvocation(
+                    trace_id=trace_id,
+                    plugin_cls=plugin_cls,
+                    inputs=invocation["inputs"],
+                    context_inputs=invocation["context"],
+                )
+            )
+            items.append({"trace_id": trace_id})
+
+        try:
+            execute_results = BKPluginExecutor.execute_batch(
+                invocations=invocations, max_workers=settings.INVOKE_BATCH_MAX_WORKERS
+            )
+        except Exception as e:
+            logging.exception("executor execute batch raise error")
             return Response(
                 {
                     "result": False,
                     "data": None,
-                    "message": "executor execute raise error: %s" % str(e),
+                    "message": "executor execute batch raise error: %s" % str(e),
                     "trace_id": request.trace_id,
                 }
             )
 
-        return Response(
-            {
-                "result": True,
-                "data": {
-                    "outputs": execute_result.outputs,
-                    "state": execute_result.state.value,
-                    "err": execute_result.err,
-                },
-                "message": "success",
-                "trace_id": request.trace_id,
-            }
-        )
+        results = iter(execute_results)
+        for item in items:
+            if "state" in item:
+                continue
+            execute_result = next(results)
+            item.update(
+                {"outputs": execute_result.outputs, "state": execute_result.state.value, "err": execute_result.err}
+            )
+
+        return Response({"result": True, "data": items, "message": "success", "trace_id": request.trace_id})
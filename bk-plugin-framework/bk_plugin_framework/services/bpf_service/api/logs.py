@@ -10,17 +10,21 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
+from contextlib import closing
+from itertools import islice
 
 from apigw_manager.drf.utils import gen_apigateway_resource_config
 from blueapps.account.decorators import login_exempt
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from drf_spectacular.utils import extend_schema
-from rest_framework import permissions, serializers
+from rest_framework import permissions, serializers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from bk_plugin_framework.runtime.loghub.models import LogEntry
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.runtime.loghub.backends import get_log_storage
 from bk_plugin_framework.serializers import standard_response_enveloper
 from bk_plugin_framework.services.bpf_service.api.serializers import (
     StandardResponseSerializer,
@@ -35,12 +39,25 @@ class LogsResponseSerializer(StandardResponseSerializer):
             ref_name = "log"
 
         log = serializers.CharField(help_text="日志内容")
+        last_id = serializers.IntegerField(
+            help_text="本次返回的最后一条日志 id，作为下次请求的 after_id，仅分页请求返回"
+        )
+        has_more = serializers.BooleanField(help_text="是否还有更多日志，仅分页请求返回")
 
     data = LogsDataSerializer(help_text="接口数据")
 
 
+class LogsParamsSerializer(serializers.Serializer):
+    after_id = serializers.IntegerField(help_text="日志游标，只返回 id 大于该值的日志", required=False, min_value=0)
+    limit = serializers.IntegerField(
+        help_text="单次返回的最大日志条数", required=False, min_value=1, max_value=settings.LOG_PAGE_MAX_SIZE
+    )
+    stream = serializers.BooleanField(help_text="是否以纯文本流的形式返回日志", required=False, default=False)
+
+
 @method_decorator(login_exempt, name="dispatch")
 class Logs(APIView):
+    STREAM_CHUNK_LINES = 200
 
     permission_classes = [permissions.AllowAny]
 
@@ -48,6 +65,7 @@ class Logs(APIView):
         exclude=True,
         summary="获取插件执行日志",
         operation_id="plugin_logs",
+        parameters=[LogsParamsSerializer],
         responses={200: standard_response_enveloper(LogsResponseSerializer)},
         extensions=gen_apigateway_resource_config(
             is_public=True,
@@ -61,4 +79,47 @@ class Logs(APIView):
     )
     @action(methods=["GET"], detail=True)
     def get(self, request, trace_id):
-        return Response({"result": True, "data": {"log": LogEntry.objects.get_plain_log(trace_id)}, "message": ""})
+        params_serializer = LogsParamsSerializer(data=request.query_params)
+        if not params_serializer.is_valid():
+            return Response(
+                {"result": False, "data": None, "message": "输入不合法: %s" % params_serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        params = params_serializer.validated_data
+        storage = get_log_storage()
+        after_id = params.get("after_id", 0)
+
+        if params["stream"]:
+            return StreamingHttpResponse(
+                self._stream_log(storage.iter_items(trace_id, after_id=after_id)),
+                content_type="text/plain; charset=utf-8",
+            )
+
+        if "after_id" not in params and "limit" not in params:
+            return Response({"result": True, "data": {"log": storage.get_plain_log(trace_id)}, "message": ""})
+
+        limit = params.get("limit", settings.LOG_PAGE_MAX_SIZE)
+        with closing(storage.iter_items(trace_id, after_id=after_id)) as items_iter:
+            items = list(islice(items_iter, limit + 1))
+
+        has_more = len(items) > limit
+        items = items[:limit]
+        return Response(
+            {
+                "result": True,
+                "data": {
+                    "log": "\n".join([item.message for item in items]),
+                    "last_id": items[-1].id if items else after_id,
+                    "has_more": has_more,
+                },
+                "message": "",
+            }
+        )
+
+    def _stream_log(self, items_iter):
+        with closing(items_iter):
+            while True:
+                lines = [item.message for item in islice(items_iter, self.STREAM_CHUNK_LINES)]
+                if not lines:
+                    return
+                yield "\n".join(lines) + "\n"
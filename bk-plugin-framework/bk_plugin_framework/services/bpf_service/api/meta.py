@@ -10,37 +10,24 @@ specific language governing permissions and limitations under the License.
 """
 
 import logging
-from importlib import import_module
 
 from apigw_manager.drf.utils import gen_apigateway_resource_config
 from blueapps.account.decorators import login_exempt
-from django.conf import settings
 from django.utils.decorators import method_decorator
 from drf_spectacular.utils import extend_schema
 from rest_framework import permissions, serializers
 from rest_framework.decorators import action
-from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from bk_plugin_framework import __version__ as bpf_version
-from bk_plugin_framework.hub import VersionHub
 from bk_plugin_framework.serializers import standard_response_enveloper
 from bk_plugin_framework.services.bpf_service.api.serializers import (
     StandardResponseSerializer,
 )
+from bk_plugin_framework.services.bpf_service.payloads import get_meta_payload
+from bk_plugin_framework.utils.http import conditional_json_response
 
 logger = logging.getLogger("root")
 
-FRAMEWORK_VERSION = bpf_version.__version__
-RUNTIME_VERSION = None
-
-try:
-    from bk_plugin_runtime import __version__ as bpr_version
-except ImportError:
-    pass
-else:
-    RUNTIME_VERSION = bpr_version.__version__
-
 
 class MetaResponseSerializer(StandardResponseSerializer):
     class MetaDataSerializer(serializers.Serializer):
@@ -79,27 +66,5 @@ class Meta(APIView):
     )
     @action(methods=["GET"], detail=True)
     def get(self, request):
-        try:
-            meta_module = import_module("bk_plugin.meta")
-        except ImportError:
-            description = ""
-            allow_scope = {}
-        else:
-            description = getattr(meta_module, "description", "")
-            allow_scope = getattr(meta_module, "allow_scope", {})
-
-        return Response(
-            {
-                "result": True,
-                "data": {
-                    "code": settings.APP_CODE,
-                    "versions": VersionHub.versions(),
-                    "language": "python",
-                    "description": description,
-                    "framework_version": FRAMEWORK_VERSION,
-                    "runtime_version": RUNTIME_VERSION,
-                    "allow_scope": allow_scope,
-                },
-                "message": "",
-            }
-        )
+        meta = get_meta_payload()
+        return conditional_json_response(request, meta.content, meta.etag)
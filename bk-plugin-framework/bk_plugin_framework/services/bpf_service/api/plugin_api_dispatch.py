@@ -9,16 +9,16 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import asyncio
 import json
 import logging
-import re
-from urllib.parse import urlsplit
+import typing
 
 from apigw_manager.apigw.decorators import apigw_require
 from apigw_manager.drf.utils import gen_apigateway_resource_config
 from blueapps.account.decorators import login_exempt
-from django.test import RequestFactory
-from django.urls import Resolver404, resolve
+from django.http import JsonResponse
+from django.urls import Resolver404
 from django.utils.decorators import method_decorator
 from drf_spectacular.utils import extend_schema
 from rest_framework import serializers, status
@@ -27,6 +27,12 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:
+    # 异步视图需要 Django >= 4.1，更早的 Django 可能未安装 asgiref，此时只使用同步视图
+    sync_to_async = None
+
 from bk_plugin_framework.serializers import standard_response_enveloper
 from bk_plugin_framework.services.bpf_service.api.permissions import (
     ScopeAllowPermission,
@@ -34,17 +40,17 @@ from bk_plugin_framework.services.bpf_service.api.permissions import (
 from bk_plugin_framework.services.bpf_service.api.serializers import (
     StandardResponseSerializer,
 )
+from bk_plugin_framework.services.bpf_service.async_view import AsyncAPIView
+from bk_plugin_framework.services.bpf_service.dispatch import build_dispatch_request
 
 logger = logging.getLogger("bk_plugin")
 
-CUSTOM_REQUEST_HEADER_REGEX = re.compile("HTTP_BK_PLUGIN_*")
-
 
 class PluginAPIDispatchParamsSerializer(serializers.Serializer):
     url = serializers.CharField(help_text="数据接口 URL", required=True)
     method = serializers.CharField(help_text="调用方法", required=True)
     username = serializers.CharField(help_text="用户名", required=True)
-    data = serializers.DictField(help_text="接口数据", required=False, default={})
+    data = serializers.DictField(help_text="接口数据", required=False, default=dict)
     dumped_data = serializers.CharField(help_text="json dumps后的接口数据", required=False)
 
     def validate(self, values):
@@ -68,9 +74,26 @@ class PluginAPIDispatchResponseSerializer(StandardResponseSerializer):
     data = serializers.DictField(help_text="DATA API 返回的数据")
 
 
-class DummyUser:
-    def __init__(self, username):
-        self.username = username
+def dispatch_error(request, request_data: dict, e: Exception) -> typing.Tuple[dict, int]:
+    """
+    :return: (response data, status code)
+    """
+    if isinstance(e, Resolver404):
+        logger.exception("url(%s) resolve 404" % request_data["url"])
+        return {
+            "result": False,
+            "data": None,
+            "message": "404 error: %s" % request_data["url"],
+            "trace_id": request.trace_id,
+        }, status.HTTP_404_NOT_FOUND
+
+    logger.exception("unknow error")
+    return {
+        "result": False,
+        "data": None,
+        "message": "unknow error, please contact plugin developers: %s" % e,
+        "trace_id": request.trace_id,
+    }, status.HTTP_500_INTERNAL_SERVER_ERROR
 
 
 @method_decorator(login_exempt, name="dispatch")
@@ -110,65 +133,42 @@ class PluginAPIDispatch(APIView):
         logger.info("receive dispatch request with params: %s" % request_data)
 
         try:
-            parsed = urlsplit(request_data["url"])
-            logger.info("url({}) parsed: {}".format(request_data["url"], parsed))
-
-            matched = resolve(parsed.path, urlconf=None)
-            view_func, kwargs = matched.func, matched.kwargs
-
-            # get custom request headers
-            custom_headers = {}
-            for key, value in request.META.items():
-                if CUSTOM_REQUEST_HEADER_REGEX.match(key):
-                    custom_headers[key] = value
-
-            # get apigw jwt info
-            custom_headers["HTTP_X_BKAPI_JWT"] = request.META.get("HTTP_X_BKAPI_JWT", "")
-
-            if request.FILES:
-                fake_request = getattr(RequestFactory(), request_data["method"].lower())(
-                    path=request_data["url"], data=request_data["data"], **custom_headers
-                )
-                # inject upload FILES
-                for f in request.FILES:
-                    fake_request.FILES[f] = request.FILES[f]
-            else:
-                fake_request = getattr(RequestFactory(), request_data["method"].lower())(
-                    path=request_data["url"],
-                    content_type=request.content_type,
-                    data=request_data["data"],
-                    **custom_headers
-                )
+            view_func, kwargs, fake_request = build_dispatch_request(request, request_data)
+            resp = view_func(fake_request, **kwargs)
+            return Response({"result": True, "data": resp.data, "message": "success", "trace_id": request.trace_id})
+
+        except Exception as e:
+            return Response(*dispatch_error(request, request_data, e))
 
-            # inject APIGW jwt
-            fake_request.jwt = request.jwt
 
-            # inject user username info
-            fake_request._force_auth_user = DummyUser(username=request_data["username"])
+@method_decorator(login_exempt, name="dispatch")
+class AsyncPluginAPIDispatch(AsyncAPIView):
+    """
+    PluginAPIDispatch 的异步版本，异步的插件 API 直接在事件循环中执行，同步 API 放到线程中执行
+    """
 
-            resp = view_func(fake_request, **kwargs)
-            return Response({"result": True, "data": resp.data, "message": "success", "trace_id": request.trace_id})
+    permission_classes = [ScopeAllowPermission]
 
-        except Resolver404:
-            logger.exception("url(%s) resolve 404" % request_data["url"])
-            return Response(
-                data={
-                    "result": False,
-                    "data": None,
-                    "message": "404 error: %s" % request_data["url"],
-                    "trace_id": request.trace_id,
-                },
-                status=status.HTTP_404_NOT_FOUND,
+    async def post(self, request):
+        try:
+            data_serializer = PluginAPIDispatchParamsSerializer(data=self.load_data(request))
+            data_serializer.is_valid(raise_exception=True)
+        except (ValueError, ValidationError) as e:
+            return JsonResponse(
+                data={"result": False, "data": None, "message": "输入不合法: %s" % e, "trace_id": request.trace_id},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
+        request_data = data_serializer.validated_data
+        logger.info("receive dispatch request with params: %s" % request_data)
+
+        try:
+            view_func, kwargs, fake_request = build_dispatch_request(request, request_data)
+            if asyncio.iscoroutinefunction(view_func):
+                resp = await view_func(fake_request, **kwargs)
+            else:
+                resp = await sync_to_async(view_func)(fake_request, **kwargs)
+            return JsonResponse({"result": True, "data": resp.data, "message": "success", "trace_id": request.trace_id})
         except Exception as e:
-            logger.exception("unknow error")
-            return Response(
-                data={
-                    "result": False,
-                    "data": None,
-                    "message": "unknow error, please contact plugin developers: %s" % e,
-                    "trace_id": request.trace_id,
-                },
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+            data, status_code = dispatch_error(request, request_data, e)
+            return JsonResponse(data, status=status_code)
@@ -9,23 +9,29 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import json
 import logging
+from contextlib import closing
 
 from apigw_manager.drf.utils import gen_apigateway_resource_config
 from blueapps.account.decorators import login_exempt
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from drf_spectacular.utils import extend_schema
-from rest_framework import permissions, serializers
+from rest_framework import permissions, serializers, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.runtime.schedule import codecs, notify
+from bk_plugin_framework.runtime.schedule.models import SCHEDULE_STATUS_FIELDS
 from bk_plugin_framework.runtime.schedule.models import Schedule as ScheduleModel
 from bk_plugin_framework.serializers import standard_response_enveloper
 from bk_plugin_framework.services.bpf_service.api.serializers import (
     StandardResponseSerializer,
 )
+from bk_plugin_framework.utils.http import ClosingIterator, sse_message
 
 logger = logging.getLogger("root")
 
@@ -50,6 +56,77 @@ class ScheduleResponseSerializer(StandardResponseSerializer):
     data = ScheduleDataSerializer(help_text="接口数据")
 
 
+class ScheduleBatchParamsSerializer(serializers.Serializer):
+    trace_ids = serializers.ListField(
+        help_text="插件调用 trace id 列表",
+        child=serializers.CharField(),
+        allow_empty=False,
+        max_length=settings.SCHEDULE_BATCH_MAX_SIZE,
+    )
+    fields = serializers.ListField(
+        help_text="需要返回的字段，trace_id 及 state 总是返回，默认返回全部字段",
+        child=serializers.ChoiceField(choices=SCHEDULE_STATUS_FIELDS),
+        required=False,
+        default=list(SCHEDULE_STATUS_FIELDS),
+    )
+
+
+class ScheduleBatchResponseSerializer(StandardResponseSerializer):
+    class ScheduleStatusSerializer(ScheduleResponseSerializer.ScheduleDataSerializer):
+        class Meta:
+            ref_name = "schedule_status"
+
+        outputs = serializers.DictField(help_text="插件输出，调度未结束时为 null", allow_null=True)
+
+    data = serializers.ListField(
+        help_text="按请求顺序排列的调度状态，不存在的 trace_id 不会出现在结果中", child=ScheduleStatusSerializer()
+    )
+
+
+class ScheduleWaitParamsSerializer(serializers.Serializer):
+    state = serializers.IntegerField(help_text="调用方已知的插件执行状态，当前状态与之不同时立即返回", required=False)
+    timeout = serializers.IntegerField(
+        help_text="最长等待时间（秒）",
+        required=False,
+        min_value=0,
+        max_value=settings.SCHEDULE_WAIT_MAX_TIMEOUT,
+        default=settings.SCHEDULE_WAIT_MAX_TIMEOUT,
+    )
+
+
+class ScheduleStreamParamsSerializer(serializers.Serializer):
+    timeout = serializers.IntegerField(
+        help_text="最长连接时间（秒）",
+        required=False,
+        min_value=0,
+        max_value=settings.SCHEDULE_STREAM_MAX_TIMEOUT,
+        default=settings.SCHEDULE_STREAM_MAX_TIMEOUT,
+    )
+
+
+def schedule_not_found_response(request, trace_id: str) -> Response:
+    return Response(
+        {
+            "result": False,
+            "data": None,
+            "message": "can not find schedule for trace_id %s" % trace_id,
+            "trace_id": request.trace_id,
+        }
+    )
+
+
+def validate_query_params(serializer_cls, request):
+    serializer = serializer_cls(data=request.query_params)
+    try:
+        serializer.is_valid(raise_exception=True)
+    except ValidationError as e:
+        return None, Response(
+            data={"result": False, "data": None, "message": "输入不合法: %s" % e},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return serializer.validated_data, None
+
+
 @method_decorator(login_exempt, name="dispatch")
 class Schedule(APIView):
 
@@ -76,17 +153,10 @@ class Schedule(APIView):
         try:
             s = ScheduleModel.objects.get(trace_id=trace_id)
         except ScheduleModel.DoesNotExist:
-            return Response(
-                {
-                    "result": False,
-                    "data": None,
-                    "message": "can not find schedule for trace_id %s" % trace_id,
-                    "trace_id": request.trace_id,
-                }
-            )
+            return schedule_not_found_response(request, trace_id)
 
         try:
-            outputs = json.loads(s.data)["outputs"]
+            outputs = codecs.loads(s.data)["outputs"]
         except Exception as e:
             logging.exception("outputs fetch with trace_id %s error" % trace_id)
             return Response(
@@ -114,3 +184,174 @@ class Schedule(APIView):
                 "message": "",
             }
         )
+
+
+@method_decorator(login_exempt, name="dispatch")
+class ScheduleBatch(APIView):
+
+    authentication_classes = []  # csrf exempt
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(
+        exclude=True,
+        summary="批量获取插件调度状态",
+        operation_id="plugin_schedule_batch",
+        request=ScheduleBatchParamsSerializer,
+        responses={200: standard_response_enveloper(ScheduleBatchResponseSerializer)},
+        extensions=gen_apigateway_resource_config(
+            is_public=True,
+            allow_apply_permission=True,
+            user_verified_required=True,
+            app_verified_required=True,
+            resource_permission_required=True,
+            description_en="Get plugin schedule status with trace_ids in batch",
+            match_subpath=False,
+        ),
+    )
+    @action(methods=["POST"], detail=False)
+    def post(self, request):
+        data_serializer = ScheduleBatchParamsSerializer(data=request.data)
+        try:
+            data_serializer.is_valid(raise_exception=True)
+        except ValidationError as e:
+            return Response(
+                data={"result": False, "data": None, "message": "输入不合法: %s" % e},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        request_data = data_serializer.validated_data
+
+        return Response(
+            {
+                "result": True,
+                "data": ScheduleModel.objects.get_status_batch(
+                    trace_ids=request_data["trace_ids"], fields=request_data["fields"]
+                ),
+                "trace_id": request.trace_id,
+                "message": "",
+            }
+        )
+
+
+@method_decorator(login_exempt, name="dispatch")
+class ScheduleWait(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(
+        exclude=True,
+        summary="长轮询等待插件调度状态变化",
+        operation_id="plugin_schedule_wait",
+        parameters=[ScheduleWaitParamsSerializer],
+        responses={200: standard_response_enveloper(ScheduleBatchResponseSerializer.ScheduleStatusSerializer)},
+        extensions=gen_apigateway_resource_config(
+            is_public=True,
+            allow_apply_permission=True,
+            user_verified_required=True,
+            app_verified_required=True,
+            resource_permission_required=True,
+            description_en="Wait for plugin schedule state change with trace_id",
+            match_subpath=False,
+        ),
+    )
+    @action(methods=["GET"], detail=True)
+    def get(self, request, trace_id):
+        params, error_response = validate_query_params(ScheduleWaitParamsSerializer, request)
+        if error_response:
+            return error_response
+
+        limiter = notify.get_waiter_limiter()
+        # 等待会占用一个工作线程，超出并发上限时不再等待，直接返回当前状态
+        if limiter.acquire():
+            try:
+                with closing(
+                    notify.iter_state_changes(
+                        trace_id=trace_id, known_state=params.get("state"), timeout=params["timeout"]
+                    )
+                ) as changes:
+                    next(changes, None)
+            finally:
+                limiter.release()
+        else:
+            logger.warning("[ScheduleWait] waiters limit exceeded, return current status of %s", trace_id)
+
+        statuses = ScheduleModel.objects.get_status_batch([trace_id])
+        if not statuses:
+            return schedule_not_found_response(request, trace_id)
+
+        return Response({"result": True, "data": statuses[0], "trace_id": request.trace_id, "message": ""})
+
+
+@method_decorator(login_exempt, name="dispatch")
+class ScheduleStream(APIView):
+
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(
+        exclude=True,
+        summary="以 SSE 推送插件调度状态变化",
+        operation_id="plugin_schedule_stream",
+        parameters=[ScheduleStreamParamsSerializer],
+        extensions=gen_apigateway_resource_config(
+            is_public=True,
+            allow_apply_permission=True,
+            user_verified_required=True,
+            app_verified_required=True,
+            resource_permission_required=True,
+            description_en="Stream plugin schedule state changes with trace_id",
+            match_subpath=False,
+        ),
+    )
+    @action(methods=["GET"], detail=True)
+    def get(self, request, trace_id):
+        params, error_response = validate_query_params(ScheduleStreamParamsSerializer, request)
+        if error_response:
+            return error_response
+
+        statuses = ScheduleModel.objects.get_status_batch([trace_id])
+        if not statuses:
+            return schedule_not_found_response(request, trace_id)
+
+        limiter = notify.get_waiter_limiter()
+        # 推送期间会一直占用一个工作线程，超出并发上限时让调用方稍后重试或改用轮询
+        if not limiter.acquire():
+            response = Response(
+                {
+                    "result": False,
+                    "data": None,
+                    "message": "too many schedule waiters, please retry later",
+                    "trace_id": request.trace_id,
+                },
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+            response["Retry-After"] = str(settings.SCHEDULE_STREAM_HEARTBEAT)
+            return response
+
+        response = StreamingHttpResponse(
+            ClosingIterator(self._stream(trace_id, statuses[0], params["timeout"]), limiter.release),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # 关闭 nginx 等反向代理的响应缓冲
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    def _stream(trace_id: str, initial_status: dict, timeout: int):
+        yield sse_message(initial_status, event="state")
+
+        with closing(
+            notify.iter_state_changes(
+                trace_id=trace_id,
+                known_state=initial_status["state"],
+                timeout=timeout,
+                heartbeat=settings.SCHEDULE_STREAM_HEARTBEAT,
+            )
+        ) as changes:
+            for state in changes:
+                if state is None:
+                    yield b": heartbeat\n\n"
+                    continue
+
+                statuses = ScheduleModel.objects.get_status_batch([trace_id])
+                if statuses:
+                    yield sse_message(statuses[0], event="state")
@@ -21,3 +21,8 @@ class BpfServiceConfig(AppConfig):
 
     def ready(self):
         discover_plugins(import_module("bk_plugin.versions"))
+
+        from .payloads import warm_up
+
+        # 插件加载完成后预先生成 meta 及 detail 接口的响应及 ETag
+        warm_up()
@@ -0,0 +1,84 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+import logging
+import typing
+
+import django
+from django.http import JsonResponse
+from django.views import View
+
+from bk_plugin_framework.envs import settings
+
+logger = logging.getLogger("bk_plugin")
+
+# Django 4.1 起才支持 async def 的类视图处理函数，更早的版本中 as_view() 返回的协程不会被 await
+ASYNC_VIEW_SUPPORTED = django.VERSION >= (4, 1)
+
+
+def async_api_enabled() -> bool:
+    """
+    是否使用异步视图处理 invoke 及 plugin_api_dispatch 接口，Django 版本不支持时回退到同步视图
+    """
+    if not settings.ASYNC_API_ENABLED:
+        return False
+    if not ASYNC_VIEW_SUPPORTED:
+        logger.warning(
+            "ASYNC_API_ENABLED requires Django >= 4.1, current version is %s, fallback to sync views"
+            % django.get_version()
+        )
+        return False
+    return True
+
+
+class AsyncAPIView(View):
+    """
+    基于 Django 异步视图的接口基类，在 ASGI 下运行时等待插件 I/O 不会占用线程
+
+    与 APIView 保持一致：不进行 csrf 校验，在调用处理函数前按 permission_classes 鉴权
+    """
+
+    permission_classes = []
+    # 与 apigw_require 一致，只接受经过 API 网关的请求（request.jwt 由网关 JWT 中间件设置）；
+    # apigw_require 是同步装饰器，包装异步 dispatch 时直接返回的 403 响应无法被 await，因此在 dispatch 中校验
+    apigw_required = True
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.apigw_required and not getattr(request, "jwt", None):
+            return JsonResponse({"detail": "Request is not from API Gateway."}, status=403)
+
+        denied_response = self.permission_denied_response(request)
+        if denied_response:
+            return denied_response
+
+        return await super().dispatch(request, *args, **kwargs)
+
+    def permission_denied_response(self, request) -> typing.Optional[JsonResponse]:
+        for permission_cls in self.permission_classes:
+            if not permission_cls().has_permission(request, self):
+                return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+        return None
+
+    @staticmethod
+    def load_data(request):
+        """
+        与 DRF request.data 一致，解析 JSON 请求体或表单数据，JSON 不合法时抛出 ValueError
+        """
+        if request.content_type == "application/json":
+            return json.loads(request.body or b"{}")
+        return request.POST
@@ -0,0 +1,240 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+import logging
+import typing
+from functools import lru_cache, partial
+from urllib.parse import urlsplit
+
+from django.http import HttpRequest, QueryDict
+from django.test import RequestFactory
+from django.urls import Resolver404, URLResolver, get_resolver, get_urlconf
+from django.utils.datastructures import MultiValueDict
+from rest_framework.request import is_form_media_type
+from rest_framework.views import APIView
+
+from bk_plugin_framework.envs import settings
+from bk_plugin_framework.utils.http import HeaderForwarder, meta_key
+from bk_plugin_framework.utils.routing import RouteTrie
+
+logger = logging.getLogger("bk_plugin")
+
+# 透传给插件 API 的请求头：配置的自定义请求头及网关 JWT
+PLUGIN_API_HEADER_FORWARDER = HeaderForwarder(
+    keys=[meta_key(header) for header in settings.PLUGIN_API_FORWARD_HEADERS],
+    defaults={"HTTP_X_BKAPI_JWT": ""},
+)
+# 转发请求沿用原请求的服务端信息，保证 build_absolute_uri 等行为一致
+FORWARD_SERVER_META = ("SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR", "wsgi.url_scheme")
+MULTIPART_CONTENT_TYPE = "multipart/form-data"
+
+
+class DummyUser:
+    def __init__(self, username):
+        self.username = username
+
+
+class DispatchHttpRequest(HttpRequest):
+    """
+    转发给插件 API 视图的请求，直接携带已解析的数据及上传文件，不再编码成请求体由视图重新解析
+    """
+
+    def __init__(self, method: str, path: str, meta: dict, data, files: MultiValueDict):
+        super().__init__()
+        self.method = method
+        self.path = self.path_info = path
+        self.META = meta
+        self._set_content_type_params(meta)
+        self.dispatch_data = data
+        self.dispatch_files = files
+
+    @property
+    def body(self):
+        # 仅在视图直接读取请求体时才序列化
+        if not hasattr(self, "_body"):
+            if self.method == "GET" or is_form_media_type(self.content_type):
+                self._body = b""
+            else:
+                self._body = json.dumps(self.dispatch_data).encode("utf-8")
+        return self._body
+
+
+@lru_cache(maxsize=4)
+def get_route_trie(resolver: URLResolver) -> RouteTrie:
+    return RouteTrie(resolver.url_patterns)
+
+
+@lru_cache(maxsize=settings.PLUGIN_API_RESOLVE_CACHE_SIZE)
+def resolve_plugin_api(path: str) -> typing.Tuple[typing.Callable, dict]:
+    """
+    解析插件 API 路径对应的视图，插件 API 路由在进程内不会变化，按路径缓存解析结果；
+    未命中缓存时通过路由前缀树解析，只尝试前缀与路径匹配的路由
+
+    :return: (view_func, view_kwargs)，view_kwargs 为共享对象，使用前需要复制
+    """
+    resolver = get_resolver(get_urlconf())
+    match = resolver.pattern.match(path)
+    matched = get_route_trie(resolver).resolve(match[0]) if match else None
+    if matched is None:
+        raise Resolver404({"path": path})
+    return matched
+
+
+def to_query_dict(data: dict) -> QueryDict:
+    """
+    将接口数据转换为字符串值的 QueryDict，列表值展开为多值，与 urlencode(doseq=True) 及表单编码的结果一致；
+    值为 None 的键及列表中的 None 不会被传递，避免视图收到字符串 "None"
+    """
+    query = QueryDict(mutable=True)
+    for key, value in data.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            query.setlist(key, [str(item) for item in value if item is not None])
+        else:
+            query[key] = str(value)
+    query._mutable = False
+    return query
+
+
+def view_func_codes(view_func: typing.Callable) -> tuple:
+    """
+    返回视图函数及 functools.wraps 记录的各层被包装函数的代码对象
+    """
+    codes = []
+    while view_func is not None:
+        codes.append(getattr(view_func, "__code__", None))
+        view_func = getattr(view_func, "__wrapped__", None)
+    return tuple(codes)
+
+
+# APIView.as_view() 返回的视图函数（csrf_exempt 包装的 View.as_view() 闭包）各层的代码对象
+API_VIEW_FUNC_CODES = view_func_codes(APIView.as_view())
+
+
+def is_api_view(view_func: typing.Callable) -> bool:
+    """
+    是否为未经额外装饰的 DRF 视图，只有这类视图可以根据 view_func.cls 直接执行；
+    urls.py 中被装饰的视图（如 deny(V.as_view())）通过 functools.wraps 同样带有 cls，需要调用视图函数本身以执行装饰器
+    """
+    view_cls = getattr(view_func, "cls", None)
+    if view_cls is None or not issubclass(view_cls, APIView):
+        return False
+    # view_is_async 在 Django 4.1 中引入，更早的版本不支持异步的类视图
+    if getattr(view_cls, "view_is_async", False):
+        return False
+    return view_func_codes(view_func) == API_VIEW_FUNC_CODES
+
+
+def build_api_view_request(request, request_data: dict, path: str, query_string: str) -> DispatchHttpRequest:
+    method = request_data["method"].upper()
+    meta = {key: request.META[key] for key in FORWARD_SERVER_META if key in request.META}
+    meta.update(PLUGIN_API_HEADER_FORWARDER.forward(request.META))
+    meta["REQUEST_METHOD"] = method
+    meta["PATH_INFO"] = path
+
+    if method == "GET":
+        query_dict = to_query_dict(request_data["data"]) if request_data["data"] else QueryDict(query_string)
+        meta["QUERY_STRING"] = query_dict.urlencode()
+        fake_request = DispatchHttpRequest(method, path, meta, data={}, files=MultiValueDict())
+    elif request.FILES:
+        # 上传的文件直接透传，不再复制
+        meta["QUERY_STRING"] = query_string
+        meta["CONTENT_TYPE"] = MULTIPART_CONTENT_TYPE
+        query_dict = QueryDict(query_string)
+        fake_request = DispatchHttpRequest(
+            method, path, meta, data=to_query_dict(request_data["data"]), files=request.FILES
+        )
+    else:
+        meta["QUERY_STRING"] = query_string
+        meta["CONTENT_TYPE"] = request.content_type
+        query_dict = QueryDict(query_string)
+        fake_request = DispatchHttpRequest(method, path, meta, data=request_data["data"], files=MultiValueDict())
+
+    fake_request.GET = query_dict
+    return fake_request
+
+
+def call_api_view(view_cls: typing.Type[APIView], initkwargs: dict, request: DispatchHttpRequest, **kwargs):
+    """
+    与 APIView.as_view() 返回的视图函数一致地执行视图，DRF Request 直接使用请求中已解析的数据
+    """
+    view = view_cls(**initkwargs)
+    initialize_request = view.initialize_request
+
+    def initialize_dispatch_request(http_request, *args, **kwargs):
+        drf_request = initialize_request(http_request, *args, **kwargs)
+        drf_request._data = http_request.dispatch_data
+        drf_request._files = http_request.dispatch_files
+        if http_request.dispatch_files:
+            drf_request._full_data = drf_request._data.copy()
+            drf_request._full_data.update(drf_request._files)
+        else:
+            drf_request._full_data = drf_request._data
+
+        if is_form_media_type(drf_request.content_type):
+            http_request._post = drf_request.POST
+            http_request._files = drf_request.FILES
+        return drf_request
+
+    view.initialize_request = initialize_dispatch_request
+    view.setup(request, **kwargs)
+    return view.dispatch(request, **kwargs)
+
+
+def build_factory_request(request, request_data: dict):
+    """
+    非 DRF 的视图需要读取请求体，通过 RequestFactory 构造完整的请求
+    """
+    custom_headers = PLUGIN_API_HEADER_FORWARDER.forward(request.META)
+
+    if request.FILES:
+        fake_request = getattr(RequestFactory(), request_data["method"].lower())(
+            path=request_data["url"], data=request_data["data"], **custom_headers
+        )
+        # inject upload FILES
+        for f in request.FILES:
+            fake_request.FILES[f] = request.FILES[f]
+    else:
+        fake_request = getattr(RequestFactory(), request_data["method"].lower())(
+            path=request_data["url"], content_type=request.content_type, data=request_data["data"], **custom_headers
+        )
+    return fake_request
+
+
+def build_dispatch_request(request, request_data: dict):
+    """
+    解析插件 API 视图并构造转发给该视图的请求
+
+    DRF 视图直接使用已解析的接口数据，不再经过请求体的编码及解析
+
+    :return: (view_func, view_kwargs, fake_request)
+    """
+    parsed = urlsplit(request_data["url"])
+    logger.info("url({}) parsed: {}".format(request_data["url"], parsed))
+
+    view_func, kwargs = resolve_plugin_api(parsed.path)
+    kwargs = dict(kwargs)
+
+    if is_api_view(view_func):
+        fake_request = build_api_view_request(request, request_data, parsed.path, parsed.query)
+        view_func = partial(call_api_view, view_func.cls, view_func.initkwargs)
+    else:
+        fake_request = build_factory_request(request, request_data)
+
+    # inject APIGW jwt
+    fake_request.jwt = request.jwt
+
+    # inject user username info
+    fake_request._force_auth_user = DummyUser(username=request_data["username"])
+
+    return view_func, kwargs, fake_request
@@ -13,13 +13,36 @@ import uuid
 
 from bk_plugin_framework.utils import local
 
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:
+    # asgiref < 3.6（Django < 4.2 安装的版本）没有 markcoroutinefunction，此时中间件只以同步方式调用
+    iscoroutinefunction = markcoroutinefunction = None
+
 
 class TraceIDInjectMiddleware:
+    sync_capable = True
+    async_capable = markcoroutinefunction is not None
+
     def __init__(self, get_response):
         self.get_response = get_response
+        # ASGI 下以异步方式调用，避免为中间件切换线程
+        if self.async_capable and iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        request.trace_id = uuid.uuid4().hex
-        local.set_trace_id(request.trace_id)
+        if self.async_capable and iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        self.inject(request)
         response = self.get_response(request)
         return response
+
+    async def __acall__(self, request):
+        self.inject(request)
+        return await self.get_response(request)
+
+    @staticmethod
+    def inject(request):
+        request.trace_id = uuid.uuid4().hex
+        local.set_trace_id(request.trace_id)
@@ -0,0 +1,86 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import typing
+from functools import lru_cache
+from importlib import import_module
+
+from django.conf import settings
+
+from bk_plugin_framework import __version__ as bpf_version
+from bk_plugin_framework.hub import VersionHub
+from bk_plugin_framework.utils.http import content_etag, dump_standard_response
+
+logger = logging.getLogger("bk_plugin")
+
+FRAMEWORK_VERSION = bpf_version.__version__
+RUNTIME_VERSION = None
+
+try:
+    from bk_plugin_runtime import __version__ as bpr_version
+except ImportError:
+    pass
+else:
+    RUNTIME_VERSION = bpr_version.__version__
+
+
+class MetaPayload(typing.NamedTuple):
+    # 插件元信息
+    data: dict
+    # 元信息接口响应体序列化后的 JSON
+    content: bytes
+    etag: str
+
+
+@lru_cache(maxsize=None)
+def get_meta_payload() -> MetaPayload:
+    """
+    插件元信息在部署之间不会变化，只在进程启动后生成一次
+    """
+    try:
+        meta_module = import_module("bk_plugin.meta")
+    except ImportError:
+        description = ""
+        allow_scope = {}
+    else:
+        description = getattr(meta_module, "description", "")
+        allow_scope = getattr(meta_module, "allow_scope", {})
+
+    data = {
+        "code": settings.APP_CODE,
+        "versions": list(VersionHub.versions()),
+        "language": "python",
+        "description": description,
+        "framework_version": FRAMEWORK_VERSION,
+        "runtime_version": RUNTIME_VERSION,
+        "allow_scope": allow_scope,
+    }
+    content = dump_standard_response(data)
+    return MetaPayload(data=data, content=content, etag=content_etag(content))
+
+
+def warm_up():
+    """
+    预先生成元信息及所有插件版本的详情
+
+    在进程启动时调用，生成失败时只记录日志，不影响进程启动及其他版本，失败的部分在首次请求时再生成
+    """
+    for version, plugin_cls in VersionHub.plugins().items():
+        try:
+            plugin_cls.detail()
+        except Exception:
+            logger.exception("[warm_up] generate detail of plugin version %s failed" % version)
+
+    try:
+        get_meta_payload()
+    except Exception:
+        logger.exception("[warm_up] generate meta failed")
@@ -16,24 +16,40 @@ from django.urls import include, path
 
 from bk_plugin_framework.envs import settings
 from bk_plugin_framework.services.bpf_service import api
+from bk_plugin_framework.services.bpf_service.async_view import async_api_enabled
 
 PLUGIN_API_URLS_MODULE = "bk_plugin.apis.urls"
 PLUGIN_OPENAPI_URLS_MODULE = "bk_plugin.openapi.urls"
 PLUGIN_PRIVATE_URLS_MODULE = "bk_plugin.private.urls"
 
+if async_api_enabled():
+    PluginAPIDispatchView, InvokeView = api.AsyncPluginAPIDispatch, api.AsyncInvoke
+else:
+    PluginAPIDispatchView, InvokeView = api.PluginAPIDispatch, api.Invoke
+
 urlpatterns = [
     # 协议层接口（与平台方对接）
-    path(r"plugin_api_dispatch/", api.PluginAPIDispatch.as_view()),
+    path(r"plugin_api_dispatch/", PluginAPIDispatchView.as_view()),
     path(r"callback/<str:token>/", api.PluginCallback.as_view()),
-    path(r"invoke/<str:version>", api.Invoke.as_view()),
+    path(r"invoke/<str:version>", InvokeView.as_view()),
+    path(r"invoke_batch/", api.InvokeBatch.as_view()),
     # 插件信息接口
     path(r"meta/", api.Meta.as_view()),
     path(r"detail/<str:version>", api.Detail.as_view()),
     path(r"schedule/<str:trace_id>", api.Schedule.as_view()),
+    path(r"schedule_batch/", api.ScheduleBatch.as_view()),
 ]
 
 # add log api
-if settings.BKPAAS_ENVIRONMENT == "dev":
+if settings.SCHEDULE_NOTIFY_BACKEND:
+    urlpatterns.extend(
+        [
+            path(r"schedule/<str:trace_id>/wait", api.ScheduleWait.as_view()),
+            path(r"schedule/<str:trace_id>/stream", api.ScheduleStream.as_view()),
+        ]
+    )
+
+if settings.BKPAAS_ENVIRONMENT == "dev" or settings.TRACE_LOG_ALWAYS_ON:
     urlpatterns.append(path(r"logs/<str:trace_id>", api.Logs.as_view()))
 
 # add plugin api
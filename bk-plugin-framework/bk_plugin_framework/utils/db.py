@@ -0,0 +1,59 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import time
+import typing
+
+from django.db.models import QuerySet
+
+
+def supports_update_returning(connection) -> bool:
+    """
+    数据库是否支持 UPDATE ... RETURNING，MySQL 及 MariaDB 不支持
+    """
+    if connection.vendor == "postgresql":
+        return True
+    # SQLite 3.35 起支持 RETURNING
+    return connection.vendor == "sqlite" and connection.features.can_return_columns_from_insert
+
+
+def delete_in_chunks(
+    queryset: QuerySet,
+    chunk_size: int,
+    interval: float = 0,
+    progress_callback: typing.Optional[typing.Callable[[int], None]] = None,
+) -> int:
+    """
+    按主键分批删除 queryset 命中的数据，避免单条 DELETE 长时间持有锁以及产生过大的 binlog 事务
+
+    :param queryset: 需要删除的数据
+    :param chunk_size: 每批删除的最大行数
+    :param interval: 每批删除之间的间隔秒数，用于限制删除对数据库的压力
+    :param progress_callback: 每批删除完成后以本批删除的行数回调
+    :return: 删除的总行数
+    """
+    model = queryset.model
+    total = 0
+    while True:
+        pks = list(queryset.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return total
+
+        rows = model._default_manager.filter(pk__in=pks).delete()[0]
+        total += rows
+        if progress_callback is not None:
+            progress_callback(rows)
+
+        if len(pks) < chunk_size:
+            return total
+
+        if interval:
+            time.sleep(interval)
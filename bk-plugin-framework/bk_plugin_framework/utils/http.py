@@ -0,0 +1,116 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import hashlib
+import json
+import typing
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.utils.encoders import JSONEncoder
+
+from bk_plugin_framework.envs import settings
+
+
+def dump_standard_response(data) -> bytes:
+    """
+    序列化标准响应，编码方式及格式与 DRF JSONRenderer 的默认输出一致
+    """
+    return json.dumps(
+        {"result": True, "data": data, "message": ""},
+        cls=JSONEncoder,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def content_etag(content: bytes) -> str:
+    return '"%s"' % hashlib.sha1(content).hexdigest()
+
+
+def sse_message(data, event: str = "") -> bytes:
+    """
+    序列化一条 Server-Sent Events 消息
+    """
+    message = "data: %s\n\n" % json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+    if event:
+        message = "event: %s\n%s" % (event, message)
+    return message.encode("utf-8")
+
+
+class ClosingIterator:
+    """
+    包装可迭代对象，被关闭时关闭原迭代器并调用 on_close
+
+    StreamingHttpResponse 在响应结束或客户端断开时会调用 close，即使迭代尚未开始也会调用，on_close 只会被调用一次
+    """
+
+    def __init__(self, iterable: typing.Iterable, on_close: typing.Callable[[], None]):
+        self._iterator = iter(iterable)
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._on_close()
+
+
+def conditional_json_response(request, content: bytes, etag: str) -> HttpResponse:
+    """
+    返回预先序列化的 JSON 响应，请求的 If-None-Match 与 etag 匹配时返回 304
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type="application/json")
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.API_CACHE_MAX_AGE)
+    return response
+
+
+def meta_key(header: str) -> str:
+    """
+    请求头名称转换为 request.META 中的键，如 Bk-Plugin-X -> HTTP_BK_PLUGIN_X
+    """
+    return "HTTP_" + header.upper().replace("-", "_")
+
+
+class HeaderForwarder:
+    """
+    转发指定的请求头，键为 request.META 中的 WSGI 格式（如 HTTP_BK_PLUGIN_X）
+
+    需要转发的键在创建时确定，每次转发只查找这些键，不再遍历 request.META
+    """
+
+    def __init__(self, keys: typing.Iterable[str] = (), defaults: typing.Optional[dict] = None):
+        # 原请求中不存在时也需要转发的请求头及其默认值
+        self.defaults = dict(defaults or {})
+        self.keys = tuple(dict.fromkeys([*keys, *self.defaults]))
+
+    def forward(self, meta: dict) -> dict:
+        headers = dict(self.defaults)
+        for key in self.keys:
+            if key in meta:
+                headers[key] = meta[key]
+        return headers
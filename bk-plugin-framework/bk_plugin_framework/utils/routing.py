@@ -0,0 +1,127 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import re
+import typing
+
+from django.urls import URLPattern, URLResolver
+from django.urls.resolvers import RegexPattern, RoutePattern
+
+REGEX_LITERAL_PREFIX = re.compile(r"\^([\w/-]*)")
+REGEX_QUANTIFIERS = frozenset("?*+{")
+
+
+def has_top_level_alternation(regex: str) -> bool:
+    """
+    正则是否在分组及字符集之外包含 |，此时各分支的前缀互不相关
+    """
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in regex:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def literal_segments(pattern) -> typing.List[str]:
+    """
+    获取路由中字面量前缀的完整路径段，无法确定字面量前缀时返回空列表
+
+    "apis/<str:name>/detail" -> ["apis"]
+    "^apis/items?/" -> ["apis"]
+    "^apis/a/$|^apis/b/$" -> []
+    """
+    if isinstance(pattern, RoutePattern):
+        prefix = str(pattern).split("<", 1)[0]
+    elif isinstance(pattern, RegexPattern):
+        regex = str(pattern)
+        match = REGEX_LITERAL_PREFIX.match(regex)
+        if not match or has_top_level_alternation(regex):
+            return []
+        prefix = match.group(1)
+        # 字面量后紧跟量词时，最后一个字符不再是确定的
+        if prefix and regex[match.end() : match.end() + 1] in REGEX_QUANTIFIERS:
+            prefix = prefix[:-1]
+    else:
+        return []
+    return prefix.split("/")[:-1]
+
+
+class _Node:
+    __slots__ = ("children", "patterns")
+
+    def __init__(self):
+        self.children = {}
+        self.patterns = []
+
+
+class RouteTrie:
+    """
+    按路由字面量前缀的路径段建立的前缀树，解析路径时只尝试前缀与路径匹配的路由，
+    按原有顺序依次匹配，解析结果与 Django 的线性匹配一致
+    """
+
+    def __init__(self, url_patterns: typing.Iterable[typing.Union[URLPattern, URLResolver]]):
+        self._root = _Node()
+        self._sub_tries = {}
+        for index, url_pattern in enumerate(url_patterns):
+            node = self._root
+            for segment in literal_segments(url_pattern.pattern):
+                node = node.children.setdefault(segment, _Node())
+            node.patterns.append((index, url_pattern))
+            if isinstance(url_pattern, URLResolver):
+                self._sub_tries[index] = RouteTrie(url_pattern.url_patterns)
+
+    def candidates(self, path: str) -> typing.List[typing.Tuple[int, typing.Union[URLPattern, URLResolver]]]:
+        node = self._root
+        found = list(node.patterns)
+        for segment in path.split("/")[:-1]:
+            node = node.children.get(segment)
+            if node is None:
+                break
+            found.extend(node.patterns)
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def resolve(self, path: str) -> typing.Optional[typing.Tuple[typing.Callable, dict]]:
+        """
+        :return: (view_func, view_kwargs)，未匹配时返回 None
+        """
+        for index, url_pattern in self.candidates(path):
+            match = url_pattern.pattern.match(path)
+            if not match:
+                continue
+            new_path, _, captured_kwargs = match
+
+            if isinstance(url_pattern, URLPattern):
+                return url_pattern.callback, {**captured_kwargs, **url_pattern.default_args}
+
+            sub_match = self._sub_tries[index].resolve(new_path)
+            if sub_match is None:
+                continue
+            view_func, sub_kwargs = sub_match
+            kwargs = {**captured_kwargs, **url_pattern.default_kwargs}
+            kwargs.update(sub_kwargs)
+            return view_func, kwargs
+        return None
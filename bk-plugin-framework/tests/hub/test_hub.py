@@ -11,6 +11,8 @@ specific language governing permissions and limitations under the License.
 
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from bk_plugin_framework.hub import VersionHub
 
 
@@ -32,7 +34,7 @@ def test_version_hub():
     except RuntimeError:
         pass
 
-    assert VersionHub.versions() == ["1.0.0"]
+    assert VersionHub.versions() == ("1.0.0",)
     assert VersionHub.all_plugins() == {
         "1.0.0": plugin_cls,
     }
@@ -40,8 +42,48 @@ def test_version_hub():
     # new version
     VersionHub._register_plugin(new_plugin_cls)
 
-    assert VersionHub.versions() == ["1.2.0", "1.0.0"]
+    assert VersionHub.versions() == ("1.2.0", "1.0.0")
     assert VersionHub.all_plugins() == {
         "1.0.0": plugin_cls,
         "1.2.0": new_plugin_cls,
     }
+    assert VersionHub.get("1.2.0") is new_plugin_cls
+    assert VersionHub.get("2.0.0") is None
+
+
+@patch("bk_plugin_framework.hub.load_form_module_path", MagicMock(return_value="tests"))
+def test_version_hub_plugins_view():
+    plugin_cls = MagicMock()
+    plugin_cls.Meta.version = "1.0.0"
+    VersionHub._register_plugin(plugin_cls)
+
+    plugins = VersionHub.plugins()
+    assert plugins is VersionHub.plugins()
+    assert plugins == {"1.0.0": plugin_cls}
+    with pytest.raises(TypeError):
+        plugins["2.0.0"] = plugin_cls
+
+    # 副本的修改不影响注册表
+    VersionHub.all_plugins()["2.0.0"] = plugin_cls
+    assert VersionHub.get("2.0.0") is None
+
+    VersionHub._clear()
+    assert VersionHub.plugins() == {}
+    assert VersionHub.versions() == ()
+
+
+@patch("bk_plugin_framework.hub.load_form_module_path", MagicMock(return_value="tests"))
+def test_version_hub_resolve():
+    plugins = {}
+    for version in ["1.9.0", "1.10.0", "9.0.0"]:
+        plugins[version] = MagicMock()
+        plugins[version].Meta.version = version
+        VersionHub._register_plugin(plugins[version])
+
+    assert VersionHub.versions() == ("9.0.0", "1.10.0", "1.9.0")
+    assert VersionHub.resolve("1.9.0") is plugins["1.9.0"]
+    assert VersionHub.resolve("latest") is plugins["9.0.0"]
+    assert VersionHub.resolve("^1.9") is plugins["1.10.0"]
+    assert VersionHub.resolve("~1.9") is plugins["1.9.0"]
+    assert VersionHub.resolve("^2") is None
+    assert VersionHub.resolve("2.0.0") is None
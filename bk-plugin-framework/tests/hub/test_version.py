@@ -0,0 +1,109 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import pytest
+
+from bk_plugin_framework.hub.version import VersionIndex, VersionKey, parse_range, parse_version
+
+
+@pytest.mark.parametrize(
+    "version, expected",
+    [
+        ("1.2.3", VersionKey(1, 2, 3, True, "")),
+        ("1.10.0", VersionKey(1, 10, 0, True, "")),
+        ("1.0.0rc1", VersionKey(1, 0, 0, False, "rc1")),
+        ("1.0", None),
+        ("v1.0.0", None),
+    ],
+)
+def test_parse_version(version, expected):
+    assert parse_version(version) == expected
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("^1.2.3", ((1, 2, 3), (2, 0, 0))),
+        ("^1.2", ((1, 2, 0), (2, 0, 0))),
+        ("^1", ((1, 0, 0), (2, 0, 0))),
+        ("^0.2.3", ((0, 2, 3), (0, 3, 0))),
+        ("^0.0.3", ((0, 0, 3), (0, 0, 4))),
+        ("^0.0", ((0, 0, 0), (0, 1, 0))),
+        ("^0", ((0, 0, 0), (1, 0, 0))),
+        ("~1.2.3", ((1, 2, 3), (1, 3, 0))),
+        ("~1.2", ((1, 2, 0), (1, 3, 0))),
+        ("~1", ((1, 0, 0), (2, 0, 0))),
+        ("1.2.3", None),
+        ("^1.2.3rc1", None),
+        (">=1.0.0", None),
+    ],
+)
+def test_parse_range(spec, expected):
+    assert parse_range(spec) == expected
+
+
+@pytest.fixture
+def index():
+    index = VersionIndex()
+    for version in ["1.2.0", "9.0.0", "1.10.0", "1.2.10", "1.2.3", "2.0.0rc1", "0.2.5", "0.0.3", "1.2.4a1"]:
+        index.add(version)
+    return index
+
+
+def test_version_index_versions(index):
+    assert index.versions() == (
+        "9.0.0",
+        "2.0.0rc1",
+        "1.10.0",
+        "1.2.10",
+        "1.2.4a1",
+        "1.2.3",
+        "1.2.0",
+        "0.2.5",
+        "0.0.3",
+    )
+
+
+def test_version_index_add_invalid():
+    with pytest.raises(ValueError):
+        VersionIndex().add("1.0")
+
+
+@pytest.mark.parametrize(
+    "spec, expected",
+    [
+        ("latest", "9.0.0"),
+        ("^1.2", "1.10.0"),
+        ("^1.11", None),
+        ("~1.2", "1.2.10"),
+        ("~1.2.3", "1.2.10"),
+        ("~1.2.11", None),
+        ("^2", None),
+        ("^0.2.1", "0.2.5"),
+        ("^0.0.3", "0.0.3"),
+        ("^0.0.4", None),
+        ("^9", "9.0.0"),
+        ("^10", None),
+        ("1.2.3", None),
+        ("unknown", None),
+    ],
+)
+def test_version_index_resolve(index, spec, expected):
+    assert index.resolve(spec) == expected
+
+
+def test_version_index_latest_without_release():
+    index = VersionIndex()
+    assert index.resolve("latest") is None
+
+    index.add("1.0.0rc1")
+    assert index.resolve("latest") == "1.0.0rc1"
+    assert index.resolve("^1") is None
@@ -9,6 +9,8 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import hashlib
+import json
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -186,3 +188,50 @@ class TestPlugin:
                 "renderform": my_plugin_cls.renderform,
             },
         }
+
+
+def test_plugin_is_async():
+    class SyncPlugin(Plugin):
+        class Meta:
+            version = "3.0.0"
+
+        def execute(self, inputs, context):
+            pass
+
+    class AsyncPlugin(Plugin):
+        class Meta:
+            version = "3.0.1"
+
+        async def execute(self, inputs, context):
+            pass
+
+    assert SyncPlugin.is_async() is False
+    assert AsyncPlugin.is_async() is True
+
+
+class TestPluginDetail:
+    @patch("bk_plugin_framework.hub.load_form_module_path", MagicMock(return_value="tests"))
+    def test_detail(self):
+        class MyPlugin(Plugin):
+            class Meta:
+                version = "2.0.0"
+
+            class Inputs(InputsModel):
+                a: int
+
+        class MyChildPlugin(MyPlugin):
+            class Meta:
+                version = "2.0.1"
+
+        with patch.object(MyPlugin, "dict", wraps=MyPlugin.dict) as dict_method:
+            detail = MyPlugin.detail()
+            assert MyPlugin.detail() is detail
+
+        dict_method.assert_called_once()
+        assert detail.data == MyPlugin.dict()
+        assert json.loads(detail.content) == {"result": True, "data": MyPlugin.dict(), "message": ""}
+        assert detail.etag == '"%s"' % hashlib.sha1(detail.content).hexdigest()
+
+        child_detail = MyChildPlugin.detail()
+        assert child_detail.data["version"] == "2.0.1"
+        assert child_detail.etag != detail.etag
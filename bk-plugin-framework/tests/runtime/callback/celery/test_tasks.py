@@ -39,6 +39,7 @@ class MockScheduleLock:
     def __init__(self, trace_id: str, locked: bool):
         self.trace_id = trace_id
         self.locked = locked
+        self.schedule = None
 
     def __enter__(self):
         return self
@@ -47,11 +48,11 @@ class MockScheduleLock:
         pass
 
 
-def mock_schedule_lock(trace_id):
+def mock_schedule_lock(trace_id, **kwargs):
     return MockScheduleLock(trace_id, True)
 
 
-def mock_schedule_lock_fail(trace_id):
+def mock_schedule_lock_fail(trace_id, **kwargs):
     return MockScheduleLock(trace_id, False)
 
 
@@ -85,34 +86,33 @@ class TestCallbackTask:
     def test_callback_state_not_callback(self, trace_id, callback_id, callback_data):
         schedule_obj = MagicMock(state=4)
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(return_value=schedule_obj)
+        Schedule.objects.get_for_execute = MagicMock(return_value=schedule_obj)
         with patch("bk_plugin_framework.runtime.callback.celery.tasks.get_schedule_lock", mock_schedule_lock):
             with patch("bk_plugin_framework.runtime.callback.celery.tasks.Schedule", Schedule):
                 tasks.callback(trace_id, callback_id, callback_data)
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
 
     def test_callback__get_schedule_obj_err(self, trace_id, callback_id, callback_data):
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(side_effect=Exception)
+        Schedule.objects.get_for_execute = MagicMock(side_effect=Exception)
         with patch("bk_plugin_framework.runtime.callback.celery.tasks.get_schedule_lock", mock_schedule_lock):
             with patch("bk_plugin_framework.runtime.callback.celery.tasks.Schedule", Schedule):
                 tasks.callback(trace_id, callback_id, callback_data)
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter(trace_id=trace_id).update.assert_called_once_with(state=State.FAIL.value)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        Schedule.objects.update_with_version.assert_called_once_with(trace_id, state=State.FAIL.value)
 
     def test_callback__plugin_version_missing(self, trace_id, callback_id, callback_data):
         schedule_obj = MagicMock(state=3)
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(return_value=schedule_obj)
+        Schedule.objects.get_for_execute = MagicMock(return_value=schedule_obj)
         VersionHub = MagicMock()
-        VersionHub.all_plugins().get = MagicMock(return_value=None)
+        VersionHub.get = MagicMock(return_value=None)
         with patch("bk_plugin_framework.runtime.callback.celery.tasks.get_schedule_lock", mock_schedule_lock):
             with patch("bk_plugin_framework.runtime.callback.celery.tasks.Schedule", Schedule):
                 with patch("bk_plugin_framework.runtime.callback.celery.tasks.VersionHub", VersionHub):
@@ -120,15 +120,14 @@ class TestCallbackTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        VersionHub.all_plugins().get.assert_called_once_with(schedule_obj.plugin_version)
-        Schedule.objects.filter.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter(trace_id=trace_id).update.assert_called_once_with(state=State.FAIL.value)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        VersionHub.get.assert_called_once_with(schedule_obj.plugin_version)
+        Schedule.objects.update_with_version.assert_called_once_with(trace_id, state=State.FAIL.value)
 
     def test_callback__execute_err(self, trace_id, callback_id, callback_data):
         schedule_obj = MagicMock(state=3)
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(return_value=schedule_obj)
+        Schedule.objects.get_for_execute = MagicMock(return_value=schedule_obj)
         VersionHub = MagicMock()
         executor = MagicMock()
         executor.schedule = MagicMock(side_effect=Exception)
@@ -141,21 +140,20 @@ class TestCallbackTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        VersionHub.all_plugins().get.assert_called_once_with(schedule_obj.plugin_version)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        VersionHub.get.assert_called_once_with(schedule_obj.plugin_version)
         BKPluginExecutor.assert_called_once_with(trace_id=trace_id)
         executor.schedule.assert_called_once_with(
-            plugin_cls=VersionHub.all_plugins().get(schedule_obj.plugin_version),
+            plugin_cls=VersionHub.get(schedule_obj.plugin_version),
             schedule=schedule_obj,
             callback_info={"callback_id": callback_id, "callback_data": json.loads(callback_data)},
         )
-        Schedule.objects.filter.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter(trace_id=trace_id).update.assert_called_once_with(state=State.FAIL.value)
+        Schedule.objects.update_with_version.assert_called_once_with(trace_id, state=State.FAIL.value)
 
     def test_callback__execute_success(self, trace_id, callback_id, callback_data):
         schedule_obj = MagicMock(state=3)
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(return_value=schedule_obj)
+        Schedule.objects.get_for_execute = MagicMock(return_value=schedule_obj)
         VersionHub = MagicMock()
         executor = MagicMock()
         BKPluginExecutor = MagicMock(return_value=executor)
@@ -167,12 +165,30 @@ class TestCallbackTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        VersionHub.all_plugins().get.assert_called_once_with(schedule_obj.plugin_version)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        VersionHub.get.assert_called_once_with(schedule_obj.plugin_version)
         BKPluginExecutor.assert_called_once_with(trace_id=trace_id)
         executor.schedule.assert_called_once_with(
-            plugin_cls=VersionHub.all_plugins().get(schedule_obj.plugin_version),
+            plugin_cls=VersionHub.get(schedule_obj.plugin_version),
             schedule=schedule_obj,
             callback_info={"callback_id": callback_id, "callback_data": json.loads(callback_data)},
         )
-        Schedule.objects.filter.assert_not_called()
+        Schedule.objects.update_with_version.assert_not_called()
+
+    def test_callback__use_schedule_fetched_with_lock(self, trace_id, callback_id, callback_data):
+        schedule_obj = MagicMock(state=3)
+        lock = MockScheduleLock(trace_id, True)
+        lock.schedule = schedule_obj
+        get_schedule_lock = MagicMock(return_value=lock)
+        Schedule = MagicMock()
+        executor = MagicMock()
+        BKPluginExecutor = MagicMock(return_value=executor)
+        with patch("bk_plugin_framework.runtime.callback.celery.tasks.get_schedule_lock", get_schedule_lock):
+            with patch("bk_plugin_framework.runtime.callback.celery.tasks.Schedule", Schedule):
+                with patch("bk_plugin_framework.runtime.callback.celery.tasks.VersionHub", MagicMock()):
+                    with patch("bk_plugin_framework.runtime.callback.celery.tasks.BKPluginExecutor", BKPluginExecutor):
+                        tasks.callback(trace_id, callback_id, callback_data)
+
+        get_schedule_lock.assert_called_once_with(trace_id, fetch=True)
+        Schedule.objects.get_for_execute.assert_not_called()
+        assert executor.schedule.call_args.kwargs["schedule"] is schedule_obj
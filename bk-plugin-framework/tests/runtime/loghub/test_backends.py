@@ -0,0 +1,226 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bk_plugin_framework.runtime.loghub import backends
+from bk_plugin_framework.runtime.loghub.backends import (
+    ORMLogStorage,
+    RingBufferLogStorage,
+    SegmentFileLogStorage,
+    get_log_storage,
+)
+
+
+@pytest.fixture
+def clear_storage_cache():
+    get_log_storage.cache_clear()
+    yield
+    get_log_storage.cache_clear()
+
+
+class TestORMLogStorage:
+    def test_write_single_record(self):
+        LogEntry = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.loghub.models.LogEntry", LogEntry):
+            ORMLogStorage().write([("t1", "bk_plugin", "INFO", "a")])
+
+        LogEntry.objects.create.assert_called_once_with(
+            trace_id="t1", logger_name="bk_plugin", level_name="INFO", message="a"
+        )
+
+    def test_write_records(self):
+        LogEntry = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.loghub.models.LogEntry", LogEntry):
+            ORMLogStorage().write([("t1", "bk_plugin", "INFO", "a"), ("t1", "bk_plugin", "INFO", "b")])
+
+        LogEntry.objects.bulk_create.assert_called_once()
+        assert LogEntry.call_count == 2
+
+    def test_iter_items_after_id(self):
+        LogEntry = MagicMock()
+        entry = MagicMock()
+        LogEntry.objects.order_by().filter().filter().iterator = MagicMock(return_value=[entry])
+
+        with patch("bk_plugin_framework.runtime.loghub.models.LogEntry", LogEntry):
+            items = list(ORMLogStorage().iter_items("t1", after_id=10))
+
+        LogEntry.objects.order_by().filter().filter.assert_called_with(id__gt=10)
+        assert [item.id for item in items] == [entry.id]
+
+    def test_delete_expired_log(self):
+        LogEntry = MagicMock()
+        LogEntry.objects.delete_expired_log.return_value = 3
+
+        with patch("bk_plugin_framework.runtime.loghub.models.LogEntry", LogEntry):
+            assert ORMLogStorage().delete_expired_log(30) == 3
+
+        LogEntry.objects.delete_expired_log.assert_called_once_with(30)
+
+
+class TestSegmentFileLogStorage:
+    def test_write_and_read(self, tmp_path):
+        storage = SegmentFileLogStorage(directory=str(tmp_path), segment_size=1024)
+        storage.write([("t1", "bk_plugin", "INFO", "a"), ("t2", "bk_plugin", "INFO", "b")])
+        storage.write([("t1", "bk_plugin", "ERROR", "c")])
+
+        items = list(storage.iter_items("t1"))
+        assert [item.message for item in items] == ["a", "c"]
+        assert [item.level_name for item in items] == ["INFO", "ERROR"]
+        assert items[0].id < items[1].id
+        assert storage.get_plain_log("t2") == "b"
+        assert storage.get_plain_log("t3") == ""
+
+    def test_iter_items_after_id(self, tmp_path):
+        storage = SegmentFileLogStorage(directory=str(tmp_path), segment_size=64)
+        for message in ["a", "b", "c", "d"]:
+            storage.write([("t1", "bk_plugin", "INFO", message)])
+
+        items = list(storage.iter_items("t1"))
+        assert [item.message for item in storage.iter_items("t1", after_id=items[1].id)] == ["c", "d"]
+        assert list(storage.iter_items("t1", after_id=items[-1].id)) == []
+
+    def test_segment_rotate(self, tmp_path):
+        storage = SegmentFileLogStorage(directory=str(tmp_path), segment_size=1)
+        for message in ["a", "b", "c"]:
+            storage.write([("t1", "bk_plugin", "INFO", message)])
+
+        assert storage._segments() == [0, 1, 2]
+        items = list(storage.iter_items("t1"))
+        assert [item.message for item in items] == ["a", "b", "c"]
+        assert [item.id for item in items] == sorted(item.id for item in items)
+
+    def test_ignore_incomplete_index_line(self, tmp_path):
+        storage = SegmentFileLogStorage(directory=str(tmp_path), segment_size=1024)
+        storage.write([("t1", "bk_plugin", "INFO", "a")])
+        with open(storage._trace_index_path("t1"), "a") as index_file:
+            index_file.write("0 100")
+
+        assert storage.get_plain_log("t1") == "a"
+
+    def test_read_only_trace_index(self, tmp_path):
+        storage = SegmentFileLogStorage(directory=str(tmp_path), segment_size=1024)
+        storage.write([("t1", "bk_plugin", "INFO", "a"), ("t2", "bk_plugin", "INFO", "b")])
+        storage.write([("t1", "bk_plugin", "INFO", "c")])
+
+        with open(storage._trace_index_path("t1")) as index_file:
+            assert len(index_file.readlines()) == 2
+        with patch.object(storage, "_trace_index_path", wraps=storage._trace_index_path) as trace_index_path:
+            assert storage.get_plain_log("t1") == "a\nc"
+
+        trace_index_path.assert_called_once_with("t1")
+
+    def test_unsafe_trace_id(self, tmp_path):
+        storage = SegmentFileLogStorage(directory=str(tmp_path), segment_size=1024)
+        storage.write([("../t1", "bk_plugin", "INFO", "a")])
+
+        assert os.path.dirname(os.path.dirname(storage._trace_index_path("../t1"))) == str(
+            tmp_path / SegmentFileLogStorage.TRACE_INDEX_DIR
+        )
+        assert storage.get_plain_log("../t1") == "a"
+
+    def test_delete_expired_log(self, tmp_path):
+        storage = SegmentFileLogStorage(directory=str(tmp_path), segment_size=1)
+        storage.write([("t1", "bk_plugin", "INFO", "a")])
+        storage.write([("t2", "bk_plugin", "INFO", "b")])
+        storage.write([("t3", "bk_plugin", "INFO", "c")])
+        expired = time.time() - 3 * 24 * 60 * 60
+        for segment in storage._segments():
+            os.utime(storage._data_path(segment), (expired, expired))
+        for trace_id in ["t1", "t3"]:
+            os.utime(storage._trace_index_path(trace_id), (expired, expired))
+
+        assert storage.delete_expired_log(2) == 2
+
+        # 最新的分段始终保留
+        assert storage._segments() == [2]
+        assert not os.path.exists(storage._trace_index_path("t1"))
+        assert storage.get_plain_log("t3") == ""
+        # 索引未过期但分段已被清理
+        assert storage.get_plain_log("t2") == ""
+
+        storage.write([("t4", "bk_plugin", "INFO", "d")])
+        assert storage._segments() == [2, 3]
+        assert storage.get_plain_log("t4") == "d"
+
+
+class TestRingBufferLogStorage:
+    def test_write_and_read(self):
+        storage = RingBufferLogStorage(capacity=2)
+        storage.write([("t1", "bk_plugin", "INFO", "a"), ("t2", "bk_plugin", "INFO", "b")])
+        storage.write([("t1", "bk_plugin", "INFO", "c")])
+
+        assert storage.get_plain_log("t1") == "c"
+        assert storage.get_plain_log("t2") == "b"
+        assert [item.id for item in storage.iter_items("t1")] == [3]
+
+    def test_iter_items_after_id(self):
+        storage = RingBufferLogStorage(capacity=10)
+        storage.write([("t1", "bk_plugin", "INFO", "a"), ("t1", "bk_plugin", "INFO", "b")])
+
+        assert [item.message for item in storage.iter_items("t1", after_id=1)] == ["b"]
+
+    def test_evict_trace_items(self):
+        storage = RingBufferLogStorage(capacity=2)
+        storage.write([("t1", "bk_plugin", "INFO", "a"), ("t2", "bk_plugin", "INFO", "b")])
+        storage.write([("t2", "bk_plugin", "INFO", "c")])
+
+        assert storage.get_plain_log("t1") == ""
+        assert storage.get_plain_log("t2") == "b\nc"
+        assert "t1" not in storage._trace_items
+
+    def test_delete_expired_log(self):
+        storage = RingBufferLogStorage(capacity=10)
+        with patch.object(backends.time, "time", MagicMock(return_value=0)):
+            storage.write([("t1", "bk_plugin", "INFO", "a")])
+        storage.write([("t1", "bk_plugin", "INFO", "b")])
+
+        assert storage.delete_expired_log(1) == 1
+        assert storage.get_plain_log("t1") == "b"
+
+    def test_evict_expired_on_write(self):
+        storage = RingBufferLogStorage(capacity=10, retention_days=1)
+        with patch.object(backends.time, "time", MagicMock(return_value=0)):
+            storage.write([("t1", "bk_plugin", "INFO", "a")])
+        storage.write([("t2", "bk_plugin", "INFO", "b")])
+
+        assert storage.get_plain_log("t1") == ""
+        assert storage.get_plain_log("t2") == "b"
+
+
+class TestGetLogStorage:
+    @pytest.mark.parametrize(
+        "backend, storage_cls",
+        [("orm", ORMLogStorage), ("memory", RingBufferLogStorage), ("file", SegmentFileLogStorage)],
+    )
+    def test_builtin_backend(self, clear_storage_cache, tmp_path, backend, storage_cls):
+        with patch.object(backends.settings, "LOG_STORAGE_BACKEND", backend):
+            with patch.object(backends.settings, "LOG_STORAGE_FILE_DIR", str(tmp_path)):
+                storage = get_log_storage()
+
+        assert isinstance(storage, storage_cls)
+        assert get_log_storage() is storage
+
+    def test_import_path_backend(self, clear_storage_cache):
+        path = "bk_plugin_framework.runtime.loghub.backends.ORMLogStorage"
+        with patch.object(backends.settings, "LOG_STORAGE_BACKEND", path):
+            assert isinstance(get_log_storage(), ORMLogStorage)
+
+    def test_unknown_backend(self, clear_storage_cache):
+        with patch.object(backends.settings, "LOG_STORAGE_BACKEND", "unknown"):
+            with pytest.raises(RuntimeError):
+                get_log_storage()
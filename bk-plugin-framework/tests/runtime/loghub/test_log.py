@@ -0,0 +1,184 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bk_plugin_framework.runtime.loghub import log
+from bk_plugin_framework.runtime.loghub.log import (
+    BufferedTraceContextLogHandler,
+    flush_buffered_logs,
+    request_flush_buffered_logs,
+)
+from bk_plugin_framework.utils import local
+
+
+def make_record(msg="message"):
+    return logging.LogRecord("bk_plugin", logging.INFO, __file__, 1, msg, None, None)
+
+
+@pytest.fixture
+def handler():
+    handler = BufferedTraceContextLogHandler(capacity=2, flush_interval=60)
+    yield handler
+    with patch("bk_plugin_framework.runtime.loghub.log.get_log_storage", MagicMock()):
+        handler.close()
+
+
+class TestBufferedTraceContextLogHandler:
+    def test_emit__without_trace_id(self, handler):
+        handler.emit(make_record())
+
+        assert handler._buffer == []
+        assert handler._flusher is None
+
+    def test_emit__start_flusher_lazily(self, handler):
+        assert handler._flusher is None
+
+        local.set_trace_id("trace_id")
+        handler.emit(make_record())
+        flusher = handler._flusher
+        handler.emit(make_record())
+
+        assert flusher.is_alive()
+        assert handler._flusher is flusher
+
+    def test_emit__buffer_record(self, handler):
+        local.set_trace_id("trace_id")
+        handler.emit(make_record("hello"))
+
+        assert handler._buffer == [("trace_id", "bk_plugin", "INFO", "hello")]
+        assert not handler._flush_event.is_set()
+
+    def test_emit__capacity_reached_notify_flusher(self, handler):
+        local.set_trace_id("trace_id")
+        handler.emit(make_record())
+        assert not handler._flush_event.is_set()
+
+        flushed = threading.Event()
+        with patch.object(handler, "flush", MagicMock(side_effect=lambda: flushed.set())):
+            handler.emit(make_record())
+            assert flushed.wait(timeout=5)
+
+    def test_flush(self, handler):
+        local.set_trace_id("trace_id")
+        handler.emit(make_record("a"))
+        handler.emit(make_record("b"))
+        storage = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.loghub.log.get_log_storage", MagicMock(return_value=storage)):
+            handler.flush()
+
+        assert handler._buffer == []
+        storage.write.assert_called_once_with(
+            [("trace_id", "bk_plugin", "INFO", "a"), ("trace_id", "bk_plugin", "INFO", "b")]
+        )
+
+    def test_flush__empty_buffer(self, handler):
+        storage = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.loghub.log.get_log_storage", MagicMock(return_value=storage)):
+            handler.flush()
+
+        storage.write.assert_not_called()
+
+    def test_flush__bulk_create_err(self, handler):
+        local.set_trace_id("trace_id")
+        handler.emit(make_record())
+        storage = MagicMock()
+        storage.write = MagicMock(side_effect=Exception)
+
+        with patch("bk_plugin_framework.runtime.loghub.log.get_log_storage", MagicMock(return_value=storage)):
+            handler.flush()
+
+        assert handler._buffer == []
+
+    def test_request_flush_buffered_logs(self, handler):
+        request_flush_buffered_logs(sender=None)
+
+        assert handler._flush_event.is_set()
+
+    def test_close(self, handler):
+        local.set_trace_id("trace_id")
+        handler.emit(make_record())
+        storage = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.loghub.log.get_log_storage", MagicMock(return_value=storage)):
+            handler.close()
+
+        assert handler not in log._BUFFERED_HANDLERS
+        assert not handler._flusher.is_alive()
+        storage.write.assert_called_once()
+
+    def test_close__flusher_not_started(self, handler):
+        handler.close()
+
+        assert handler._flusher is None
+        assert handler not in log._BUFFERED_HANDLERS
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="fork is not supported")
+    def test_fork__child_start_own_flusher(self, handler):
+        local.set_trace_id("trace_id")
+        handler.emit(make_record("parent"))
+        parent_flusher = handler._flusher
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # 子进程：不继承父进程的缓冲及后台线程，写入日志后由自己的后台线程落库
+            result = b"0"
+            try:
+                written = []
+                flushed = threading.Event()
+
+                def write(entries):
+                    written.extend(entries)
+                    flushed.set()
+
+                storage = MagicMock()
+                storage.write = write
+                with patch("bk_plugin_framework.runtime.loghub.log.get_log_storage", MagicMock(return_value=storage)):
+                    inherited_buffer = list(handler._buffer)
+                    handler.emit(make_record("child"))
+                    handler.request_flush()
+                    if (
+                        inherited_buffer == []
+                        and handler._flusher is not parent_flusher
+                        and flushed.wait(timeout=5)
+                        and written == [("trace_id", "bk_plugin", "INFO", "child")]
+                    ):
+                        result = b"1"
+            finally:
+                os.write(write_fd, result)
+                os._exit(0)
+
+        os.close(write_fd)
+        result = os.read(read_fd, 1)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+
+        assert result == b"1"
+        assert handler._buffer == [("trace_id", "bk_plugin", "INFO", "parent")]
+
+
+def test_flush_buffered_logs(handler):
+    local.set_trace_id("trace_id")
+    handler.emit(make_record())
+    storage = MagicMock()
+
+    with patch("bk_plugin_framework.runtime.loghub.log.get_log_storage", MagicMock(return_value=storage)):
+        flush_buffered_logs(sender=None)
+
+    storage.write.assert_called_once_with([("trace_id", "bk_plugin", "INFO", "message")])
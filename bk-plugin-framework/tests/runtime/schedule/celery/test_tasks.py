@@ -14,9 +14,11 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 from django.db import OperationalError
+from django.utils import timezone
 
 from bk_plugin_framework.kit import State
 from bk_plugin_framework.runtime.schedule.celery import tasks
+from bk_plugin_framework.runtime.schedule.models import Schedule
 from bk_plugin_framework.utils import local
 
 
@@ -33,23 +35,22 @@ def schedule_id():
 class TestScheduleTask:
     def test_schedule__get_schedule_obj_err(self, trace_id, schedule_id):
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(side_effect=Exception)
+        Schedule.objects.get_for_execute = MagicMock(side_effect=Exception)
 
         with patch("bk_plugin_framework.runtime.schedule.celery.tasks.Schedule", Schedule):
             tasks.schedule(trace_id)
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter(trace_id=trace_id).update.assert_called_once_with(state=State.FAIL.value)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        Schedule.objects.update_with_version.assert_called_once_with(trace_id, state=State.FAIL.value)
 
     def test_schedule__plugin_version_missing(self, trace_id, schedule_id):
         schedule_obj = MagicMock()
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(return_value=schedule_obj)
+        Schedule.objects.get_for_execute = MagicMock(return_value=schedule_obj)
         VersionHub = MagicMock()
-        VersionHub.all_plugins().get = MagicMock(return_value=None)
+        VersionHub.get = MagicMock(return_value=None)
 
         with patch("bk_plugin_framework.runtime.schedule.celery.tasks.Schedule", Schedule):
             with patch("bk_plugin_framework.runtime.schedule.celery.tasks.VersionHub", VersionHub):
@@ -57,15 +58,14 @@ class TestScheduleTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        VersionHub.all_plugins().get.assert_called_once_with(schedule_obj.plugin_version)
-        Schedule.objects.filter.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter(trace_id=trace_id).update.assert_called_once_with(state=State.FAIL.value)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        VersionHub.get.assert_called_once_with(schedule_obj.plugin_version)
+        Schedule.objects.update_with_version.assert_called_once_with(trace_id, state=State.FAIL.value)
 
     def test_schedule__execute_err(self, trace_id, schedule_id):
         schedule_obj = MagicMock()
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(return_value=schedule_obj)
+        Schedule.objects.get_for_execute = MagicMock(return_value=schedule_obj)
         VersionHub = MagicMock()
         executor = MagicMock()
         executor.schedule = MagicMock(side_effect=Exception)
@@ -78,19 +78,18 @@ class TestScheduleTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        VersionHub.all_plugins().get.assert_called_once_with(schedule_obj.plugin_version)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        VersionHub.get.assert_called_once_with(schedule_obj.plugin_version)
         BKPluginExecutor.assert_called_once_with(trace_id=trace_id)
         executor.schedule.assert_called_once_with(
-            plugin_cls=VersionHub.all_plugins().get(schedule_obj.plugin_version), schedule=schedule_obj
+            plugin_cls=VersionHub.get(schedule_obj.plugin_version), schedule=schedule_obj
         )
-        Schedule.objects.filter.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter(trace_id=trace_id).update.assert_called_once_with(state=State.FAIL.value)
+        Schedule.objects.update_with_version.assert_called_once_with(trace_id, state=State.FAIL.value)
 
     def test_schedule__execute_success(self, trace_id, schedule_id):
         schedule_obj = MagicMock()
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(return_value=schedule_obj)
+        Schedule.objects.get_for_execute = MagicMock(return_value=schedule_obj)
         VersionHub = MagicMock()
         executor = MagicMock()
         BKPluginExecutor = MagicMock(return_value=executor)
@@ -102,18 +101,18 @@ class TestScheduleTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
-        VersionHub.all_plugins().get.assert_called_once_with(schedule_obj.plugin_version)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
+        VersionHub.get.assert_called_once_with(schedule_obj.plugin_version)
         BKPluginExecutor.assert_called_once_with(trace_id=trace_id)
         executor.schedule.assert_called_once_with(
-            plugin_cls=VersionHub.all_plugins().get(schedule_obj.plugin_version), schedule=schedule_obj
+            plugin_cls=VersionHub.get(schedule_obj.plugin_version), schedule=schedule_obj
         )
-        Schedule.objects.filter.assert_not_called()
+        Schedule.objects.update_with_version.assert_not_called()
 
     def test_schedule__transient_db_error_will_retry(self, trace_id, schedule_id):
         Schedule = MagicMock()
-        db_err = OperationalError("(2003, \"Can't connect to MySQL server (110)\")")
-        Schedule.objects.get = MagicMock(side_effect=db_err)
+        db_err = OperationalError('(2003, "Can\'t connect to MySQL server (110)")')
+        Schedule.objects.get_for_execute = MagicMock(side_effect=db_err)
 
         class _Retry(Exception):
             pass
@@ -125,16 +124,16 @@ class TestScheduleTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
         # 瞬时数据库连接错误应触发重试，而不是把调度直接置为失败
         mock_retry.assert_called_once()
         assert mock_retry.call_args[1]["exc"] is db_err
         assert mock_retry.call_args[1]["countdown"] == 5
-        Schedule.objects.filter.assert_not_called()
+        Schedule.objects.update_with_version.assert_not_called()
 
     def test_schedule__transient_db_error_set_fail_when_retries_exhausted(self, trace_id, schedule_id):
         Schedule = MagicMock()
-        Schedule.objects.get = MagicMock(side_effect=OperationalError())
+        Schedule.objects.get_for_execute = MagicMock(side_effect=OperationalError())
 
         with patch("bk_plugin_framework.runtime.schedule.celery.tasks.Schedule", Schedule):
             with patch.object(tasks.schedule, "retry") as mock_retry:
@@ -143,8 +142,33 @@ class TestScheduleTask:
 
         assert local.get_trace_id() == trace_id
 
-        Schedule.objects.get.assert_called_once_with(trace_id=trace_id)
+        Schedule.objects.get_for_execute.assert_called_once_with(trace_id=trace_id)
         # 重试已耗尽：不再重试，兜底置为失败
         mock_retry.assert_not_called()
-        Schedule.objects.filter.assert_called_once_with(trace_id=trace_id)
-        Schedule.objects.filter(trace_id=trace_id).update.assert_called_once_with(state=State.FAIL.value)
+        Schedule.objects.update_with_version.assert_called_once_with(trace_id, state=State.FAIL.value)
+
+
+@pytest.mark.django_db
+class TestRecoverLocalPollScheduleTask:
+    def test_recover_local_poll_schedule(self):
+        expired_at = timezone.now() - timezone.timedelta(minutes=5)
+        stale = Schedule.objects.create(
+            trace_id=uuid.uuid4().hex, plugin_version="1.0.0", state=State.POLL.value, data="{}", poll_at=expired_at
+        )
+        Schedule.objects.create(
+            trace_id=uuid.uuid4().hex,
+            plugin_version="1.0.0",
+            state=State.POLL.value,
+            data="{}",
+            poll_at=timezone.now(),
+        )
+        Schedule.objects.create(trace_id=uuid.uuid4().hex, plugin_version="1.0.0", state=State.POLL.value, data="{}")
+        current_app = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.schedule.local_poll.current_app", current_app):
+            tasks.recover_local_poll_schedule()
+
+        current_app.tasks[tasks.BKPluginExecutor.SCHEDULE_TASK_NAME].apply_async.assert_called_once_with(
+            kwargs={"trace_id": stale.trace_id}, countdown=0, queue="plugin_schedule"
+        )
+        assert Schedule.objects.get(trace_id=stale.trace_id).poll_at is None
@@ -0,0 +1,144 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import asyncio
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from bk_plugin_framework.runtime.schedule import async_schedule
+from bk_plugin_framework.runtime.schedule.async_schedule import AsyncScheduleRunner
+
+
+@pytest.fixture(autouse=True)
+def close_old_connections():
+    with patch.object(async_schedule, "close_old_connections") as close_old_connections:
+        yield close_old_connections
+
+
+@pytest.fixture
+def runner():
+    runner = AsyncScheduleRunner(concurrency=2, threads=2)
+    yield runner
+    runner.shutdown(timeout=1)
+
+
+class TestAsyncScheduleRunner:
+    def test_submit(self, runner):
+        done = threading.Event()
+        loop_threads = []
+
+        async def coroutine():
+            await asyncio.sleep(0)
+            loop_threads.append(threading.current_thread().name)
+            done.set()
+
+        assert runner.submit(coroutine) is True
+        assert done.wait(1)
+        assert loop_threads == ["bk_plugin_async_schedule_loop"]
+
+    def test_submit_exceed_concurrency(self, runner):
+        release = threading.Event()
+
+        async def block():
+            await asyncio.get_running_loop().run_in_executor(None, release.wait)
+
+        assert runner.submit(block) is True
+        assert runner.submit(block) is True
+        assert runner.submit(block) is False
+        assert runner.running == 2
+
+        release.set()
+        assert runner.shutdown(timeout=1) is True
+        assert runner.running == 0
+
+    def test_coroutine_raise(self, runner):
+        async def fail():
+            raise Exception("fail")
+
+        assert runner.submit(fail) is True
+        assert runner.shutdown(timeout=1) is True
+
+    def test_shutdown_timeout(self, runner):
+        release = threading.Event()
+
+        async def block():
+            await asyncio.get_running_loop().run_in_executor(None, release.wait)
+
+        runner.submit(block)
+
+        assert runner.shutdown(timeout=0.01) is False
+        release.set()
+
+    def test_submit_after_shutdown(self, runner):
+        runner.shutdown(timeout=1)
+
+        async def coroutine():
+            pass
+
+        assert runner.submit(coroutine) is False
+
+    def test_shutdown_not_started(self):
+        assert AsyncScheduleRunner(concurrency=1, threads=1).shutdown(timeout=1) is True
+
+
+def test_run_sync(close_old_connections):
+    main_thread = threading.current_thread()
+
+    def func(a, b):
+        assert threading.current_thread() is not main_thread
+        return a + b
+
+    assert asyncio.run(async_schedule.run_sync(func, 1, b=2)) == 3
+    assert close_old_connections.call_count == 2
+
+
+class TestGetAsyncScheduleRunner:
+    def setup_method(self):
+        async_schedule.get_async_schedule_runner.cache_clear()
+
+    def teardown_method(self):
+        async_schedule.get_async_schedule_runner.cache_clear()
+
+    @patch.object(async_schedule.settings, "ASYNC_SCHEDULE_ENABLED", False)
+    def test_disabled(self):
+        assert async_schedule.get_async_schedule_runner() is None
+        async_schedule.shutdown_async_schedule_runner()
+
+    @patch.object(async_schedule.settings, "ASYNC_SCHEDULE_ENABLED", True)
+    @patch.object(async_schedule.settings, "ASYNC_SCHEDULE_CONCURRENCY", 10)
+    @patch.object(async_schedule.settings, "ASYNC_SCHEDULE_THREADS", 3)
+    def test_enabled(self):
+        with patch.object(async_schedule, "atexit"):
+            runner = async_schedule.get_async_schedule_runner()
+
+        assert runner is async_schedule.get_async_schedule_runner()
+        assert runner.concurrency == 10
+        assert runner.threads == 3
+
+        async_schedule.shutdown_async_schedule_runner()
+
+        async def coroutine():
+            pass
+
+        assert runner.submit(coroutine) is False
+
+    @patch.object(async_schedule.settings, "ASYNC_SCHEDULE_ENABLED", True)
+    def test_asgiref_not_installed(self):
+        with patch.object(async_schedule, "sync_to_async", None):
+            with pytest.raises(RuntimeError):
+                async_schedule.get_async_schedule_runner()
+
+    def test_shutdown_not_created(self):
+        async_schedule.shutdown_async_schedule_runner()
+
+        assert async_schedule.get_async_schedule_runner.cache_info().currsize == 0
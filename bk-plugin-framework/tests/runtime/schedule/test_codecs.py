@@ -0,0 +1,86 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import base64
+import json
+import math
+
+import pytest
+
+from bk_plugin_framework.runtime.schedule import codecs
+from bk_plugin_framework.runtime.schedule.codecs import ScheduleDataSerializer
+
+DATA = {"inputs": {"a": 1}, "context": {"storage": {"count": 1}, "outputs": {}, "data": {}}, "outputs": {"b": "2"}}
+LARGE_DATA = {"inputs": {"a": "x" * 4096}, "context": {"storage": {}, "outputs": {}, "data": {}}, "outputs": {}}
+
+
+class TestScheduleDataSerializer:
+    def test_json(self):
+        serializer = ScheduleDataSerializer(codec="json", compress=False, compress_threshold=0)
+
+        assert serializer.dumps(DATA) == json.dumps(DATA)
+        assert serializer.loads(json.dumps(DATA)) == DATA
+
+    def test_orjson(self):
+        pytest.importorskip("orjson")
+        serializer = ScheduleDataSerializer(codec="orjson", compress=False, compress_threshold=0)
+
+        data = serializer.dumps(DATA)
+        assert json.loads(data) == DATA
+        assert serializer.loads(data) == DATA
+        assert math.isnan(serializer.loads('{"a": NaN}')["a"])
+
+    def test_msgpack(self):
+        pytest.importorskip("msgpack")
+        serializer = ScheduleDataSerializer(codec="msgpack", compress=False, compress_threshold=0)
+
+        # 未压缩时以 json 文本存储
+        data = serializer.dumps(DATA)
+        assert data == json.dumps(DATA)
+        assert serializer.loads(data) == DATA
+
+        # 兼容历史的未压缩 msgpack 数据
+        tagged = codecs.TAGGED_PREFIX + "1" + base64.b64encode(codecs.MSGPACK_CODEC.dumps(DATA)).decode("ascii")
+        assert serializer.loads(tagged) == DATA
+
+    @pytest.mark.parametrize("codec, tag", [("json", "3"), ("orjson", "4"), ("msgpack", "2")])
+    def test_compress(self, codec, tag):
+        pytest.importorskip("zstandard")
+        if codec != "json":
+            pytest.importorskip(codec)
+        serializer = ScheduleDataSerializer(codec=codec, compress=True, compress_threshold=1024)
+
+        data = serializer.dumps(LARGE_DATA)
+        assert data.startswith(codecs.TAGGED_PREFIX + tag)
+        assert len(data) < len(json.dumps(LARGE_DATA))
+        assert serializer.loads(data) == LARGE_DATA
+
+        # 小于阈值的数据不压缩，以 json 文本存储
+        assert json.loads(serializer.dumps(DATA)) == DATA
+
+    def test_load_data_written_by_other_codec(self):
+        pytest.importorskip("msgpack")
+        pytest.importorskip("zstandard")
+        json_serializer = ScheduleDataSerializer(codec="json", compress=False, compress_threshold=0)
+        msgpack_serializer = ScheduleDataSerializer(codec="msgpack", compress=True, compress_threshold=1024)
+
+        assert json_serializer.loads(msgpack_serializer.dumps(LARGE_DATA)) == LARGE_DATA
+        assert msgpack_serializer.loads(json_serializer.dumps(DATA)) == DATA
+
+    def test_unknown_tag(self):
+        serializer = ScheduleDataSerializer(codec="json", compress=False, compress_threshold=0)
+
+        with pytest.raises(ValueError):
+            serializer.loads(codecs.TAGGED_PREFIX + "0abc")
+
+    def test_unknown_codec(self):
+        with pytest.raises(RuntimeError):
+            ScheduleDataSerializer(codec="pickle", compress=False, compress_threshold=0)
@@ -0,0 +1,213 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bk_plugin_framework.runtime.schedule import local_poll
+from bk_plugin_framework.runtime.schedule.local_poll import (
+    LocalPollScheduler,
+    PollEntry,
+    TimerWheel,
+)
+
+TASK_NAME = "bk_plugin_framework.runtime.schedule.celery.tasks.schedule"
+
+
+@pytest.fixture(autouse=True)
+def close_old_connections():
+    with patch.object(local_poll, "close_old_connections") as close_old_connections:
+        yield close_old_connections
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = LocalPollScheduler(max_interval=1, tick=0.01, threads=2)
+    yield scheduler
+    with patch.object(local_poll, "dispatch_to_celery"):
+        scheduler.shutdown()
+
+
+class TestTimerWheel:
+    def test_add_and_advance(self):
+        wheel = TimerWheel(tick=1, slots=4)
+
+        assert wheel.add(0, "a") is True
+        assert wheel.add(2, "b") is True
+        assert len(wheel) == 2
+
+        assert wheel.advance() == ["a"]
+        assert wheel.advance() == ["b"]
+        assert wheel.advance() == []
+        assert len(wheel) == 0
+
+    def test_add_out_of_range(self):
+        wheel = TimerWheel(tick=1, slots=4)
+
+        assert wheel.accepts(3) is True
+        assert wheel.accepts(4) is False
+        assert wheel.add(4, "a") is False
+        assert len(wheel) == 0
+
+    def test_drain(self):
+        wheel = TimerWheel(tick=1, slots=4)
+        wheel.add(1, "a")
+        wheel.add(3, "b")
+
+        assert sorted(wheel.drain()) == ["a", "b"]
+        assert wheel.advance() == []
+
+
+class TestLocalPollScheduler:
+    def test_accepts(self, scheduler):
+        assert scheduler.accepts(1) is True
+        assert scheduler.accepts(2) is False
+
+    def test_submit_interval_too_long(self, scheduler):
+        assert scheduler.submit(TASK_NAME, "trace", 2, "poll_at") is False
+        assert len(scheduler.wheel) == 0
+
+    def test_submit_and_execute(self, scheduler):
+        executed = threading.Event()
+        entries = []
+
+        def execute(entry):
+            entries.append(entry)
+            executed.set()
+
+        with patch.object(scheduler, "_execute", execute):
+            assert scheduler.submit(TASK_NAME, "trace", 0.05, "poll_at") is True
+            assert executed.wait(5)
+
+        assert entries[0].trace_id == "trace"
+        assert entries[0].poll_at == "poll_at"
+        assert entries[0].task_name == TASK_NAME
+
+    def test_submit_after_shutdown(self, scheduler):
+        scheduler.shutdown()
+
+        assert scheduler.submit(TASK_NAME, "trace", 0.05, "poll_at") is False
+
+    def test_execute(self, scheduler):
+        Schedule = MagicMock()
+        Schedule.objects.claim_local_poll = MagicMock(return_value=True)
+        current_app = MagicMock()
+        entry = PollEntry(task_name=TASK_NAME, trace_id="trace", poll_at="poll_at", deadline=0)
+
+        with patch.object(local_poll, "Schedule", Schedule):
+            with patch.object(local_poll, "current_app", current_app):
+                scheduler._execute(entry)
+
+        Schedule.objects.claim_local_poll.assert_called_once_with("trace", "poll_at")
+        current_app.tasks[TASK_NAME].assert_called_once_with(trace_id="trace")
+        current_app.tasks[TASK_NAME].apply_async.assert_not_called()
+
+    def test_execute__claim_failed(self, scheduler):
+        Schedule = MagicMock()
+        Schedule.objects.claim_local_poll = MagicMock(return_value=False)
+        current_app = MagicMock()
+        entry = PollEntry(task_name=TASK_NAME, trace_id="trace", poll_at="poll_at", deadline=0)
+
+        with patch.object(local_poll, "Schedule", Schedule):
+            with patch.object(local_poll, "current_app", current_app):
+                scheduler._execute(entry)
+
+        current_app.tasks[TASK_NAME].assert_not_called()
+
+    def test_execute__run_failed_fallback_to_celery(self, scheduler):
+        Schedule = MagicMock()
+        Schedule.objects.claim_local_poll = MagicMock(return_value=True)
+        current_app = MagicMock()
+        current_app.tasks[TASK_NAME].side_effect = Exception
+        entry = PollEntry(task_name=TASK_NAME, trace_id="trace", poll_at="poll_at", deadline=0)
+
+        with patch.object(local_poll, "Schedule", Schedule):
+            with patch.object(local_poll, "current_app", current_app):
+                scheduler._execute(entry)
+
+        current_app.tasks[TASK_NAME].apply_async.assert_called_once_with(
+            kwargs={"trace_id": "trace"}, countdown=1, queue="plugin_schedule"
+        )
+
+    def test_shutdown_fallback_pending_to_celery(self, scheduler):
+        dispatch_to_celery = MagicMock()
+
+        with patch.object(scheduler, "_execute"):
+            scheduler.submit(TASK_NAME, "trace", 1, "poll_at")
+            with patch.object(local_poll, "dispatch_to_celery", dispatch_to_celery):
+                scheduler.shutdown()
+
+        dispatch_to_celery.assert_called_once()
+        args = dispatch_to_celery.call_args[0]
+        assert args[:3] == (TASK_NAME, "trace", "poll_at")
+        assert 0 < dispatch_to_celery.call_args[1]["countdown"] <= 1
+        assert len(scheduler.wheel) == 0
+
+
+class TestDispatchToCelery:
+    def test_dispatch(self):
+        Schedule = MagicMock()
+        Schedule.objects.claim_local_poll = MagicMock(return_value=True)
+        current_app = MagicMock()
+
+        with patch.object(local_poll, "Schedule", Schedule):
+            with patch.object(local_poll, "current_app", current_app):
+                assert local_poll.dispatch_to_celery(TASK_NAME, "trace", "poll_at", countdown=0.5) is True
+
+        current_app.tasks[TASK_NAME].apply_async.assert_called_once_with(
+            kwargs={"trace_id": "trace"}, countdown=1, queue="plugin_schedule"
+        )
+
+    def test_dispatch__claim_failed(self):
+        Schedule = MagicMock()
+        Schedule.objects.claim_local_poll = MagicMock(return_value=False)
+        current_app = MagicMock()
+
+        with patch.object(local_poll, "Schedule", Schedule):
+            with patch.object(local_poll, "current_app", current_app):
+                assert local_poll.dispatch_to_celery(TASK_NAME, "trace", "poll_at") is False
+
+        current_app.tasks[TASK_NAME].apply_async.assert_not_called()
+
+
+def test_get_local_poll_scheduler():
+    local_poll.get_local_poll_scheduler.cache_clear()
+    try:
+        with patch.object(local_poll.settings, "LOCAL_POLL_SCHEDULER_ENABLED", False):
+            assert local_poll.get_local_poll_scheduler() is None
+
+        local_poll.get_local_poll_scheduler.cache_clear()
+        with patch.object(local_poll.settings, "LOCAL_POLL_SCHEDULER_ENABLED", True):
+            with patch.object(local_poll.settings, "LOCAL_POLL_MAX_INTERVAL", 3):
+                with patch.object(local_poll, "atexit"):
+                    scheduler = local_poll.get_local_poll_scheduler()
+
+        assert isinstance(scheduler, LocalPollScheduler)
+        assert scheduler.max_interval == 3
+    finally:
+        local_poll.get_local_poll_scheduler.cache_clear()
+
+
+def test_poll_execute_on_time():
+    # 到期的轮询应在轮询间隔附近被执行
+    scheduler = LocalPollScheduler(max_interval=1, tick=0.01, threads=1)
+    done = threading.Event()
+    start = time.monotonic()
+
+    with patch.object(scheduler, "_execute", lambda entry: done.set()):
+        scheduler.submit(TASK_NAME, "trace", 0.1, "poll_at")
+        assert done.wait(5)
+        scheduler.shutdown()
+
+    assert time.monotonic() - start < 1
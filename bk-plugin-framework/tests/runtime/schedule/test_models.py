@@ -0,0 +1,192 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import uuid
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from bk_plugin_framework.kit import State
+from bk_plugin_framework.runtime.schedule import codecs, models
+from bk_plugin_framework.runtime.schedule.models import Schedule
+
+pytestmark = pytest.mark.django_db
+
+
+def create_schedule(state=State.POLL, finish_at=None):
+    return Schedule.objects.create(
+        trace_id=uuid.uuid4().hex, plugin_version="1.0.0", state=state.value, data="{}", finish_at=finish_at
+    )
+
+
+class TestScheduleQueryPlan:
+    """
+    保证高频查询命中索引，避免退化为全表扫描
+    """
+
+    def assert_use_index(self, queryset, index_name=None):
+        plan = queryset.explain()
+        assert "USING INDEX" in plan and "SCAN schedule_schedule" not in plan, plan
+        if index_name:
+            assert index_name in plan, plan
+
+    def test_expired_schedule_query_use_finish_at_index(self):
+        self.assert_use_index(
+            Schedule.objects.filter(finish_at__lt=timezone.now()).values_list("pk", flat=True),
+            "schedule_finish_at_idx",
+        )
+
+    def test_pending_schedule_query_use_state_created_at_index(self):
+        self.assert_use_index(
+            Schedule.objects.filter(state=State.POLL.value, created_at__lt=timezone.now()),
+            "schedule_state_created_idx",
+        )
+
+    def test_scheduling_query_use_scheduling_state_index(self):
+        self.assert_use_index(Schedule.objects.filter(scheduling=True, state=State.CALLBACK.value))
+
+    def test_local_poll_recover_query_use_state_poll_at_index(self):
+        self.assert_use_index(
+            Schedule.objects.filter(state=State.POLL.value, poll_at__lt=timezone.now()),
+            "schedule_state_poll_at_idx",
+        )
+
+
+class TestScheduleManager:
+    def test_apply_and_release_schedule_lock(self, django_assert_num_queries):
+        schedule = create_schedule(state=State.CALLBACK)
+
+        with django_assert_num_queries(1):
+            assert Schedule.objects.apply_schedule_lock(schedule.trace_id) is True
+
+        assert Schedule.objects.apply_schedule_lock(schedule.trace_id) is False
+
+        with django_assert_num_queries(1):
+            Schedule.objects.release_schedule_lock(schedule.trace_id)
+
+        assert Schedule.objects.get(trace_id=schedule.trace_id).scheduling is False
+
+    def test_update_with_version(self, django_assert_num_queries):
+        schedule = create_schedule()
+
+        with django_assert_num_queries(1):
+            assert Schedule.objects.update_with_version(schedule.trace_id, version=0, state=State.CALLBACK.value)
+
+        # 读取时的版本已过期
+        assert Schedule.objects.update_with_version(schedule.trace_id, version=0, state=State.SUCCESS.value) is False
+        schedule.refresh_from_db()
+        assert schedule.state == State.CALLBACK.value
+        assert schedule.version == 1
+
+        # 不指定版本时强制更新
+        assert Schedule.objects.update_with_version(schedule.trace_id, state=State.FAIL.value)
+        schedule.refresh_from_db()
+        assert schedule.state == State.FAIL.value
+        assert schedule.version == 2
+
+    def test_apply_schedule_lock_and_fetch(self, django_assert_num_queries):
+        schedule = create_schedule(state=State.CALLBACK)
+
+        with django_assert_num_queries(1):
+            locked, fetched = Schedule.objects.apply_schedule_lock_and_fetch(schedule.trace_id)
+
+        assert locked is True
+        assert fetched.trace_id == schedule.trace_id
+        assert fetched.state == State.CALLBACK.value
+        assert fetched.data == "{}"
+        assert fetched.scheduling is True
+        assert fetched.version == 0
+        assert fetched.get_deferred_fields() == {"err", "created_at", "finish_at", "poll_at"}
+        assert Schedule.objects.get(trace_id=schedule.trace_id).scheduling is True
+
+        with django_assert_num_queries(1):
+            assert Schedule.objects.apply_schedule_lock_and_fetch(schedule.trace_id) == (False, None)
+
+    def test_apply_schedule_lock_and_fetch_update_returning_not_supported(self):
+        schedule = create_schedule(state=State.CALLBACK)
+
+        with patch.object(models, "supports_update_returning", return_value=False):
+            assert Schedule.objects.apply_schedule_lock_and_fetch(schedule.trace_id) == (True, None)
+            assert Schedule.objects.apply_schedule_lock_and_fetch(schedule.trace_id) == (False, None)
+
+    def test_get_for_execute(self, django_assert_num_queries):
+        schedule = create_schedule()
+
+        with django_assert_num_queries(1) as ctx:
+            fetched = Schedule.objects.get_for_execute(trace_id=schedule.trace_id)
+
+        assert '"err"' not in ctx.captured_queries[0]["sql"]
+        assert fetched.get_deferred_fields() == {"err", "created_at", "finish_at", "poll_at"}
+
+    def test_claim_local_poll(self, django_assert_num_queries):
+        schedule = create_schedule()
+        poll_at = timezone.now()
+        Schedule.objects.filter(trace_id=schedule.trace_id).update(poll_at=poll_at)
+
+        with django_assert_num_queries(1):
+            assert Schedule.objects.claim_local_poll(schedule.trace_id, poll_at) is True
+
+        # 同一次轮询只能被认领一次
+        assert Schedule.objects.claim_local_poll(schedule.trace_id, poll_at) is False
+        assert Schedule.objects.get(trace_id=schedule.trace_id).poll_at is None
+
+    def test_get_status_batch(self, django_assert_num_queries):
+        running = create_schedule(state=State.POLL)
+        finished = create_schedule(state=State.SUCCESS, finish_at=timezone.now())
+        Schedule.objects.filter(trace_id__in=[running.trace_id, finished.trace_id]).update(
+            data=codecs.dumps({"storage": {}, "outputs": {"a": 1}})
+        )
+
+        with django_assert_num_queries(1):
+            statuses = Schedule.objects.get_status_batch([finished.trace_id, "not_exist", running.trace_id])
+
+        assert [s["trace_id"] for s in statuses] == [finished.trace_id, running.trace_id]
+        assert statuses[0]["state"] == State.SUCCESS.value
+        assert statuses[0]["outputs"] == {"a": 1}
+        assert statuses[0]["plugin_version"] == "1.0.0"
+        assert statuses[0]["err"] == ""
+        assert statuses[0]["finish_at"] != ""
+        # 未结束的调度不解码 outputs
+        assert statuses[1]["outputs"] is None
+        assert statuses[1]["finish_at"] == ""
+
+    def test_get_status_batch_only_select_required_columns(self, django_assert_num_queries):
+        schedule = create_schedule(state=State.SUCCESS, finish_at=timezone.now())
+
+        with patch.object(models.codecs, "loads") as loads, django_assert_num_queries(1) as ctx:
+            statuses = Schedule.objects.get_status_batch([schedule.trace_id, schedule.trace_id], fields=["err"])
+
+        loads.assert_not_called()
+        sql = ctx.captured_queries[0]["sql"]
+        assert '"data"' not in sql and '"inputs"' not in sql
+        assert statuses == [{"trace_id": schedule.trace_id, "state": State.SUCCESS.value, "err": ""}]
+
+    def test_get_status_batch_outputs_load_error(self):
+        schedule = create_schedule(state=State.FAIL, finish_at=timezone.now())
+        Schedule.objects.filter(trace_id=schedule.trace_id).update(data="invalid")
+
+        statuses = Schedule.objects.get_status_batch([schedule.trace_id], fields=["outputs"])
+
+        assert statuses == [{"trace_id": schedule.trace_id, "state": State.FAIL.value, "outputs": None}]
+
+    @patch.object(models.settings, "EXPIRED_DELETE_CHUNK_SIZE", 2)
+    @patch.object(models.settings, "EXPIRED_DELETE_CHUNK_INTERVAL", 0)
+    def test_delete_expired_schedule(self, django_assert_num_queries):
+        expired_at = timezone.now() - timezone.timedelta(days=31)
+        expired = [create_schedule(state=State.SUCCESS, finish_at=expired_at) for _ in range(3)]
+        alive = [create_schedule(state=State.SUCCESS, finish_at=timezone.now()), create_schedule()]
+
+        # 2 个批次，每批 1 次主键查询 + 1 次删除
+        with django_assert_num_queries(4):
+            assert Schedule.objects.delete_expired_schedule(30) == len(expired)
+
+        assert set(Schedule.objects.values_list("trace_id", flat=True)) == {s.trace_id for s in alive}
@@ -0,0 +1,327 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import threading
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bk_plugin_framework.kit import State
+from bk_plugin_framework.runtime.schedule import notify
+from bk_plugin_framework.runtime.schedule.models import Schedule
+
+
+@pytest.fixture
+def local_notifier():
+    notifier = notify.LocalNotifier()
+    with patch.object(notify, "get_notifier", MagicMock(return_value=notifier)):
+        yield notifier
+
+
+def create_schedule(state=State.POLL):
+    return Schedule.objects.create(trace_id=uuid.uuid4().hex, plugin_version="1.0.0", state=state.value, data="{}")
+
+
+class TestGetNotifier:
+    def setup_method(self):
+        notify.get_notifier.cache_clear()
+
+    def teardown_method(self):
+        notify.get_notifier.cache_clear()
+
+    @patch.object(notify.settings, "SCHEDULE_NOTIFY_BACKEND", "")
+    def test_disabled(self):
+        assert notify.get_notifier() is None
+
+    @patch.object(notify.settings, "SCHEDULE_NOTIFY_BACKEND", "local")
+    def test_local(self):
+        assert isinstance(notify.get_notifier(), notify.LocalNotifier)
+        assert notify.get_notifier() is notify.get_notifier()
+
+    @patch.object(notify.settings, "SCHEDULE_NOTIFY_BACKEND", "redis")
+    @patch.object(notify.settings, "SCHEDULE_NOTIFY_REDIS_URL", "redis://127.0.0.1:6379/0")
+    def test_redis(self):
+        redis = MagicMock()
+
+        with patch.object(notify, "redis", redis):
+            notifier = notify.get_notifier()
+
+        assert isinstance(notifier, notify.RedisNotifier)
+        redis.Redis.from_url.assert_called_once_with("redis://127.0.0.1:6379/0")
+
+    @patch.object(notify.settings, "SCHEDULE_NOTIFY_BACKEND", "redis")
+    def test_redis_not_installed(self):
+        with patch.object(notify, "redis", None):
+            with pytest.raises(RuntimeError):
+                notify.get_notifier()
+
+    @patch.object(notify.settings, "SCHEDULE_NOTIFY_BACKEND", "unknown")
+    def test_unsupported(self):
+        with pytest.raises(ValueError):
+            notify.get_notifier()
+
+
+class TestLocalNotifier:
+    def test_publish_and_subscribe(self):
+        notifier = notify.LocalNotifier()
+
+        with notifier.subscribe("t1") as s1, notifier.subscribe("t1") as s2, notifier.subscribe("t2") as s3:
+            notifier.publish("t1", State.SUCCESS.value)
+
+            assert s1.get(0) == State.SUCCESS.value
+            assert s2.get(0) == State.SUCCESS.value
+            assert s3.get(0) is None
+
+        assert notifier._subscriptions == {}
+
+    def test_publish_without_subscriber(self):
+        notify.LocalNotifier().publish("t1", State.SUCCESS.value)
+
+
+# fixture 中会替换掉后台线程执行的 _listen，测试时直接调用原方法
+listen = notify.RedisNotifier._listen
+
+
+@pytest.fixture
+def redis_notifier():
+    with patch.object(notify, "redis", MagicMock()), patch.object(notify.RedisNotifier, "_listen"):
+        notifier = notify.RedisNotifier("redis://127.0.0.1:6379/0")
+        notifier.SUBSCRIBE_CONFIRM_TIMEOUT = 0
+        yield notifier
+
+
+class TestRedisNotifier:
+    def test_publish(self, redis_notifier):
+        redis_notifier.publish("t1", State.FAIL.value)
+
+        redis_notifier.client.publish.assert_called_once_with(notify.CHANNEL_PREFIX + "t1", State.FAIL.value)
+
+    def test_share_pubsub(self, redis_notifier):
+        with redis_notifier.subscribe("t1"), redis_notifier.subscribe("t1"), redis_notifier.subscribe("t2"):
+            redis_notifier.client.pubsub.assert_called_once()
+            # 请求线程只排队，不直接操作 pubsub
+            pubsub = redis_notifier._pubsub
+            pubsub.subscribe.assert_not_called()
+            assert redis_notifier._wakeup.is_set()
+
+        channels = set()
+        redis_notifier._run_commands(pubsub, channels)
+
+        assert pubsub.subscribe.call_count == 2
+        pubsub.subscribe.assert_any_call(notify.CHANNEL_PREFIX + "t1")
+        pubsub.subscribe.assert_any_call(notify.CHANNEL_PREFIX + "t2")
+        assert pubsub.unsubscribe.call_count == 2
+        assert channels == set()
+        assert redis_notifier._subscriptions == {}
+
+    def test_run_commands_in_order(self, redis_notifier):
+        pubsub = MagicMock()
+        channels = set()
+        with redis_notifier.subscribe("t1"):
+            redis_notifier._run_commands(pubsub, channels)
+            assert channels == {notify.CHANNEL_PREFIX + "t1"}
+
+            with redis_notifier.subscribe("t2"):
+                pass
+
+        redis_notifier._run_commands(pubsub, channels)
+
+        assert [c[0] for c in pubsub.method_calls] == ["subscribe", "subscribe", "unsubscribe", "unsubscribe"]
+        assert channels == set()
+
+    def test_unsubscribe_when_last_subscription_closed(self, redis_notifier):
+        s1 = redis_notifier.subscribe("t1")
+        s2 = redis_notifier.subscribe("t1")
+        pubsub = MagicMock()
+        channels = set()
+
+        s1.close()
+        redis_notifier._run_commands(pubsub, channels)
+        pubsub.unsubscribe.assert_not_called()
+
+        s2.close()
+        redis_notifier._run_commands(pubsub, channels)
+        pubsub.unsubscribe.assert_called_once_with(notify.CHANNEL_PREFIX + "t1")
+
+    def test_fan_out_message(self, redis_notifier):
+        with redis_notifier.subscribe("t1") as s1, redis_notifier.subscribe("t1") as s2:
+            redis_notifier._handle_message(
+                {"type": "message", "channel": (notify.CHANNEL_PREFIX + "t1").encode(), "data": b"4"}
+            )
+
+            assert s1.get(0) == State.SUCCESS.value
+            assert s2.get(0) == State.SUCCESS.value
+
+    def test_wait_for_subscribe_confirmation(self, redis_notifier):
+        redis_notifier.SUBSCRIBE_CONFIRM_TIMEOUT = 10
+        channel = notify.CHANNEL_PREFIX + "t1"
+
+        def send_command(command, channel):
+            message = {"type": command, "channel": channel.encode(), "data": 1}
+            threading.Timer(0.01, redis_notifier._handle_message, args=(message,)).start()
+
+        with patch.object(notify.RedisNotifier, "_ensure_listener"), patch.object(
+            redis_notifier, "_send_command", side_effect=send_command
+        ):
+            with redis_notifier.subscribe("t1"):
+                assert redis_notifier._confirmations[channel].is_set()
+
+    def test_subscribe_confirmation_timeout(self, redis_notifier):
+        with redis_notifier.subscribe("t1") as subscription:
+            assert subscription.get(0) is None
+
+    def test_new_pubsub_after_fork(self, redis_notifier):
+        with redis_notifier.subscribe("t1"):
+            pass
+
+        with patch.object(notify.os, "getpid", MagicMock(return_value=-1)):
+            with redis_notifier.subscribe("t1"):
+                pass
+
+        assert redis_notifier.client.pubsub.call_count == 2
+
+    def test_listen(self, redis_notifier):
+        pubsub = MagicMock()
+        pubsub.get_message.side_effect = [
+            None,
+            Exception,
+            {"type": "message", "channel": notify.CHANNEL_PREFIX + "t1", "data": b"5"},
+            KeyboardInterrupt,
+        ]
+        redis_notifier.client.pubsub.return_value = pubsub
+        redis_notifier.LISTEN_INTERVAL = 0
+
+        with redis_notifier.subscribe("t1") as subscription:
+            with pytest.raises(KeyboardInterrupt):
+                listen(redis_notifier)
+
+            pubsub.subscribe.assert_called_once_with(notify.CHANNEL_PREFIX + "t1")
+            assert pubsub.get_message.call_args.kwargs == {"timeout": redis_notifier.COMMAND_INTERVAL}
+            assert subscription.get(0) == State.FAIL.value
+
+    def test_listen_wait_without_subscription(self, redis_notifier):
+        pubsub = MagicMock()
+        redis_notifier._pubsub = pubsub
+        redis_notifier._wakeup = MagicMock()
+        redis_notifier._wakeup.wait.side_effect = [True, KeyboardInterrupt]
+
+        with pytest.raises(KeyboardInterrupt):
+            listen(redis_notifier)
+
+        pubsub.get_message.assert_not_called()
+        redis_notifier._wakeup.wait.assert_called_with(redis_notifier.LISTEN_INTERVAL)
+
+
+class TestWaiterLimiter:
+    def setup_method(self):
+        notify.get_waiter_limiter.cache_clear()
+
+    def teardown_method(self):
+        notify.get_waiter_limiter.cache_clear()
+
+    def test_limit(self):
+        limiter = notify.WaiterLimiter(2)
+
+        assert limiter.acquire()
+        assert limiter.acquire()
+        assert not limiter.acquire()
+
+        limiter.release()
+        assert limiter.acquire()
+
+    def test_unlimited(self):
+        limiter = notify.WaiterLimiter(0)
+
+        assert all(limiter.acquire() for _ in range(100))
+
+    @patch.object(notify.settings, "SCHEDULE_WAIT_MAX_WAITERS", 3)
+    def test_get_waiter_limiter(self):
+        limiter = notify.get_waiter_limiter()
+
+        assert limiter.limit == 3
+        assert notify.get_waiter_limiter() is limiter
+
+
+class TestPublishState:
+    def test_disabled(self):
+        with patch.object(notify, "get_notifier", MagicMock(return_value=None)):
+            notify.publish_state("t1", State.SUCCESS.value)
+
+    def test_publish_error_ignored(self):
+        notifier = MagicMock()
+        notifier.publish.side_effect = Exception
+
+        with patch.object(notify, "get_notifier", MagicMock(return_value=notifier)):
+            notify.publish_state("t1", State.SUCCESS.value)
+
+        notifier.publish.assert_called_once_with("t1", State.SUCCESS.value)
+
+
+@pytest.mark.django_db
+class TestIterStateChanges:
+    def test_schedule_not_exist(self, local_notifier):
+        assert list(notify.iter_state_changes("not_exist", timeout=0)) == []
+
+    def test_finished(self, local_notifier):
+        schedule = create_schedule(state=State.SUCCESS)
+
+        assert list(notify.iter_state_changes(schedule.trace_id, timeout=10)) == [State.SUCCESS.value]
+
+    def test_known_state_changed(self, local_notifier):
+        schedule = create_schedule(state=State.CALLBACK)
+
+        changes = notify.iter_state_changes(schedule.trace_id, known_state=State.POLL.value, timeout=0)
+
+        assert list(changes) == [State.CALLBACK.value]
+
+    def test_timeout(self, local_notifier):
+        schedule = create_schedule()
+
+        assert list(notify.iter_state_changes(schedule.trace_id, timeout=0.01)) == []
+        assert local_notifier._subscriptions == {}
+
+    def test_wait_for_publish(self, local_notifier):
+        schedule = create_schedule()
+        changes = notify.iter_state_changes(schedule.trace_id, timeout=10)
+
+        # 启动生成器完成订阅后再发布状态变化
+        timer = threading.Timer(0.05, local_notifier.publish, args=(schedule.trace_id, State.SUCCESS.value))
+        timer.start()
+        try:
+            assert list(changes) == [State.SUCCESS.value]
+        finally:
+            timer.cancel()
+
+    def test_ignore_same_state(self, local_notifier):
+        schedule = create_schedule()
+        subscriptions = []
+        original_subscribe = local_notifier.subscribe
+
+        def subscribe(trace_id):
+            subscription = original_subscribe(trace_id)
+            subscription.queue.put(State.POLL.value)
+            subscription.queue.put(State.CALLBACK.value)
+            subscription.queue.put(State.FAIL.value)
+            subscriptions.append(subscription)
+            return subscription
+
+        with patch.object(local_notifier, "subscribe", subscribe):
+            changes = list(notify.iter_state_changes(schedule.trace_id, timeout=10))
+
+        assert changes == [State.CALLBACK.value, State.FAIL.value]
+
+    def test_heartbeat(self, local_notifier):
+        schedule = create_schedule()
+
+        changes = notify.iter_state_changes(schedule.trace_id, timeout=0.05, heartbeat=0.01)
+
+        assert set(changes) == {None}
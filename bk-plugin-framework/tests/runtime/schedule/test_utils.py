@@ -9,12 +9,21 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import threading
 import uuid
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from bk_plugin_framework.runtime.schedule.utils import get_schedule_lock
+from bk_plugin_framework.runtime.schedule import utils
+from bk_plugin_framework.runtime.schedule.utils import (
+    DBLockBackend,
+    LockWatchdog,
+    RedisLockBackend,
+    ScheduleLock,
+    get_lock_backend,
+    get_schedule_lock,
+)
 
 
 @pytest.fixture
@@ -44,3 +53,219 @@ class TestScheduleUtils:
                 Schedule.objects.apply_schedule_lock.assert_called_once_with(trace_id)
 
             Schedule.objects.release_schedule_lock.assert_not_called()
+
+    @patch.object(utils.settings, "SCHEDULE_LOCK_WAIT_TIMEOUT", 3)
+    def test_get_schedule_lock_wait(self, trace_id):
+        lock = get_schedule_lock(trace_id)
+        assert lock.wait == 3
+        assert isinstance(lock.backend, DBLockBackend)
+
+        assert get_schedule_lock(trace_id, wait=0).wait == 0
+
+    def test_schedule_lock_fetch(self, trace_id):
+        schedule = MagicMock(scheduling=True)
+        backend = MagicMock(renew_interval=None)
+        backend.acquire_and_fetch.return_value = ("token", schedule)
+
+        with ScheduleLock(trace_id, backend=backend, fetch=True) as lock:
+            assert lock.locked
+            assert lock.schedule is schedule
+
+        backend.acquire.assert_not_called()
+        backend.release.assert_called_once_with(trace_id, "token")
+
+    @pytest.mark.parametrize("uses_schedule_row, released", [(True, False), (False, True)])
+    def test_schedule_lock_released_with_schedule_update(self, trace_id, uses_schedule_row, released):
+        schedule = MagicMock(scheduling=True)
+        backend = MagicMock(uses_schedule_row=uses_schedule_row, renew_interval=None)
+        backend.acquire_and_fetch.return_value = ("token", schedule)
+
+        with ScheduleLock(trace_id, backend=backend, fetch=True):
+            # 执行器在更新本轮结果时释放了锁
+            schedule.scheduling = False
+
+        assert backend.release.called is released
+
+    def test_db_lock_backend_acquire_and_fetch(self, trace_id):
+        schedule = MagicMock()
+        Schedule = MagicMock()
+        Schedule.objects.apply_schedule_lock_and_fetch.side_effect = [(True, schedule), (False, None)]
+
+        with patch("bk_plugin_framework.runtime.schedule.utils.Schedule", Schedule):
+            assert DBLockBackend().acquire_and_fetch(trace_id) == (trace_id, schedule)
+            assert DBLockBackend().acquire_and_fetch(trace_id) == (None, None)
+
+    def test_schedule_lock_release_err(self, trace_id):
+        backend = MagicMock(renew_interval=None)
+        backend.acquire.return_value = "token"
+        backend.release.side_effect = Exception
+
+        with ScheduleLock(trace_id, backend=backend, wait=1) as lock:
+            assert lock.locked
+            backend.acquire.assert_called_once_with(trace_id, 1)
+
+        backend.release.assert_called_once_with(trace_id, "token")
+
+
+@pytest.fixture
+def redis_client():
+    return MagicMock()
+
+
+@pytest.fixture
+def redis_backend(redis_client):
+    return RedisLockBackend(redis_client, lease=10)
+
+
+class TestRedisLockBackend:
+    def test_acquire(self, trace_id, redis_client, redis_backend):
+        redis_client.set.return_value = True
+
+        token = redis_backend.acquire(trace_id)
+
+        assert token
+        redis_client.set.assert_called_once_with(RedisLockBackend.lock_key(trace_id), token, nx=True, px=10000)
+        redis_client.blpop.assert_not_called()
+
+    def test_acquire_fail(self, trace_id, redis_client, redis_backend):
+        redis_client.set.return_value = None
+
+        assert redis_backend.acquire(trace_id) is None
+        redis_client.blpop.assert_not_called()
+
+    def test_acquire_wait_for_release(self, trace_id, redis_client, redis_backend):
+        redis_client.set.side_effect = [None, True]
+
+        token = redis_backend.acquire(trace_id, wait=5)
+
+        assert token
+        assert redis_client.set.call_count == 2
+        redis_client.blpop.assert_called_once_with([RedisLockBackend.signal_key(trace_id)], timeout=1.0)
+
+    def test_acquire_wait_timeout(self, trace_id, redis_client, redis_backend):
+        redis_client.set.return_value = None
+
+        assert redis_backend.acquire(trace_id, wait=0.05) is None
+        for call in redis_client.blpop.call_args_list:
+            assert utils.LOCK_WAIT_MIN_TIMEOUT <= call.kwargs["timeout"] <= 0.05
+
+    def test_acquire_and_fetch(self, trace_id, redis_client, redis_backend):
+        redis_client.set.return_value = True
+
+        token, schedule = redis_backend.acquire_and_fetch(trace_id)
+
+        assert token
+        assert schedule is None
+
+    def test_release(self, trace_id, redis_client, redis_backend):
+        redis_backend.release(trace_id, "token")
+
+        redis_client.register_script.assert_any_call(utils.REDIS_RELEASE_SCRIPT)
+        redis_backend._release_script.assert_called_once_with(
+            keys=[RedisLockBackend.lock_key(trace_id), RedisLockBackend.signal_key(trace_id)], args=["token", 10000]
+        )
+
+    @pytest.mark.parametrize("renewed, expected", [(1, True), (0, False)])
+    def test_renew(self, trace_id, redis_client, redis_backend, renewed, expected):
+        redis_client.register_script.assert_any_call(utils.REDIS_RENEW_SCRIPT)
+        redis_backend._renew_script.return_value = renewed
+
+        assert redis_backend.renew(trace_id, "token") is expected
+        redis_backend._renew_script.assert_called_once_with(
+            keys=[RedisLockBackend.lock_key(trace_id)], args=["token", 10000]
+        )
+
+    def test_renew_interval(self, redis_backend):
+        assert redis_backend.renew_interval == pytest.approx(10 / 3)
+
+
+class TestLockWatchdog:
+    def test_renew_until_stopped(self, trace_id):
+        renewed = threading.Event()
+        backend = MagicMock(renew_interval=0.01)
+        backend.renew.side_effect = lambda *args: renewed.set() or True
+
+        with ScheduleLock(trace_id, backend=backend) as lock:
+            assert lock.locked
+            assert renewed.wait(timeout=5)
+            watchdog = lock._watchdog
+
+        assert not watchdog._thread.is_alive()
+        backend.renew.assert_called_with(trace_id, backend.acquire.return_value)
+        backend.release.assert_called_once_with(trace_id, backend.acquire.return_value)
+
+    def test_stop_when_lock_lost(self, trace_id):
+        backend = MagicMock(renew_interval=0.01)
+        backend.renew.return_value = False
+        watchdog = LockWatchdog(backend, trace_id, "token")
+
+        watchdog.start()
+        watchdog._thread.join(timeout=5)
+
+        assert not watchdog._thread.is_alive()
+        backend.renew.assert_called_once_with(trace_id, "token")
+
+    def test_keep_renewing_on_error(self, trace_id):
+        renewed = threading.Event()
+        backend = MagicMock(renew_interval=0.01)
+        calls = []
+
+        def renew(*args):
+            calls.append(args)
+            if len(calls) < 3:
+                raise Exception("renew err")
+            renewed.set()
+            return True
+
+        backend.renew.side_effect = renew
+        watchdog = LockWatchdog(backend, trace_id, "token")
+
+        watchdog.start()
+        assert renewed.wait(timeout=5)
+        watchdog.stop()
+
+        assert not watchdog._thread.is_alive()
+
+    def test_not_started_for_db_backend(self, trace_id):
+        backend = DBLockBackend()
+
+        with patch("bk_plugin_framework.runtime.schedule.utils.Schedule", MagicMock()):
+            with ScheduleLock(trace_id, backend=backend) as lock:
+                assert lock.locked
+                assert lock._watchdog is None
+
+
+class TestGetLockBackend:
+    def setup_method(self):
+        get_lock_backend.cache_clear()
+
+    def teardown_method(self):
+        get_lock_backend.cache_clear()
+
+    @pytest.mark.parametrize("backend", ["", "db"])
+    def test_db(self, backend):
+        with patch.object(utils.settings, "SCHEDULE_LOCK_BACKEND", backend):
+            assert isinstance(get_lock_backend(), DBLockBackend)
+
+    @patch.object(utils.settings, "SCHEDULE_LOCK_BACKEND", "redis")
+    @patch.object(utils.settings, "SCHEDULE_LOCK_REDIS_URL", "redis://127.0.0.1:6379/0")
+    @patch.object(utils.settings, "SCHEDULE_LOCK_LEASE", 60)
+    def test_redis(self):
+        redis = MagicMock()
+        with patch.object(utils, "redis", redis):
+            backend = get_lock_backend()
+
+        assert isinstance(backend, RedisLockBackend)
+        assert backend.lease_ms == 60000
+        redis.Redis.from_url.assert_called_once_with("redis://127.0.0.1:6379/0")
+
+    @patch.object(utils.settings, "SCHEDULE_LOCK_BACKEND", "redis")
+    def test_redis_not_installed(self):
+        with patch.object(utils, "redis", None):
+            with pytest.raises(RuntimeError):
+                get_lock_backend()
+
+    @patch.object(utils.settings, "SCHEDULE_LOCK_BACKEND", "zookeeper")
+    def test_unsupported(self):
+        with pytest.raises(ValueError):
+            get_lock_backend()
@@ -9,13 +9,18 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import asyncio
+import datetime
 import json
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from bk_plugin_framework.envs import settings
 from bk_plugin_framework.kit import Context, ContextRequire, InputsModel, Plugin, State
-from bk_plugin_framework.runtime.executor import BKPluginExecutor
+from bk_plugin_framework.runtime import executor as executor_module
+from bk_plugin_framework.runtime.executor import BatchInvocation, BKPluginExecutor
+from bk_plugin_framework.runtime.schedule.models import Schedule
 
 
 @pytest.fixture
@@ -49,6 +54,7 @@ def plugin_cls():
             raise_unexpected_err: bool = False
             poll: bool = False
             callback: bool = False
+            count: bool = False
 
         class ContextInputs(ContextRequire):
             b: str
@@ -57,6 +63,9 @@ def plugin_cls():
             if inputs.raise_unexpected_err:
                 raise Exception("fail")
 
+            if inputs.count:
+                context.storage["count"] = context.storage.get("count", 0) + 1
+
             if inputs.success:
                 if inputs.poll:
                     self.wait_poll(1)
@@ -69,6 +78,28 @@ def plugin_cls():
     return MyPlugin
 
 
+@pytest.fixture
+def async_plugin_cls():
+    class MyAsyncPlugin(Plugin):
+        class Meta:
+            version = "1.0.2"
+
+        class Inputs(InputsModel):
+            success: bool = True
+            poll: bool = False
+
+        async def execute(self, inputs: InputsModel, context: Context):
+            await asyncio.sleep(0)
+            if not inputs.success:
+                raise self.Error("fail")
+
+            context.outputs["invoke_count"] = context.invoke_count
+            if inputs.poll:
+                self.wait_poll(1)
+
+    return MyAsyncPlugin
+
+
 @pytest.fixture
 def empty_plugin_cls():
     class MyPlugin(Plugin):
@@ -82,16 +113,30 @@ def empty_plugin_cls():
 
 
 class TestBKPluginExecutor:
+    def test__dump_schedule_inputs(self, executor):
+        kwargs = {"inputs": {"a": 1}, "context_data": {"b": 2}}
+
+        assert json.dumps(kwargs) == executor._dump_schedule_inputs(**kwargs)
+
     def test__dump_schedule_data(self, executor):
-        inputs = {"a": 1}
-        outputs = {"b": 2}
-        context = {"c": 3}
-        kwargs = {"inputs": inputs, "context": context, "outputs": outputs}
+        kwargs = {"storage": {"a": 1}, "outputs": {"b": 2}}
 
         assert json.dumps(kwargs) == executor._dump_schedule_data(**kwargs)
 
     def test__load_schedule_data(self, executor):
         schedule = MagicMock()
+        schedule.inputs = '{"inputs": {"a": 1}, "context_data": {"b": 2}}'
+        schedule.data = '{"storage": {"c": 3}, "outputs": {"d": 4}}'
+
+        assert executor._load_schedule_data(schedule) == {
+            "inputs": {"a": 1},
+            "context": {"data": {"b": 2}, "storage": {"c": 3}, "outputs": {"d": 4}},
+            "outputs": {"d": 4},
+        }
+
+    def test__load_schedule_data__legacy(self, executor):
+        schedule = MagicMock()
+        schedule.inputs = ""
         schedule.data = '{"a": 1}'
 
         assert executor._load_schedule_data(schedule) == {"a": 1}
@@ -104,8 +149,7 @@ class TestBKPluginExecutor:
         with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
             executor._set_schedule_state(trace_id=schedule_obj.trace_id, state=state)
 
-        Schedule.objects.filter.assert_called_once_with(trace_id=schedule_obj.trace_id)
-        Schedule.objects.filter(trace_id=schedule_obj.trace_id).update.assert_called_once_with(state=state.value)
+        Schedule.objects.update_with_version.assert_called_once_with(schedule_obj.trace_id, state=state.value)
 
     @pytest.mark.parametrize("state", [State.FAIL, State.SUCCESS])
     def test__set_schedule_state_finish_state(self, executor, state):
@@ -117,9 +161,8 @@ class TestBKPluginExecutor:
             with patch("bk_plugin_framework.runtime.executor.now", now):
                 executor._set_schedule_state(trace_id=schedule_obj.trace_id, state=state)
 
-        Schedule.objects.filter.assert_called_once_with(trace_id=schedule_obj.trace_id)
-        Schedule.objects.filter(trace_id=schedule_obj.trace_id).update.assert_called_once_with(
-            state=state.value, finish_at="now"
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule_obj.trace_id, state=state.value, finish_at="now"
         )
 
     def test_execute__inputs_validate_err(self, executor, plugin_cls):
@@ -175,7 +218,8 @@ class TestBKPluginExecutor:
             trace_id=executor.trace_id,
             state=State.POLL.value,
             plugin_version=plugin_cls.Meta.version,
-            data='{"inputs": {"success": true, "poll": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}',  # noqa
+            inputs='{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}',
+            data='{"storage": {}, "outputs": {}}',
         )
         current_app.tasks[executor.SCHEDULE_TASK_NAME].apply_async.assert_called_once_with(
             kwargs={"trace_id": executor.trace_id},
@@ -183,6 +227,212 @@ class TestBKPluginExecutor:
             queue="plugin_schedule",
         )
 
+    def test_execute__async_plugin(self, executor, async_plugin_cls):
+        result = executor.execute(async_plugin_cls, {}, {})
+
+        assert result.state is State.SUCCESS
+        assert result.outputs == {"invoke_count": 1}
+
+    def test_aexecute__async_plugin(self, executor, async_plugin_cls):
+        result = asyncio.run(executor.aexecute(plugin_cls=async_plugin_cls, inputs={}, context_inputs={}))
+
+        assert result.state is State.SUCCESS
+        assert result.outputs == {"invoke_count": 1}
+        assert result.err is None
+
+    def test_aexecute__async_plugin_execute_failed(self, executor, async_plugin_cls):
+        result = asyncio.run(
+            executor.aexecute(plugin_cls=async_plugin_cls, inputs={"success": False}, context_inputs={})
+        )
+
+        assert result.state is State.FAIL
+        assert result.err == "plugin execute failed: fail"
+
+    def test_aexecute__async_plugin_inputs_validate_err(self, executor, async_plugin_cls):
+        result = asyncio.run(executor.aexecute(plugin_cls=async_plugin_cls, inputs={"success": "x"}, context_inputs={}))
+
+        assert result.state is State.FAIL
+        assert result.err.startswith("inputs validation error")
+
+    def test_aexecute__async_plugin_waiting_poll(self, executor, async_plugin_cls):
+        Schedule = MagicMock()
+        current_app = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                result = asyncio.run(
+                    executor.aexecute(plugin_cls=async_plugin_cls, inputs={"poll": True}, context_inputs={})
+                )
+
+        assert result.state is State.POLL
+        Schedule.objects.create.assert_called_once()
+        current_app.tasks[executor.SCHEDULE_TASK_NAME].apply_async.assert_called_once_with(
+            kwargs={"trace_id": executor.trace_id}, countdown=1, queue="plugin_schedule"
+        )
+
+    def test_aexecute__sync_plugin(self, executor, plugin_cls):
+        result = asyncio.run(
+            executor.aexecute(plugin_cls=plugin_cls, inputs={"success": True}, context_inputs={"b": "1"})
+        )
+
+        assert result.state is State.SUCCESS
+        assert result.outputs == {}
+
+    def test_execute_batch(self, plugin_cls):
+        Schedule = MagicMock()
+        current_app = MagicMock()
+        invocations = [
+            BatchInvocation(trace_id="t1", plugin_cls=plugin_cls, inputs={"success": True}, context_inputs={"b": "1"}),
+            BatchInvocation(
+                trace_id="t2", plugin_cls=plugin_cls, inputs={"success": True, "poll": True}, context_inputs={"b": "1"}
+            ),
+            BatchInvocation(trace_id="t3", plugin_cls=plugin_cls, inputs={}, context_inputs={"b": "1"}),
+            BatchInvocation(
+                trace_id="t4",
+                plugin_cls=plugin_cls,
+                inputs={"success": True, "callback": True},
+                context_inputs={"b": "1"},
+            ),
+        ]
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                results = BKPluginExecutor.execute_batch(invocations, max_workers=2)
+
+        assert [r.state for r in results] == [State.SUCCESS, State.POLL, State.FAIL, State.CALLBACK]
+        assert "inputs validation error" in results[2].err
+
+        Schedule.objects.bulk_create.assert_called_once()
+        assert len(Schedule.objects.bulk_create.call_args[0][0]) == 2
+        assert [c.kwargs["trace_id"] for c in Schedule.call_args_list] == ["t2", "t4"]
+        Schedule.objects.create.assert_not_called()
+        current_app.tasks[BKPluginExecutor.SCHEDULE_TASK_NAME].apply_async.assert_called_once_with(
+            kwargs={"trace_id": "t2"},
+            countdown=1,
+            queue="plugin_schedule",
+        )
+
+    def test_execute_batch__bulk_create_err(self, plugin_cls):
+        Schedule = MagicMock()
+        Schedule.objects.bulk_create = MagicMock(side_effect=Exception("db error"))
+        current_app = MagicMock()
+        invocations = [
+            BatchInvocation(trace_id="t1", plugin_cls=plugin_cls, inputs={"success": True}, context_inputs={"b": "1"}),
+            BatchInvocation(
+                trace_id="t2", plugin_cls=plugin_cls, inputs={"success": True, "poll": True}, context_inputs={"b": "1"}
+            ),
+        ]
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                results = BKPluginExecutor.execute_batch(invocations, max_workers=2)
+
+        assert results[0].state is State.SUCCESS
+        assert results[1].state is State.FAIL
+        assert results[1].err == "schedule create error: db error"
+        current_app.tasks[BKPluginExecutor.SCHEDULE_TASK_NAME].apply_async.assert_not_called()
+
+    @pytest.mark.django_db
+    def test_execute_batch__create_schedules(self, plugin_cls):
+        invocations = [
+            BatchInvocation(
+                trace_id="t%s" % i,
+                plugin_cls=plugin_cls,
+                inputs={"success": True, "poll": True},
+                context_inputs={"b": "1"},
+            )
+            for i in range(3)
+        ]
+
+        with patch("bk_plugin_framework.runtime.executor.current_app", MagicMock()):
+            results = BKPluginExecutor.execute_batch(invocations, max_workers=2)
+
+        assert [r.state for r in results] == [State.POLL] * 3
+        assert sorted(Schedule.objects.values_list("trace_id", "state", "inputs")) == [
+            ("t%s" % i, State.POLL.value, '{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}')
+            for i in range(3)
+        ]
+
+    @pytest.mark.django_db
+    def test_callback__retry_after_poll_race(self, executor, plugin_cls):
+        trace_id = "callback_race"
+        Schedule.objects.create(
+            trace_id=trace_id,
+            plugin_version="1.0.0",
+            state=State.CALLBACK.value,
+            inputs='{"inputs": {"success": true, "count": true}, "context_data": {"b": "1"}}',
+            data='{"storage": {}, "outputs": {}}',
+            scheduling=True,
+        )
+        schedule = Schedule.objects.get_for_execute(trace_id=trace_id)
+        original_call_plugin_execute = executor_module.call_plugin_execute
+        executed = []
+
+        def call_plugin_execute(plugin, inputs, context):
+            executed.append(context.invoke_count)
+            if len(executed) == 1:
+                # 回调执行期间并发的轮询推进了 Schedule
+                Schedule.objects.update_with_version(trace_id, invoke_count=5)
+            original_call_plugin_execute(plugin, inputs=inputs, context=context)
+
+        with patch.object(executor_module, "call_plugin_execute", call_plugin_execute):
+            executor.schedule(plugin_cls, schedule, {"callback_id": "c", "callback_data": {}})
+
+        # 基于最新的 Schedule 重新执行回调
+        assert executed == [2, 6]
+        row = Schedule.objects.get(trace_id=trace_id)
+        assert row.state == State.SUCCESS.value
+        assert row.invoke_count == 6
+        assert json.loads(row.data)["storage"] == {"count": 1}
+        assert row.scheduling is False
+        # 调度锁已随结果释放，退出锁时不会重复释放
+        assert schedule.scheduling is False
+
+    @pytest.mark.django_db
+    def test_callback__no_retry_when_state_changed(self, executor, plugin_cls):
+        trace_id = "callback_race_finished"
+        Schedule.objects.create(
+            trace_id=trace_id,
+            plugin_version="1.0.0",
+            state=State.CALLBACK.value,
+            inputs='{"inputs": {"success": true}, "context_data": {"b": "1"}}',
+            data='{"storage": {}, "outputs": {}}',
+            scheduling=True,
+        )
+        schedule = Schedule.objects.get_for_execute(trace_id=trace_id)
+        execute = MagicMock(
+            side_effect=lambda *args, **kwargs: Schedule.objects.update_with_version(trace_id, state=State.FAIL.value)
+        )
+
+        with patch.object(executor_module, "call_plugin_execute", execute):
+            executor.schedule(plugin_cls, schedule, {"callback_id": "c", "callback_data": {}})
+
+        execute.assert_called_once()
+        assert Schedule.objects.get(trace_id=trace_id).state == State.FAIL.value
+
+    @patch.object(settings, "SCHEDULE_CALLBACK_CAS_RETRY_TIMES", 2)
+    def test_callback__retry_times_exhausted(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.state = State.CALLBACK.value
+        executor._schedule = MagicMock(return_value=False)
+
+        executor.schedule(plugin_cls, schedule, {"callback_id": "c", "callback_data": {}})
+
+        assert executor._schedule.call_count == 3
+        assert schedule.refresh_from_db.call_count == 2
+
+    def test_schedule__poll_round_dropped_not_retry(self, executor, plugin_cls):
+        schedule = MagicMock()
+        executor._schedule = MagicMock(return_value=False)
+
+        executor.schedule(plugin_cls, schedule)
+
+        executor._schedule.assert_called_once()
+        schedule.refresh_from_db.assert_not_called()
+
+    def test_execute_batch__empty(self):
+        assert BKPluginExecutor.execute_batch([], max_workers=2) == []
+
     def test_schedule__load_schedule_data_err(self, executor_1, plugin_cls):
         schedule = MagicMock()
         schedule.data = "invalid data"
@@ -193,9 +443,8 @@ class TestBKPluginExecutor:
 
     def test_schedule__plugin_inputs_validation_err(self, executor_1, plugin_cls):
         schedule = MagicMock()
-        schedule.data = (
-            '{"inputs": {}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
-        )
+        schedule.inputs = '{"inputs": {}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
 
         executor_1.schedule(plugin_cls, schedule)
 
@@ -203,7 +452,8 @@ class TestBKPluginExecutor:
 
     def test_schedule__plugin_context_validation_err(self, executor_1, plugin_cls):
         schedule = MagicMock()
-        schedule.data = '{"inputs": {"success": true, "poll": true}, "context": {"storage": {}, "outputs": {}, "data": {}}, "outputs": {}}'  # noqa
+        schedule.inputs = '{"inputs": {"success": true, "poll": true}, "context_data": {}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
 
         executor_1.schedule(plugin_cls, schedule)
 
@@ -212,7 +462,8 @@ class TestBKPluginExecutor:
     def test_schedule__plugin_execute_raise_expected_err(self, executor, plugin_cls):
         schedule = MagicMock()
         schedule.invoke_count = 1
-        schedule.data = '{"inputs": {"success": false, "poll": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
+        schedule.inputs = '{"inputs": {"success": false, "poll": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
         Schedule = MagicMock()
         now = MagicMock(return_value="now")
 
@@ -220,11 +471,11 @@ class TestBKPluginExecutor:
             with patch("bk_plugin_framework.runtime.executor.now", now):
                 executor.schedule(plugin_cls, schedule)
 
-        Schedule.objects.filter.assert_called_once_with(trace_id=schedule.trace_id)
-        Schedule.objects.filter(trace_id=schedule.trace_id).update.assert_called_once_with(
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
             state=State.FAIL.value,
             invoke_count=2,
-            data=schedule.data,
             finish_at="now",
             err="plugin schedule failed: fail",
         )
@@ -232,7 +483,8 @@ class TestBKPluginExecutor:
     def test_schedule__plugin_execute_raise_unexpected_err(self, executor, plugin_cls):
         schedule = MagicMock()
         schedule.invoke_count = 1
-        schedule.data = '{"inputs": {"success": true, "poll": true, "raise_unexpected_err": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
+        schedule.inputs = '{"inputs": {"success": true, "poll": true, "raise_unexpected_err": true}, "context_data": {"b": "1"}}'  # noqa
+        schedule.data = '{"storage": {}, "outputs": {}}'
         Schedule = MagicMock()
         now = MagicMock(return_value="now")
 
@@ -240,15 +492,20 @@ class TestBKPluginExecutor:
             with patch("bk_plugin_framework.runtime.executor.now", now):
                 executor.schedule(plugin_cls, schedule)
 
-        Schedule.objects.filter.assert_called_once_with(trace_id=schedule.trace_id)
-        Schedule.objects.filter(trace_id=schedule.trace_id).update.assert_called_once_with(
-            state=State.FAIL.value, invoke_count=2, finish_at="now", err="plugin schedule failed: fail"
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.FAIL.value,
+            invoke_count=2,
+            finish_at="now",
+            err="plugin schedule failed: fail",
         )
 
     def test_schedule__plugin_execute_waiting_poll(self, executor, plugin_cls):
         schedule = MagicMock()
         schedule.invoke_count = 1
-        schedule.data = '{"inputs": {"success": true, "poll": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
+        schedule.inputs = '{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
         Schedule = MagicMock()
         current_app = MagicMock()
 
@@ -256,9 +513,8 @@ class TestBKPluginExecutor:
             with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
                 executor.schedule(plugin_cls, schedule)
 
-        Schedule.objects.filter.assert_called_once_with(trace_id=schedule.trace_id)
-        Schedule.objects.filter(trace_id=schedule.trace_id).update.assert_called_once_with(
-            state=State.POLL.value, invoke_count=2, data=schedule.data
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id, version=schedule.version, state=State.POLL.value, invoke_count=2
         )
         current_app.tasks[executor.SCHEDULE_TASK_NAME].apply_async.assert_called_once_with(
             kwargs={"trace_id": executor.trace_id},
@@ -266,11 +522,133 @@ class TestBKPluginExecutor:
             queue="plugin_schedule",
         )
 
+    def test_schedule__version_conflict_drop_round(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.version = 3
+        schedule.inputs = '{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        # 其他 worker 已更新 Schedule
+        Schedule.objects.update_with_version.return_value = False
+        current_app = MagicMock()
+        notify = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                with patch("bk_plugin_framework.runtime.executor.notify", notify):
+                    executor.schedule(plugin_cls, schedule)
+
+        # 不以新的版本重试，避免用过期的计算结果覆盖其他 worker 的写入
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id, version=3, state=State.POLL.value, invoke_count=2
+        )
+        current_app.tasks[executor.SCHEDULE_TASK_NAME].apply_async.assert_not_called()
+        notify.publish_state.assert_not_called()
+
+    def test_schedule__plugin_execute_waiting_local_poll(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        current_app = MagicMock()
+        local_poll = MagicMock()
+        local_poll.get_local_poll_scheduler().accepts = MagicMock(return_value=True)
+        local_poll.get_local_poll_scheduler().submit = MagicMock(return_value=True)
+        poll_at = datetime.datetime(2024, 1, 1, 0, 0, 1)
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                with patch("bk_plugin_framework.runtime.executor.local_poll", local_poll):
+                    with patch(
+                        "bk_plugin_framework.runtime.executor.now",
+                        MagicMock(return_value=datetime.datetime(2024, 1, 1)),
+                    ):
+                        executor.schedule(plugin_cls, schedule)
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id, version=schedule.version, state=State.POLL.value, invoke_count=2, poll_at=poll_at
+        )
+        local_poll.get_local_poll_scheduler().submit.assert_called_once_with(
+            task_name=executor.SCHEDULE_TASK_NAME, trace_id=executor.trace_id, interval=1, poll_at=poll_at
+        )
+        local_poll.dispatch_to_celery.assert_not_called()
+        current_app.tasks[executor.SCHEDULE_TASK_NAME].apply_async.assert_not_called()
+
+    def test_schedule__plugin_execute_waiting_local_poll_fallback(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        current_app = MagicMock()
+        local_poll = MagicMock()
+        local_poll.get_local_poll_scheduler().accepts = MagicMock(return_value=True)
+        local_poll.get_local_poll_scheduler().submit = MagicMock(return_value=False)
+        poll_at = datetime.datetime(2024, 1, 1, 0, 0, 1)
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                with patch("bk_plugin_framework.runtime.executor.local_poll", local_poll):
+                    with patch(
+                        "bk_plugin_framework.runtime.executor.now",
+                        MagicMock(return_value=datetime.datetime(2024, 1, 1)),
+                    ):
+                        executor.schedule(plugin_cls, schedule)
+
+        local_poll.dispatch_to_celery.assert_called_once_with(
+            task_name=executor.SCHEDULE_TASK_NAME, trace_id=executor.trace_id, poll_at=poll_at, countdown=1
+        )
+        current_app.tasks[executor.SCHEDULE_TASK_NAME].apply_async.assert_not_called()
+
+    def test_schedule__plugin_execute_waiting_poll_data_changed(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {"success": true, "poll": true, "count": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {"count": 1}, "outputs": {}}'
+        Schedule = MagicMock()
+        current_app = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                executor.schedule(plugin_cls, schedule)
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.POLL.value,
+            invoke_count=2,
+            data='{"storage": {"count": 2}, "outputs": {}}',
+        )
+
+    def test_schedule__legacy_schedule_data_migrate(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = ""
+        schedule.data = '{"inputs": {"success": true, "poll": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
+        Schedule = MagicMock()
+        current_app = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
+                executor.schedule(plugin_cls, schedule)
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.POLL.value,
+            invoke_count=2,
+            inputs='{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}',
+            data='{"storage": {}, "outputs": {}}',
+        )
+
     def test_schedule__plugin_execute_waiting_callback(self, executor, plugin_cls):
         schedule = MagicMock()
         schedule.invoke_count = 1
         schedule.state = State.CALLBACK.value
-        schedule.data = '{"inputs": {"success": true, "poll": true, "callback": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
+        schedule.inputs = '{"inputs": {"success": true, "poll": true, "callback": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
         Schedule = MagicMock()
         current_app = MagicMock()
         callback_info = {"callback_id": "callback_id", "callback_data": {"result": True, "data": {}}}
@@ -278,15 +656,40 @@ class TestBKPluginExecutor:
             with patch("bk_plugin_framework.runtime.executor.current_app", current_app):
                 executor.schedule(plugin_cls, schedule, callback_info)
 
-        Schedule.objects.filter.assert_called_once_with(trace_id=schedule.trace_id)
-        Schedule.objects.filter(trace_id=schedule.trace_id).update.assert_called_once_with(
-            state=State.CALLBACK.value, invoke_count=2, data=schedule.data
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id, version=schedule.version, state=State.CALLBACK.value, invoke_count=2
+        )
+
+    def test_schedule__callback_release_schedule_lock(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.state = State.CALLBACK.value
+        schedule.scheduling = True
+        schedule.inputs = '{"inputs": {"success": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        now = MagicMock(return_value="now")
+        callback_info = {"callback_id": "callback_id", "callback_data": {"result": True, "data": {}}}
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.now", now):
+                executor.schedule(plugin_cls, schedule, callback_info)
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.SUCCESS.value,
+            invoke_count=2,
+            finish_at="now",
+            scheduling=False,
         )
+        assert schedule.scheduling is False
 
     def test_schedule__plugin_execute_success(self, executor, plugin_cls):
         schedule = MagicMock()
         schedule.invoke_count = 1
-        schedule.data = '{"inputs": {"success": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
+        schedule.inputs = '{"inputs": {"success": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
         Schedule = MagicMock()
         now = MagicMock(return_value="now")
 
@@ -294,14 +697,244 @@ class TestBKPluginExecutor:
             with patch("bk_plugin_framework.runtime.executor.now", now):
                 executor.schedule(plugin_cls, schedule)
 
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id, version=schedule.version, state=State.SUCCESS.value, invoke_count=2, finish_at="now"
+        )
+
+    def test_schedule__publish_state_change(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.state = State.POLL.value
+        schedule.inputs = '{"inputs": {"success": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        notify = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", MagicMock()):
+            with patch("bk_plugin_framework.runtime.executor.notify", notify):
+                executor.schedule(plugin_cls, schedule)
+
+        notify.publish_state.assert_called_once_with(schedule.trace_id, State.SUCCESS.value)
+
+    def test_schedule__state_not_change_not_publish(self, executor, plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.state = State.POLL.value
+        schedule.inputs = '{"inputs": {"success": true, "poll": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        notify = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", MagicMock()):
+            with patch("bk_plugin_framework.runtime.executor.current_app", MagicMock()):
+                with patch("bk_plugin_framework.runtime.executor.notify", notify):
+                    executor.schedule(plugin_cls, schedule)
+
+        notify.publish_state.assert_not_called()
+
+    def test_set_schedule_state__publish_state(self, executor):
+        notify = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", MagicMock()):
+            with patch("bk_plugin_framework.runtime.executor.notify", notify):
+                executor._set_schedule_state(trace_id="trace_id", state=State.FAIL)
+
+        notify.publish_state.assert_called_once_with("trace_id", State.FAIL.value)
+
+    def test_schedule__async_plugin(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {}, "context_data": {}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        now = MagicMock(return_value="now")
+
+        with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+            with patch("bk_plugin_framework.runtime.executor.now", now):
+                executor.schedule(async_plugin_cls, schedule)
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.SUCCESS.value,
+            invoke_count=2,
+            finish_at="now",
+            data='{"storage": {}, "outputs": {"invoke_count": 2}}',
+        )
+
+    def test_schedule__async_plugin_submit_to_runner(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        async_schedule = MagicMock()
+        async_schedule.get_async_schedule_runner().submit.return_value = True
+        executor._schedule = MagicMock()
+        Schedule = MagicMock()
+        poll_at = datetime.datetime(2020, 1, 1)
+
+        with patch("bk_plugin_framework.runtime.executor.async_schedule", async_schedule):
+            with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+                with patch("bk_plugin_framework.runtime.executor.now", MagicMock(return_value=poll_at)):
+                    executor.schedule(async_plugin_cls, schedule)
+
+        executor._schedule.assert_not_called()
+        held_poll_at = poll_at + datetime.timedelta(seconds=settings.ASYNC_SCHEDULE_RECOVER_AFTER)
         Schedule.objects.filter.assert_called_once_with(trace_id=schedule.trace_id)
-        Schedule.objects.filter(trace_id=schedule.trace_id).update.assert_called_once_with(
-            state=State.SUCCESS.value, invoke_count=2, data=schedule.data, finish_at="now"
+        Schedule.objects.filter().update.assert_called_once_with(poll_at=held_poll_at)
+        Schedule.objects.claim_local_poll.assert_not_called()
+        coroutine_func = async_schedule.get_async_schedule_runner().submit.call_args.args[0]
+        assert coroutine_func.func == executor.aschedule
+        assert coroutine_func.keywords == {
+            "plugin_cls": async_plugin_cls,
+            "schedule": schedule,
+            "poll_at": held_poll_at,
+        }
+
+    def test_schedule__async_plugin_runner_full(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        async_schedule = MagicMock()
+        async_schedule.get_async_schedule_runner().submit.return_value = False
+        executor._schedule = MagicMock()
+        Schedule = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.async_schedule", async_schedule):
+            with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+                executor.schedule(async_plugin_cls, schedule)
+
+        poll_at = Schedule.objects.filter().update.call_args.kwargs["poll_at"]
+        Schedule.objects.claim_local_poll.assert_called_once_with(schedule.trace_id, poll_at)
+        executor._schedule.assert_called_once_with(plugin_cls=async_plugin_cls, schedule=schedule, callback_info={})
+
+    def test_schedule__async_plugin_persist_poll_at_err(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        async_schedule = MagicMock()
+        executor._schedule = MagicMock()
+        Schedule = MagicMock()
+        Schedule.objects.filter().update.side_effect = Exception
+
+        with patch("bk_plugin_framework.runtime.executor.async_schedule", async_schedule):
+            with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+                executor.schedule(async_plugin_cls, schedule)
+
+        async_schedule.get_async_schedule_runner().submit.assert_not_called()
+        executor._schedule.assert_called_once_with(plugin_cls=async_plugin_cls, schedule=schedule, callback_info={})
+
+    def test_schedule__async_plugin_callback_not_submit(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        async_schedule = MagicMock()
+        executor._schedule = MagicMock()
+        callback_info = {"callback_id": "callback_id", "callback_data": {}}
+
+        with patch("bk_plugin_framework.runtime.executor.async_schedule", async_schedule):
+            executor.schedule(async_plugin_cls, schedule, callback_info)
+
+        async_schedule.get_async_schedule_runner().submit.assert_not_called()
+        executor._schedule.assert_called_once_with(
+            plugin_cls=async_plugin_cls, schedule=schedule, callback_info=callback_info
+        )
+
+    def test_schedule__sync_plugin_not_submit(self, executor, plugin_cls):
+        schedule = MagicMock()
+        async_schedule = MagicMock()
+        executor._schedule = MagicMock()
+
+        with patch("bk_plugin_framework.runtime.executor.async_schedule", async_schedule):
+            executor.schedule(plugin_cls, schedule)
+
+        async_schedule.get_async_schedule_runner().submit.assert_not_called()
+        executor._schedule.assert_called_once_with(plugin_cls=plugin_cls, schedule=schedule, callback_info={})
+
+    def test_aschedule__async_plugin(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {}, "context_data": {}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        now = MagicMock(return_value="now")
+
+        with patch("bk_plugin_framework.runtime.schedule.async_schedule.close_old_connections"):
+            with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+                with patch("bk_plugin_framework.runtime.executor.now", now):
+                    asyncio.run(executor.aschedule(async_plugin_cls, schedule))
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.SUCCESS.value,
+            invoke_count=2,
+            finish_at="now",
+            data='{"storage": {}, "outputs": {"invoke_count": 2}}',
+        )
+
+    def test_aschedule__clear_held_poll_at(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {}, "context_data": {}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        now = MagicMock(return_value="now")
+
+        with patch("bk_plugin_framework.runtime.schedule.async_schedule.close_old_connections"):
+            with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+                with patch("bk_plugin_framework.runtime.executor.now", now):
+                    asyncio.run(executor.aschedule(async_plugin_cls, schedule, poll_at="poll_at"))
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.SUCCESS.value,
+            invoke_count=2,
+            finish_at="now",
+            data='{"storage": {}, "outputs": {"invoke_count": 2}}',
+            poll_at=None,
+        )
+        Schedule.objects.claim_local_poll.assert_not_called()
+
+    def test_aschedule__round_dropped_clear_held_poll_at(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {}, "context_data": {}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        Schedule.objects.update_with_version.return_value = False
+
+        with patch("bk_plugin_framework.runtime.schedule.async_schedule.close_old_connections"):
+            with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+                asyncio.run(executor.aschedule(async_plugin_cls, schedule, poll_at="poll_at"))
+
+        Schedule.objects.claim_local_poll.assert_called_once_with(schedule.trace_id, "poll_at")
+
+    def test_aschedule__async_plugin_execute_failed(self, executor, async_plugin_cls):
+        schedule = MagicMock()
+        schedule.invoke_count = 1
+        schedule.inputs = '{"inputs": {"success": false}, "context_data": {}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
+        Schedule = MagicMock()
+        now = MagicMock(return_value="now")
+
+        with patch("bk_plugin_framework.runtime.schedule.async_schedule.close_old_connections"):
+            with patch("bk_plugin_framework.runtime.executor.Schedule", Schedule):
+                with patch("bk_plugin_framework.runtime.executor.now", now):
+                    asyncio.run(executor.aschedule(async_plugin_cls, schedule))
+
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
+            state=State.FAIL.value,
+            invoke_count=2,
+            finish_at="now",
+            err="plugin schedule failed: fail",
         )
 
+    def test_aschedule__prepare_err(self, executor_1, async_plugin_cls):
+        schedule = MagicMock()
+        schedule.data = "{"
+
+        with patch("bk_plugin_framework.runtime.schedule.async_schedule.close_old_connections"):
+            asyncio.run(executor_1.aschedule(async_plugin_cls, schedule))
+
+        executor_1._set_schedule_state.assert_called_once_with(trace_id=schedule.trace_id, state=State.FAIL)
+
     def test_schedule__plugin_execute_success_dump_data_err(self, executor_2, plugin_cls):
         schedule = MagicMock()
-        schedule.data = '{"inputs": {"success": true}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'  # noqa
+        schedule.inputs = '{"inputs": {"success": true, "count": true}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
 
         executor_2.schedule(plugin_cls, schedule)
 
@@ -317,7 +950,8 @@ class TestBKPluginExecutor:
     def test_schedule__plugin_inputs_and_context_not_define(self, executor, empty_plugin_cls):
         schedule = MagicMock()
         schedule.invoke_count = 1
-        schedule.data = '{"inputs": {}, "context": {"storage": {}, "outputs": {}, "data": {"b": "1"}}, "outputs": {}}'
+        schedule.inputs = '{"inputs": {}, "context_data": {"b": "1"}}'
+        schedule.data = '{"storage": {}, "outputs": {}}'
         Schedule = MagicMock()
         now = MagicMock(return_value="now")
 
@@ -325,10 +959,10 @@ class TestBKPluginExecutor:
             with patch("bk_plugin_framework.runtime.executor.now", now):
                 executor.schedule(empty_plugin_cls, schedule)
 
-        Schedule.objects.filter.assert_called_once_with(trace_id=schedule.trace_id)
-        Schedule.objects.filter(trace_id=schedule.trace_id).update.assert_called_once_with(
+        Schedule.objects.update_with_version.assert_called_once_with(
+            schedule.trace_id,
+            version=schedule.version,
             state=State.SUCCESS.value,
             invoke_count=2,
-            data='{"inputs": {}, "context": {"storage": {}, "outputs": {}, "data": {}}, "outputs": {}}',
             finish_at="now",
         )
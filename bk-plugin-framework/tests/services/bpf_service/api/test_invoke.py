@@ -0,0 +1,84 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from django.test import RequestFactory
+
+from bk_plugin_framework.kit import State
+from bk_plugin_framework.runtime.executor import ExecuteResult
+
+pytest.importorskip("apigw_manager")
+pytest.importorskip("blueapps")
+
+from bk_plugin_framework.services.bpf_service.api import invoke  # noqa: E402
+
+VALID_BODY = {"inputs": {"a": 1}, "context": {}}
+
+
+def post(body, version="1.0.0", jwt=True, permitted=True):
+    request = RequestFactory().post("/invoke/%s" % version, data=body, content_type="application/json")
+    request.trace_id = "trace_id"
+    if jwt:
+        request.jwt = MagicMock()
+    with patch.object(invoke.ScopeAllowPermission, "has_permission", MagicMock(return_value=permitted)):
+        return asyncio.run(invoke.AsyncInvoke.as_view()(request, version=version))
+
+
+@pytest.fixture
+def plugin_cls():
+    plugin_cls = MagicMock()
+    with patch.object(invoke.VersionHub, "resolve", MagicMock(side_effect={"1.0.0": plugin_cls}.get)):
+        yield plugin_cls
+
+
+def test_async_invoke_not_from_apigw(plugin_cls):
+    response = post(VALID_BODY, jwt=False)
+
+    assert response.status_code == 403
+
+
+def test_async_invoke_permission_checked_before_version(plugin_cls):
+    assert post(VALID_BODY, version="9.9.9", permitted=False).status_code == 403
+    assert post(VALID_BODY, version="1.0.0", permitted=False).status_code == 403
+
+
+def test_async_invoke_version_not_found(plugin_cls):
+    response = post(VALID_BODY, version="9.9.9")
+
+    assert response.status_code == 404
+
+
+def test_async_invoke_invalid_params(plugin_cls):
+    response = post({"inputs": {}})
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["result"] is False
+
+
+def test_async_invoke_success(plugin_cls):
+    executor = MagicMock()
+    executor.aexecute = AsyncMock(return_value=ExecuteResult(state=State.SUCCESS, outputs={"b": 2}, err=None))
+
+    with patch.object(invoke, "BKPluginExecutor", MagicMock(return_value=executor)):
+        response = post(VALID_BODY)
+
+    assert response.status_code == 200
+    assert json.loads(response.content) == {
+        "result": True,
+        "data": {"outputs": {"b": 2}, "state": State.SUCCESS.value, "err": None},
+        "message": "success",
+        "trace_id": "trace_id",
+    }
+    executor.aexecute.assert_called_once_with(plugin_cls=plugin_cls, inputs={"a": 1}, context_inputs={})
@@ -0,0 +1,78 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.test import RequestFactory
+from django.urls import Resolver404
+from rest_framework.response import Response
+
+pytest.importorskip("apigw_manager")
+pytest.importorskip("blueapps")
+
+from bk_plugin_framework.services.bpf_service.api import (  # noqa: E402
+    plugin_api_dispatch,
+)
+
+VALID_BODY = {"url": "/bk_plugin/plugin_api/echo/", "method": "GET", "username": "admin"}
+
+
+def post(body, jwt=True, permitted=True):
+    request = RequestFactory().post("/plugin_api_dispatch/", data=body, content_type="application/json")
+    request.trace_id = "trace_id"
+    if jwt:
+        request.jwt = MagicMock()
+    with patch.object(plugin_api_dispatch.ScopeAllowPermission, "has_permission", MagicMock(return_value=permitted)):
+        return asyncio.run(plugin_api_dispatch.AsyncPluginAPIDispatch.as_view()(request))
+
+
+def test_async_dispatch_not_from_apigw():
+    assert post(VALID_BODY, jwt=False).status_code == 403
+
+
+def test_async_dispatch_permission_denied():
+    assert post(VALID_BODY, permitted=False).status_code == 403
+
+
+def test_async_dispatch_invalid_params():
+    response = post({"url": "/bk_plugin/plugin_api/echo/"})
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["trace_id"] == "trace_id"
+
+
+def test_async_dispatch_url_not_found():
+    build_dispatch_request = MagicMock(side_effect=Resolver404({"path": VALID_BODY["url"]}))
+
+    with patch.object(plugin_api_dispatch, "build_dispatch_request", build_dispatch_request):
+        response = post(VALID_BODY)
+
+    assert response.status_code == 404
+
+
+def test_async_dispatch_success():
+    view_func = MagicMock(return_value=Response({"a": 1}))
+    build_dispatch_request = MagicMock(return_value=(view_func, {"k": "v"}, "fake_request"))
+
+    with patch.object(plugin_api_dispatch, "build_dispatch_request", build_dispatch_request):
+        response = post(VALID_BODY)
+
+    assert response.status_code == 200
+    assert json.loads(response.content) == {
+        "result": True,
+        "data": {"a": 1},
+        "message": "success",
+        "trace_id": "trace_id",
+    }
+    view_func.assert_called_once_with("fake_request", k="v")
@@ -0,0 +1,97 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.test import RequestFactory
+
+from bk_plugin_framework.kit import State
+from bk_plugin_framework.runtime.schedule import notify
+from bk_plugin_framework.runtime.schedule.models import Schedule
+
+pytest.importorskip("apigw_manager")
+pytest.importorskip("blueapps")
+
+from bk_plugin_framework.services.bpf_service.api import schedule  # noqa: E402
+
+
+def get(view_cls, trace_id, **params):
+    request = RequestFactory().get("/schedule/%s" % trace_id, data=params)
+    request.trace_id = "trace_id"
+    # 测试环境未安装 django.contrib.auth，跳过用户认证
+    with patch.object(view_cls, "perform_authentication", MagicMock()):
+        return view_cls.as_view()(request, trace_id=trace_id)
+
+
+@pytest.fixture
+def limiter():
+    limiter = notify.WaiterLimiter(1)
+    with patch.object(notify, "get_waiter_limiter", MagicMock(return_value=limiter)):
+        yield limiter
+
+
+@pytest.fixture
+def trace_id():
+    trace_id = uuid.uuid4().hex
+    Schedule.objects.create(trace_id=trace_id, plugin_version="1.0.0", state=State.POLL.value, data="{}")
+    return trace_id
+
+
+@pytest.mark.django_db
+class TestScheduleWait:
+    def test_wait(self, limiter, trace_id):
+        with patch.object(
+            notify, "iter_state_changes", MagicMock(return_value=(s for s in [State.SUCCESS.value]))
+        ) as changes:
+            response = get(schedule.ScheduleWait, trace_id, timeout=1)
+
+        assert response.data["result"] is True
+        changes.assert_called_once()
+        assert limiter.acquire()
+
+    def test_waiters_limit_exceeded(self, limiter, trace_id):
+        limiter.acquire()
+
+        with patch.object(notify, "iter_state_changes") as changes:
+            response = get(schedule.ScheduleWait, trace_id, timeout=1)
+
+        assert response.data["result"] is True
+        assert response.data["data"]["state"] == State.POLL.value
+        changes.assert_not_called()
+
+
+@pytest.mark.django_db
+class TestScheduleStream:
+    def test_stream_release_on_close(self, limiter, trace_id):
+        with patch.object(notify, "iter_state_changes", MagicMock(return_value=(s for s in []))):
+            response = get(schedule.ScheduleStream, trace_id, timeout=1)
+            assert not limiter.acquire()
+
+            assert b"".join(response.streaming_content).startswith(b"event: state\n")
+            response.close()
+
+        assert limiter.acquire()
+
+    def test_waiters_limit_exceeded(self, limiter, trace_id):
+        limiter.acquire()
+
+        response = get(schedule.ScheduleStream, trace_id, timeout=1)
+
+        assert response.status_code == 429
+        assert response.data["result"] is False
+
+    def test_not_found_without_acquire(self, limiter):
+        response = get(schedule.ScheduleStream, "not_exist", timeout=1)
+
+        assert response.data["result"] is False
+        assert limiter.acquire()
@@ -0,0 +1,98 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+from django.http import JsonResponse
+from django.test import RequestFactory
+from rest_framework.permissions import BasePermission
+
+from bk_plugin_framework.services.bpf_service import async_view
+from bk_plugin_framework.services.bpf_service.async_view import (
+    AsyncAPIView,
+    async_api_enabled,
+)
+
+
+class DenyPermission(BasePermission):
+    def has_permission(self, request, view):
+        return False
+
+
+class EchoView(AsyncAPIView):
+    async def post(self, request):
+        return JsonResponse(dict(self.load_data(request)))
+
+
+def apigw_request(*args, **kwargs):
+    request = RequestFactory().post(*args, **kwargs)
+    request.jwt = MagicMock()
+    return request
+
+
+def test_as_view_csrf_exempt():
+    view = EchoView.as_view()
+
+    assert view.csrf_exempt is True
+    assert asyncio.iscoroutinefunction(view)
+
+
+def test_load_json_data():
+    request = apigw_request("/", data={"a": 1}, content_type="application/json")
+
+    response = asyncio.run(EchoView.as_view()(request))
+
+    assert json.loads(response.content) == {"a": 1}
+
+
+def test_load_form_data():
+    request = RequestFactory().post("/", data={"a": "1"})
+
+    assert AsyncAPIView.load_data(request).dict() == {"a": "1"}
+
+
+def test_permission_denied():
+    request = apigw_request("/", data={}, content_type="application/json")
+
+    response = asyncio.run(EchoView.as_view(permission_classes=[DenyPermission])(request))
+
+    assert response.status_code == 403
+
+
+def test_not_from_apigw():
+    request = RequestFactory().post("/", data={}, content_type="application/json")
+
+    response = asyncio.run(EchoView.as_view()(request))
+
+    assert response.status_code == 403
+    assert asyncio.run(EchoView.as_view(apigw_required=False)(request)).status_code == 200
+
+
+def test_method_not_allowed():
+    request = RequestFactory().get("/")
+    request.jwt = MagicMock()
+
+    response = asyncio.run(EchoView.as_view()(request))
+
+    assert response.status_code == 405
+
+
+def test_async_api_enabled():
+    with patch.object(async_view.settings, "ASYNC_API_ENABLED", False):
+        assert async_api_enabled() is False
+
+    with patch.object(async_view.settings, "ASYNC_API_ENABLED", True):
+        assert async_api_enabled() is True
+
+        with patch.object(async_view, "ASYNC_VIEW_SUPPORTED", False):
+            assert async_api_enabled() is False
@@ -0,0 +1,230 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+from functools import wraps
+from unittest.mock import patch
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+from django.urls import Resolver404, path
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from bk_plugin_framework.services.bpf_service import dispatch
+from bk_plugin_framework.utils.http import HeaderForwarder, meta_key
+
+
+class EchoAPIView(APIView):
+    def get(self, request, **kwargs):
+        return Response(self.echo(request, kwargs))
+
+    def post(self, request, **kwargs):
+        return Response(self.echo(request, kwargs))
+
+    @staticmethod
+    def echo(request, kwargs):
+        return {
+            "data": request.data,
+            "query": request.query_params.dict(),
+            "files": {key: f.read() for key, f in request.FILES.items()},
+            "username": request.user.username,
+            "plugin_header": request.META.get("HTTP_BK_PLUGIN_X"),
+            "kwargs": kwargs,
+        }
+
+
+def deny(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        return JsonResponse({"detail": "denied"}, status=403)
+
+    return wrapper
+
+
+def echo_body_view(request):
+    return JsonResponse({"body": request.body.decode(), "post": request.POST.dict()})
+
+
+urlpatterns = [
+    path("bk_plugin/plugin_api/echo/<str:name>/", EchoAPIView.as_view()),
+    path("bk_plugin/plugin_api/raw/", echo_body_view),
+    path("bk_plugin/plugin_api/secret/", deny(EchoAPIView.as_view())),
+]
+
+
+@pytest.fixture(autouse=True)
+def urlconf():
+    dispatch.resolve_plugin_api.cache_clear()
+    # 相当于配置了 PLUGIN_API_FORWARD_HEADERS=["Bk-Plugin-X"]
+    forwarder = HeaderForwarder(keys=[meta_key("Bk-Plugin-X")], defaults={"HTTP_X_BKAPI_JWT": ""})
+    with override_settings(ROOT_URLCONF=__name__), patch.object(dispatch, "PLUGIN_API_HEADER_FORWARDER", forwarder):
+        yield
+    dispatch.resolve_plugin_api.cache_clear()
+
+
+def origin_request(**kwargs):
+    request = RequestFactory().post(
+        "/bk_plugin/plugin_api_dispatch/",
+        data={},
+        content_type="application/json",
+        HTTP_BK_PLUGIN_X="x",
+        HTTP_OTHER="other",
+        **kwargs,
+    )
+    request.jwt = "jwt"
+    return request
+
+
+def call(origin, request_data):
+    view_func, kwargs, fake_request = dispatch.build_dispatch_request(origin, request_data)
+    return view_func(fake_request, **kwargs), fake_request
+
+
+def test_dispatch_api_view_post():
+    data = {"a": 1, "b": [1, 2], "c": {"d": None}}
+
+    response, fake_request = call(
+        origin_request(),
+        {"url": "/bk_plugin/plugin_api/echo/n/?q=1", "method": "POST", "username": "admin", "data": data},
+    )
+
+    assert isinstance(fake_request, dispatch.DispatchHttpRequest)
+    assert fake_request.jwt == "jwt"
+    assert "HTTP_OTHER" not in fake_request.META
+    assert fake_request.META["HTTP_X_BKAPI_JWT"] == ""
+    assert response.data == {
+        "data": data,
+        "query": {"q": "1"},
+        "files": {},
+        "username": "admin",
+        "plugin_header": "x",
+        "kwargs": {"name": "n"},
+    }
+    # 已解析的数据直接交给视图
+    assert response.data["data"] is data
+
+
+def test_dispatch_api_view_get():
+    response, fake_request = call(
+        origin_request(),
+        {"url": "/bk_plugin/plugin_api/echo/n/?q=1", "method": "get", "username": "admin", "data": {"a": 1, "b": [1]}},
+    )
+
+    assert fake_request.method == "GET"
+    assert fake_request.body == b""
+    assert response.data["data"] == {}
+    assert response.data["query"] == {"a": "1", "b": "1"}
+
+
+def test_dispatch_api_view_get_url_query():
+    response, _ = call(
+        origin_request(),
+        {"url": "/bk_plugin/plugin_api/echo/n/?q=1", "method": "GET", "username": "admin", "data": {}},
+    )
+
+    assert response.data["query"] == {"q": "1"}
+
+
+def test_dispatch_api_view_files():
+    upload = SimpleUploadedFile("a.txt", b"content")
+    origin = RequestFactory().post("/bk_plugin/plugin_api_dispatch/", data={"file": upload})
+    origin.jwt = "jwt"
+
+    response, fake_request = call(
+        origin,
+        {"url": "/bk_plugin/plugin_api/echo/n/", "method": "POST", "username": "admin", "data": {"a": 1, "b": [1, 2]}},
+    )
+
+    # 上传文件直接透传
+    assert fake_request.dispatch_files is origin.FILES
+    assert response.data["files"] == {"file": b"content"}
+    assert response.data["data"].getlist("b") == ["1", "2"]
+    assert response.data["data"]["a"] == "1"
+
+
+def test_dispatch_lazy_body():
+    _, fake_request = call(
+        origin_request(),
+        {"url": "/bk_plugin/plugin_api/echo/n/", "method": "POST", "username": "admin", "data": {"a": 1}},
+    )
+
+    assert json.loads(fake_request.body) == {"a": 1}
+
+
+def test_dispatch_non_drf_view():
+    response, fake_request = call(
+        origin_request(),
+        {"url": "/bk_plugin/plugin_api/raw/", "method": "POST", "username": "admin", "data": {"a": 1}},
+    )
+
+    assert not isinstance(fake_request, dispatch.DispatchHttpRequest)
+    assert json.loads(json.loads(response.content)["body"]) == {"a": 1}
+
+
+def test_dispatch_decorated_api_view():
+    response, fake_request = call(
+        origin_request(),
+        {"url": "/bk_plugin/plugin_api/secret/", "method": "POST", "username": "admin", "data": {"a": 1}},
+    )
+
+    # 装饰器不能被跳过
+    assert not isinstance(fake_request, dispatch.DispatchHttpRequest)
+    assert response.status_code == 403
+
+
+def test_resolve_plugin_api_cached():
+    dispatch.resolve_plugin_api("/bk_plugin/plugin_api/echo/n/")
+    dispatch.resolve_plugin_api("/bk_plugin/plugin_api/echo/n/")
+
+    assert dispatch.resolve_plugin_api.cache_info().hits == 1
+
+
+def test_resolve_plugin_api_404():
+    with pytest.raises(Resolver404):
+        dispatch.resolve_plugin_api("/bk_plugin/plugin_api/not_exist/")
+
+
+def test_to_query_dict():
+    query = dispatch.to_query_dict({"a": 1, "b": ["x", 2], "c": True})
+
+    assert query.getlist("b") == ["x", "2"]
+    assert query.dict() == {"a": "1", "b": "2", "c": "True"}
+    assert not query._mutable
+
+
+def test_to_query_dict_skip_none():
+    query = dispatch.to_query_dict({"a": None, "b": ["x", None], "c": ""})
+
+    assert "a" not in query
+    assert query.getlist("b") == ["x"]
+    assert query["c"] == ""
+
+
+def test_is_api_view():
+    assert dispatch.is_api_view(EchoAPIView.as_view())
+    assert dispatch.is_api_view(EchoAPIView.as_view(renderer_classes=[]))
+    assert not dispatch.is_api_view(lambda request: None)
+    assert not dispatch.is_api_view(deny(EchoAPIView.as_view()))
+    assert not dispatch.is_api_view(csrf_exempt(EchoAPIView.as_view()))
+
+
+def test_is_api_view_without_view_is_async(monkeypatch):
+    view_func = EchoAPIView.as_view()
+    # Django 4.1 之前的 View 没有 view_is_async
+    monkeypatch.delattr(View, "view_is_async")
+
+    assert not hasattr(EchoAPIView, "view_is_async")
+    assert dispatch.is_api_view(view_func)
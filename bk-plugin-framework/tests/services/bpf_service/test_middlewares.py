@@ -0,0 +1,69 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from bk_plugin_framework.services.bpf_service import middlewares
+from bk_plugin_framework.services.bpf_service.middlewares import (
+    TraceIDInjectMiddleware,
+)
+from bk_plugin_framework.utils import local
+
+
+def test_trace_id_inject():
+    response = HttpResponse()
+    get_response = MagicMock(return_value=response)
+    request = RequestFactory().get("/")
+
+    middleware = TraceIDInjectMiddleware(get_response)
+
+    assert iscoroutinefunction(middleware) is False
+    assert middleware(request) is response
+    assert len(request.trace_id) == 32
+    assert local.get_trace_id() == request.trace_id
+    get_response.assert_called_once_with(request)
+
+
+def test_trace_id_inject_async():
+    response = HttpResponse()
+
+    async def get_response(request):
+        assert local.get_trace_id() == request.trace_id
+        return response
+
+    request = RequestFactory().get("/")
+    middleware = TraceIDInjectMiddleware(get_response)
+
+    assert iscoroutinefunction(middleware) is True
+    assert asyncio.run(middleware(request)) is response
+    assert len(request.trace_id) == 32
+
+
+def test_trace_id_inject_without_markcoroutinefunction():
+    async def get_response(request):
+        return HttpResponse()
+
+    request = RequestFactory().get("/")
+
+    # asgiref < 3.6 时只以同步方式调用
+    with patch.object(middlewares, "markcoroutinefunction", None), patch.object(
+        TraceIDInjectMiddleware, "async_capable", False
+    ):
+        middleware = TraceIDInjectMiddleware(get_response)
+
+        assert iscoroutinefunction(middleware) is False
+        assert asyncio.run(middleware(request)).status_code == 200
+        assert len(request.trace_id) == 32
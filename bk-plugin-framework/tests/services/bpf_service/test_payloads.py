@@ -0,0 +1,76 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from bk_plugin_framework.kit import Plugin
+from bk_plugin_framework.services.bpf_service import payloads
+from bk_plugin_framework.utils.http import content_etag
+
+
+@pytest.fixture(autouse=True)
+def clear_meta_payload():
+    payloads.get_meta_payload.cache_clear()
+    yield
+    payloads.get_meta_payload.cache_clear()
+
+
+@patch("bk_plugin_framework.hub.load_form_module_path", MagicMock(return_value="tests"))
+def test_get_meta_payload():
+    class MyPlugin(Plugin):
+        class Meta:
+            version = "1.0.0"
+
+    meta = payloads.get_meta_payload()
+
+    assert isinstance(meta, payloads.MetaPayload)
+    assert payloads.get_meta_payload() is meta
+    assert meta.data["code"] == "APP_CODE"
+    assert meta.data["versions"] == ["1.0.0"]
+    assert json.loads(meta.content) == {"result": True, "data": meta.data, "message": ""}
+    assert meta.etag == content_etag(meta.content)
+
+
+@patch("bk_plugin_framework.hub.load_form_module_path", MagicMock(return_value="tests"))
+def test_warm_up():
+    class MyPlugin(Plugin):
+        class Meta:
+            version = "1.0.0"
+
+    with patch.object(MyPlugin, "detail") as detail:
+        payloads.warm_up()
+
+    detail.assert_called_once_with()
+    assert payloads.get_meta_payload.cache_info().currsize == 1
+
+
+@patch("bk_plugin_framework.hub.load_form_module_path", MagicMock(return_value="tests"))
+def test_warm_up_error_logged():
+    class BrokenPlugin(Plugin):
+        class Meta:
+            version = "1.0.0"
+
+    class MyPlugin(Plugin):
+        class Meta:
+            version = "1.0.1"
+
+    with patch.object(BrokenPlugin, "detail", MagicMock(side_effect=ValueError)), patch.object(
+        MyPlugin, "detail"
+    ) as detail, patch.object(payloads, "get_meta_payload", MagicMock(side_effect=ValueError)), patch.object(
+        payloads, "logger"
+    ) as logger:
+        payloads.warm_up()
+
+    detail.assert_called_once_with()
+    assert logger.exception.call_count == 2
@@ -49,3 +49,29 @@ class TestGatewayResources:
                 "resourcePermissionRequired": False,
             }
             assert resource["backend"]["path"] == expected_backend_path
+
+    def test_schedule_notify_resources_registered_with_notify_backend(self):
+        engine = Engine()
+        template = engine.from_string(RESOURCE_TEMPLATE.read_text(encoding="utf-8"))
+
+        paths = yaml.safe_load(
+            template.render(
+                Context({"settings": {"BK_PLUGIN_APIGW_BACKEND_SUB_PATH": "", "SCHEDULE_NOTIFY_BACKEND": ""}})
+            )
+        )["paths"]
+        assert "/bk_plugin/schedule/{id}/wait" not in paths
+        assert "/bk_plugin/schedule/{id}/stream" not in paths
+
+        paths = yaml.safe_load(
+            template.render(
+                Context({"settings": {"BK_PLUGIN_APIGW_BACKEND_SUB_PATH": "", "SCHEDULE_NOTIFY_BACKEND": "redis"}})
+            )
+        )["paths"]
+        for suffix in ("wait", "stream"):
+            resource = paths["/bk_plugin/schedule/{id}/%s" % suffix]["get"]["x-bk-apigateway-resource"]
+            assert resource["backend"]["path"] == "/bk_plugin/schedule/{id}/%s" % suffix
+            assert resource["authConfig"] == {
+                "userVerifiedRequired": False,
+                "appVerifiedRequired": True,
+                "resourcePermissionRequired": False,
+            }
@@ -14,6 +14,7 @@ BK_APP_SECRET = "1" * 52
 BK_PLUGIN_APIGW_BACKEND_HOST = ""
 BK_API_URL_TMPL = "{api_name}.apigw.com"
 BK_APIGW_NAME = "APP_CODE"
+APP_CODE = "APP_CODE"
 BK_PLUGIN_APIGW_STAGE_NAME = "stag"
 
 INSTALLED_APPS = (
@@ -29,3 +30,10 @@ CACHES = {
         "LOCATION": "bk_plugin_cache",
     },
 }
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}
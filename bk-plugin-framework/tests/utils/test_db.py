@@ -0,0 +1,74 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from bk_plugin_framework.utils.db import delete_in_chunks, supports_update_returning
+
+
+def make_queryset(pk_batches):
+    queryset = MagicMock()
+    queryset.order_by().values_list().__getitem__ = MagicMock(side_effect=pk_batches)
+    queryset.model._default_manager.filter().delete = MagicMock(
+        side_effect=[(len(pks), {}) for pks in pk_batches if pks]
+    )
+    return queryset
+
+
+class TestDeleteInChunks:
+    def test_delete_in_chunks(self):
+        queryset = make_queryset([[1, 2], [3, 4], []])
+        progress_callback = MagicMock()
+
+        with patch("bk_plugin_framework.utils.db.time.sleep") as sleep:
+            rows = delete_in_chunks(queryset, chunk_size=2, interval=0.5, progress_callback=progress_callback)
+
+        assert rows == 4
+        queryset.model._default_manager.filter.assert_any_call(pk__in=[1, 2])
+        queryset.model._default_manager.filter.assert_any_call(pk__in=[3, 4])
+        progress_callback.assert_has_calls([call(2), call(2)])
+        assert sleep.call_count == 2
+
+    def test_delete_in_chunks__last_chunk_not_full(self):
+        queryset = make_queryset([[1, 2], [3]])
+
+        with patch("bk_plugin_framework.utils.db.time.sleep") as sleep:
+            rows = delete_in_chunks(queryset, chunk_size=2, interval=0.5)
+
+        assert rows == 3
+        assert queryset.order_by().values_list().__getitem__.call_count == 2
+        sleep.assert_called_once_with(0.5)
+
+    def test_delete_in_chunks__nothing_to_delete(self):
+        queryset = make_queryset([[]])
+
+        rows = delete_in_chunks(queryset, chunk_size=2)
+
+        assert rows == 0
+        queryset.model._default_manager.filter().delete.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "vendor, can_return_columns, expected",
+    [
+        ("postgresql", False, True),
+        ("sqlite", True, True),
+        ("sqlite", False, False),
+        ("mysql", True, False),
+    ],
+)
+def test_supports_update_returning(vendor, can_return_columns, expected):
+    connection = MagicMock(vendor=vendor)
+    connection.features.can_return_columns_from_insert = can_return_columns
+
+    assert supports_update_returning(connection) is expected
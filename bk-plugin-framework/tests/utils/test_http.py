@@ -0,0 +1,172 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from bk_plugin_framework.utils import http
+from bk_plugin_framework.utils.http import (
+    ClosingIterator,
+    HeaderForwarder,
+    conditional_json_response,
+    content_etag,
+    dump_standard_response,
+    meta_key,
+    sse_message,
+)
+
+
+def test_dump_standard_response():
+    content = dump_standard_response({"a": "中文"})
+
+    assert content == '{"result":true,"data":{"a":"中文"},"message":""}'.encode("utf-8")
+    assert json.loads(content) == {"result": True, "data": {"a": "中文"}, "message": ""}
+
+
+def test_dump_standard_response__same_as_drf_renderer():
+    data = {
+        "desc": gettext_lazy("插件描述"),
+        "price": Decimal("1.50"),
+        "created_at": datetime.datetime(2022, 1, 1, 12, 0, 0),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    }
+
+    content = dump_standard_response(data)
+
+    assert content == JSONRenderer().render({"result": True, "data": data, "message": ""})
+    assert json.loads(content)["data"] == {
+        "desc": "插件描述",
+        "price": 1.5,
+        "created_at": "2022-01-01T12:00:00",
+        "id": "12345678-1234-5678-1234-567812345678",
+    }
+
+
+def test_sse_message():
+    assert sse_message({"a": "中文"}) == 'data: {"a":"中文"}\n\n'.encode("utf-8")
+    assert sse_message({"state": 4}, event="state") == b'event: state\ndata: {"state":4}\n\n'
+
+
+class TestClosingIterator:
+    def test_iterate(self):
+        on_close = MagicMock()
+
+        assert list(ClosingIterator([b"a", b"b"], on_close)) == [b"a", b"b"]
+        on_close.assert_not_called()
+
+    def test_close_once(self):
+        on_close = MagicMock()
+        closed = []
+
+        def gen():
+            try:
+                yield b"a"
+                yield b"b"
+            finally:
+                closed.append(True)
+
+        iterator = ClosingIterator(gen(), on_close)
+        assert next(iterator) == b"a"
+
+        iterator.close()
+        iterator.close()
+
+        assert closed == [True]
+        on_close.assert_called_once_with()
+
+    # 响应关闭时发送的 request_finished 信号会关闭数据库连接
+    @pytest.mark.django_db
+    def test_closed_by_streaming_response(self):
+        on_close = MagicMock()
+
+        # 客户端在迭代开始前断开时也会释放
+        StreamingHttpResponse(ClosingIterator(iter([b"a"]), on_close)).close()
+
+        on_close.assert_called_once_with()
+
+
+class TestConditionalJsonResponse:
+    content = b'{"result":true}'
+
+    @patch.object(http.settings, "API_CACHE_MAX_AGE", 30)
+    def test_response(self):
+        etag = content_etag(self.content)
+
+        response = conditional_json_response(RequestFactory().get("/"), self.content, etag)
+
+        assert response.status_code == 200
+        assert response.content == self.content
+        assert response["Content-Type"] == "application/json"
+        assert response["ETag"] == etag
+        assert response["Cache-Control"] == "public, max-age=30"
+
+    def test_not_modified(self):
+        etag = content_etag(self.content)
+
+        response = conditional_json_response(RequestFactory().get("/", HTTP_IF_NONE_MATCH=etag), self.content, etag)
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response["ETag"] == etag
+
+    def test_etag_not_match(self):
+        etag = content_etag(self.content)
+
+        response = conditional_json_response(
+            RequestFactory().get("/", HTTP_IF_NONE_MATCH=content_etag(b"other")), self.content, etag
+        )
+
+        assert response.status_code == 200
+        assert response.content == self.content
+
+
+def test_meta_key():
+    assert meta_key("Bk-Plugin-Tenant") == "HTTP_BK_PLUGIN_TENANT"
+    assert meta_key("X-Bkapi-JWT") == "HTTP_X_BKAPI_JWT"
+
+
+class TestHeaderForwarder:
+    def test_forward(self):
+        forwarder = HeaderForwarder(keys=["HTTP_BK_PLUGIN_A"], defaults={"HTTP_X_BKAPI_JWT": ""})
+        meta = {
+            "HTTP_BK_PLUGIN_A": "a",
+            "HTTP_BK_PLUGIN_B": "b",
+            "HTTP_HOST": "host",
+            "REMOTE_ADDR": "127.0.0.1",
+        }
+
+        assert forwarder.forward(meta) == {"HTTP_BK_PLUGIN_A": "a", "HTTP_X_BKAPI_JWT": ""}
+        assert forwarder.forward({"HTTP_X_BKAPI_JWT": "jwt"}) == {"HTTP_X_BKAPI_JWT": "jwt"}
+
+    def test_keys_precomputed(self):
+        forwarder = HeaderForwarder(keys=["HTTP_BK_PLUGIN_A", "HTTP_X_BKAPI_JWT"], defaults={"HTTP_X_BKAPI_JWT": ""})
+
+        assert forwarder.keys == ("HTTP_BK_PLUGIN_A", "HTTP_X_BKAPI_JWT")
+
+    def test_only_look_up_keys(self):
+        forwarder = HeaderForwarder(keys=["HTTP_BK_PLUGIN_A"])
+        meta = MagicMock()
+        meta.__contains__.return_value = True
+        meta.__getitem__.return_value = "a"
+
+        assert forwarder.forward(meta) == {"HTTP_BK_PLUGIN_A": "a"}
+        meta.__getitem__.assert_called_once_with("HTTP_BK_PLUGIN_A")
+        meta.items.assert_not_called()
+        meta.__iter__.assert_not_called()
@@ -0,0 +1,110 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import pytest
+from django.urls import Resolver404, include, path, re_path, resolve
+
+from bk_plugin_framework.utils.routing import RouteTrie, literal_segments
+
+
+def view(request, **kwargs):
+    pass
+
+
+def view_1(request, **kwargs):
+    pass
+
+
+def view_2(request, **kwargs):
+    pass
+
+
+plugin_api_patterns = [
+    path("items/<int:pk>/", view_1, {"extra": 1}),
+    path("items/<str:name>/", view_2),
+    re_path(r"^items/(?P<name>\w+)/detail/?$", view),
+    path("items/", view),
+    re_path(r"^legacy-(?P<id>\d+)/$", view_1),
+    path("nested/", include([path("<slug:slug>/", view_2, name="nested")])),
+    re_path(r"^alt/x/$|^alt/y/$", view_1),
+]
+
+plugin_api_patterns.extend(path("route_%s/<str:id>/" % i, view) for i in range(200))
+
+urlpatterns = [
+    path("bk_plugin/<str:version>/meta/", view_1),
+    re_path(r"^bk_plugin/", include([path("plugin_api/", include(plugin_api_patterns)), path("meta/", view_2)])),
+    path("", include([re_path(r"^bk_plugin/plugin_api/fallback/$", view)]), {"from_root": True}),
+]
+
+PATHS = [
+    "/bk_plugin/plugin_api/items/1/",
+    "/bk_plugin/plugin_api/items/abc/",
+    "/bk_plugin/plugin_api/items/abc/detail",
+    "/bk_plugin/plugin_api/items/abc/detail/",
+    "/bk_plugin/plugin_api/items/",
+    "/bk_plugin/plugin_api/legacy-1/",
+    "/bk_plugin/plugin_api/nested/a-b/",
+    "/bk_plugin/plugin_api/alt/x/",
+    "/bk_plugin/plugin_api/alt/y/",
+    "/bk_plugin/plugin_api/route_150/x/",
+    "/bk_plugin/plugin_api/fallback/",
+    "/bk_plugin/v1/meta/",
+    "/bk_plugin/meta/",
+]
+
+
+@pytest.fixture
+def trie():
+    return RouteTrie(urlpatterns)
+
+
+@pytest.mark.parametrize(
+    "pattern, segments",
+    [
+        (path("a/b/<str:c>/d/", view).pattern, ["a", "b"]),
+        (path("a/b", view).pattern, ["a"]),
+        (path("<str:c>/", view).pattern, []),
+        (re_path(r"^a/b-c/$", view).pattern, ["a", "b-c"]),
+        (re_path(r"^a/bc?/", view).pattern, ["a"]),
+        (re_path(r"a/b/", view).pattern, []),
+        (re_path(r"^(?P<a>\w+)/", view).pattern, []),
+        (re_path(r"^a/x/$|^a/y/$", view).pattern, []),
+        (re_path(r"^a/(x|y)/$", view).pattern, ["a"]),
+        (re_path(r"^a/[|]/$", view).pattern, ["a"]),
+        (re_path(r"^a/\|/$", view).pattern, ["a"]),
+    ],
+)
+def test_literal_segments(pattern, segments):
+    assert literal_segments(pattern) == segments
+
+
+@pytest.mark.parametrize("url", PATHS)
+def test_resolve_same_as_django(trie, url):
+    matched = resolve(url, urlconf=__name__)
+
+    assert trie.resolve(url[1:]) == (matched.func, matched.kwargs)
+
+
+def test_resolve_not_found(trie):
+    with pytest.raises(Resolver404):
+        resolve("/bk_plugin/plugin_api/not_exist/", urlconf=__name__)
+
+    assert trie.resolve("bk_plugin/plugin_api/not_exist/") is None
+
+
+def test_candidates_pruned(trie):
+    plugin_api_trie = trie._sub_tries[1]._sub_tries[0]
+
+    candidates = plugin_api_trie.candidates("route_150/x/")
+
+    # 只尝试前缀匹配的路由，以及没有完整字面量路径段的 legacy-(?P<id>\d+)/ 和包含顶层 | 的 alt 路由
+    assert [index for index, _ in candidates] == [4, 6, 7 + 150]
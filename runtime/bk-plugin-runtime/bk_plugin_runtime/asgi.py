@@ -0,0 +1,25 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - PaaS平台 (BlueKing - PaaS System) available.
+Copyright (C) 2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+ASGI 入口，invoke 及 plugin_api_dispatch 接口使用异步视图，async def execute 的插件在事件循环中执行:
+
+    gunicorn bk_plugin_runtime.asgi -k uvicorn.workers.UvicornWorker -w 8 --timeout 120
+
+需要在插件的 requirements.txt 中添加 uvicorn，或安装 bk-plugin-framework[asgi]
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+os.environ.setdefault("ASYNC_API_ENABLED", "true")
+
+application = get_asgi_application()
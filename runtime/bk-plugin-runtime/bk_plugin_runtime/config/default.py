@@ -21,6 +21,10 @@ from blueapps.conf.log import get_logging_config_dict
 BKPAAS_ENVIRONMENT = os.getenv("BKPAAS_ENVIRONMENT", "dev")
 # 默认关闭可观测性
 ENABLE_OTEL_METRICS = os.getenv("ENABLE_METRICS", False)
+# 插件 trace 日志是否批量缓冲落库
+BK_PLUGIN_LOG_BUFFERED = os.getenv("BK_PLUGIN_LOG_BUFFERED", "false").lower() == "true"
+# 非开发环境下也记录插件 trace 日志，建议同时通过 LOG_STORAGE_BACKEND 将日志存储到数据库之外
+BK_PLUGIN_TRACE_LOG_ALWAYS_ON = os.getenv("TRACE_LOG_ALWAYS_ON", "false").lower() == "true"
 
 # 请在这里加入你的自定义 APP
 INSTALLED_APPS += (  # noqa
@@ -193,14 +197,19 @@ def logging_addition_settings(logging_dict):
         "level": "INFO",
         "propagate": True,
     }
-    if BKPAAS_ENVIRONMENT == "dev":
-        # bk plugin log setting
+    if BKPAAS_ENVIRONMENT == "dev" or BK_PLUGIN_TRACE_LOG_ALWAYS_ON:
+        # bk plugin log setting, 开启 BK_PLUGIN_LOG_BUFFERED 后日志由后台线程批量落库，不再阻塞插件执行
         logging_dict["handlers"]["db_log_handler"] = {
-            "class": "bk_plugin_framework.runtime.loghub.log.TraceContextLogHandler",
+            "class": (
+                "bk_plugin_framework.runtime.loghub.log.BufferedTraceContextLogHandler"
+                if BK_PLUGIN_LOG_BUFFERED
+                else "bk_plugin_framework.runtime.loghub.log.TraceContextLogHandler"
+            ),
             "formatter": "simple",
         }
         logging_dict["loggers"]["bk_plugin"]["handlers"].append("db_log_handler")
 
+    if BKPAAS_ENVIRONMENT == "dev":
         logging_dict["handlers"]["console"] = {
             "level": "INFO",
             "class": "logging.StreamHandler",
@@ -336,6 +345,11 @@ _path = url_parse.path
 BK_PLUGIN_APIGW_BACKEND_SUB_PATH = (_path.decode("utf-8") if isinstance(_path, bytes) else _path).lstrip("/")
 BK_PLUGIN_APIGW_BACKEND_SCHEME = url_parse.scheme or "http"
 
+from bk_plugin_framework.envs import settings as bpf_settings  # noqa
+
+# 开启调度状态通知时 urls 中才注册长轮询及 SSE 接口，resources.yaml 据此决定是否注册对应的网关资源
+SCHEDULE_NOTIFY_BACKEND = bpf_settings.SCHEDULE_NOTIFY_BACKEND
+
 BK_APIGW_CORS_ALLOW_ORIGINS = os.getenv("BK_APIGW_CORS_ALLOW_ORIGINS", "")
 BK_APIGW_CORS_ALLOW_METHODS = os.getenv("BK_APIGW_CORS_ALLOW_METHODS", "")
 BK_APIGW_CORS_ALLOW_HEADERS = os.getenv("BK_APIGW_CORS_ALLOW_HEADERS", "")